@@ -16,7 +16,7 @@ from office365.runtime.auth.client_credential import ClientCredential
 from office365.runtime.auth.user_credential import UserCredential
 
 # Import fungsi dari modules yang sudah ada
-from ocr_processor import process_all_documents_with_competency
+from ocr_processor import process_all_documents_with_competency, OCR_PROFILES, DEFAULT_OCR_PROFILE
 from pptx_generator import generate_presentations_from_csv
 
 # ==================== SECURITY & ENCRYPTION ====================
@@ -224,6 +224,10 @@ class CVSummaryProcessor:
                         sp_password,
                         excel_file,
                         template_file,
+                        ocr_profile=None,
+                        use_llm_cache=True,
+                        use_llm_competency=False,
+                        use_registry=True,
                         progress=gr.Progress()):
         """
         Process complete pipeline: OCR -> Analysis -> PPT Generation
@@ -300,12 +304,16 @@ class CVSummaryProcessor:
             self.temp_dirs.append(output_folder)
             
             # 4. Process OCR and Analysis
-            progress(0.3, desc="Processing PDFs with OCR...")
+            progress(0.3, desc=f"Processing PDFs with OCR (profil {ocr_profile or DEFAULT_OCR_PROFILE})...")
             df_result = process_all_documents_with_competency(
                 input_folder=input_folder,
                 excel_path=excel_path,
                 output_folder=output_folder,
-                output_excel=f"hasil_analisis_{timestamp}.xlsx"
+                output_excel=f"hasil_analisis_{timestamp}.xlsx",
+                ocr_profile=ocr_profile,
+                use_llm_cache=use_llm_cache,
+                use_llm_competency=use_llm_competency,
+                use_registry=use_registry
             )
             
             if df_result.empty:
@@ -347,6 +355,10 @@ class CVSummaryProcessor:
                 # Add Excel file
                 zipf.write(result_excel, os.path.basename(result_excel))
                 
+                # Add LLM metrics (token, latency, retry per kategori)
+                for metrics_file in glob.glob(os.path.join(output_folder, "metrik_llm_*.xlsx")):
+                    zipf.write(metrics_file, os.path.basename(metrics_file))
+                
                 # Add all presentation files
                 for root, dirs, files in os.walk(ppt_output_dir):
                     for file in files:
@@ -403,11 +415,12 @@ class CVSummaryProcessor:
 - Kandidat dengan NIK: {nik_count}
 - Kandidat dengan competency data: {competency_count}
 - Presentasi PowerPoint dibuat: {num_ppts}
-
+{self._format_llm_metrics(output_folder)}
 📁 **File ZIP berisi:**
 1. Excel hasil analisis lengkap
 2. Folder `presentations/` dengan semua PPT hasil ({num_ppts} file)
 3. File text hasil OCR
+4. Excel metrik AI (`metrik_llm_*.xlsx`)
 
 ⬇️ **Download Hasil:**
 - File ZIP sudah berisi semua hasil termasuk presentasi
@@ -419,6 +432,32 @@ class CVSummaryProcessor:
 """
         return report
     
+    def _format_llm_metrics(self, output_folder):
+        """Tabel markdown metrik AI per kategori dari metrik_llm_*.xlsx (kosong jika tidak ada)"""
+        metrics_files = sorted(glob.glob(os.path.join(output_folder, "metrik_llm_*.xlsx")))
+        if not metrics_files:
+            return ""
+        try:
+            metrics = pd.read_excel(metrics_files[-1], sheet_name='Per Kategori')
+        except Exception as e:
+            print(f"⚠ Metrik AI tidak dapat dibaca: {e}")
+            return ""
+        if metrics.empty:
+            return ""
+        
+        rows = [
+            "| Kategori | Panggilan | Cache | Token in | Token out | Latency total (s) | Rata-rata (s) | Retry | Gagal |",
+            "|---|---|---|---|---|---|---|---|---|",
+        ]
+        for row in metrics.itertuples(index=False):
+            rows.append(f"| {row.category} | {row.calls:g} | {row.cache_hits:g} | {row.prompt_tokens:,} | "
+                        f"{row.output_tokens:,} | {row.latency_total_s:.1f} | {row.latency_avg_s:.2f} | "
+                        f"{row.retries:g} | {row.errors:g} |")
+        total_seconds = metrics['latency_total_s'].sum()
+        total_tokens = metrics['prompt_tokens'].sum() + metrics['output_tokens'].sum()
+        return (f"\n🤖 **Metrik AI** (total {total_tokens:,} token, {total_seconds:.1f} detik panggilan):\n\n"
+                + "\n".join(rows) + "\n")
+    
     def get_zip_file(self):
         """Get ZIP file for download"""
         if self.result_zip_path and os.path.exists(self.result_zip_path):
@@ -552,6 +591,36 @@ def create_interface():
                     type="filepath"
                 )
                 
+                # OCR Profile
+                ocr_profile = gr.Dropdown(
+                    choices=[(f"{name} - {profile['description']}", name)
+                             for name, profile in OCR_PROFILES.items()],
+                    value=DEFAULT_OCR_PROFILE,
+                    label="⚙️ Profil OCR",
+                    info="fast untuk batch besar, best untuk dokumen scan berkualitas rendah"
+                )
+                
+                # LLM Cache
+                use_llm_cache = gr.Checkbox(
+                    value=True,
+                    label="♻️ Gunakan cache hasil AI",
+                    info="Matikan untuk memaksa semua kandidat dianalisis ulang oleh Gemini"
+                )
+                
+                # Competency formatting
+                use_llm_competency = gr.Checkbox(
+                    value=False,
+                    label="🧠 Format competency dengan AI",
+                    info="Default: diformat langsung dari Excel (maks 10, level >= 2) tanpa request ke Gemini"
+                )
+                
+                # Candidate registry
+                use_registry = gr.Checkbox(
+                    value=True,
+                    label="🗂️ Lewati kandidat yang sudah pernah diproses",
+                    info="Kandidat dengan CV & Assessment yang sama persis dengan run sebelumnya dipakai ulang tanpa OCR & AI"
+                )
+                
                 # Process Button
                 process_btn = gr.Button(
                     "🚀 Proses Pipeline End-to-End",
@@ -592,7 +661,8 @@ def create_interface():
         
         # Process button click - MODIFIED
         def process_wrapper(input_type, upload_files, sp_url, sp_username, sp_password, 
-                          excel_file, template_file):
+                          excel_file, template_file, ocr_profile, use_llm_cache,
+                          use_llm_competency, use_registry):
             try:
                 print("Processing started...")
                 
@@ -605,6 +675,10 @@ def create_interface():
                     sp_password=sp_password,
                     excel_file=excel_file,
                     template_file=template_file,
+                    ocr_profile=ocr_profile,
+                    use_llm_cache=use_llm_cache,
+                    use_llm_competency=use_llm_competency,
+                    use_registry=use_registry,
                     progress=gr.Progress()
                 )
                 
@@ -643,7 +717,11 @@ def create_interface():
                 sp_username,
                 sp_password,
                 excel_file,
-                template_file
+                template_file,
+                ocr_profile,
+                use_llm_cache,
+                use_llm_competency,
+                use_registry
             ],
             outputs=[
                 status_output,           # summary text
@@ -675,9 +753,13 @@ def create_interface():
            - Excel Competency (wajib)
            - Template PowerPoint (wajib)
         
-        3. **Klik Proses:** Sistem akan menjalankan pipeline lengkap secara otomatis
+        3. **Pilih Profil OCR:** `fast` untuk batch besar, `balanced` (default), atau `best` untuk scan berkualitas rendah
+           - Matikan **Gunakan cache hasil AI** jika kandidat perlu dianalisis ulang dari awal
+           - **Lewati kandidat yang sudah pernah diproses** hanya memproses kandidat baru atau yang dokumennya berubah
+        
+        4. **Klik Proses:** Sistem akan menjalankan pipeline lengkap secara otomatis
         
-        4. **Download Hasil:** 
+        5. **Download Hasil:** 
            - **All Results (ZIP):** File ZIP akan muncul untuk di-download (berisi semua hasil)
         
         ⏱️ **Estimasi Waktu:** 5-15 menit tergantung jumlah dokumen
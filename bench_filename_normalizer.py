@@ -0,0 +1,131 @@
+"""
+Benchmark normalisasi nama file: extract_name_from_filename (ocr_processor) vs implementasi lama.
+Jalankan dari root repo: python bench_filename_normalizer.py [jumlah_file]
+"""
+import os
+import random
+import re
+import sys
+import time
+from contextlib import redirect_stdout
+from typing import Dict
+
+from ocr_processor import extract_name_from_filename
+
+def _extract_name_from_filename_legacy(filename):
+    """Implementasi lama extract_name_from_filename (15 re.sub + print debug), sebagai pembanding"""
+    # Hapus ekstensi file
+    name = os.path.splitext(filename)[0]
+    
+    print(f"  Debug - Original filename: {filename}")
+    print(f"  Debug - Name after removing extension: {name}")
+    
+    # HAPUS SEMUA PATTERN CV (case-insensitive) TERLEBIH DAHULU
+    # Pattern untuk menghapus "CV_" di awal, tengah, atau akhir
+    patterns_to_remove = [
+        # 1. Pattern untuk CV di awal dengan berbagai separator
+        r'^cv[\s_\-]+',           # "CV_" di awal
+        r'^cv$',                  # Hanya "CV"
+        
+        # 2. Pattern untuk CV di tengah dengan berbagai separator
+        r'[\s_\-]+cv[\s_\-]+',    # "_CV_" di tengah
+        
+        # 3. Pattern untuk CV di akhir
+        r'[\s_\-]+cv$',           # "_CV" di akhir
+        
+        # 4. Pattern khusus untuk "Cv_" (huruf besar C, kecil v)
+        r'^Cv[\s_\-]+',           # "Cv_" di awal
+        r'[\s_\-]+Cv[\s_\-]+',    # "_Cv_" di tengah
+        r'[\s_\-]+Cv$',           # "_Cv" di akhir
+        
+        # 5. Hapus karakter khusus dan angka
+        r'[\d_\-\.\(\)\[\]\{\}]+',
+        
+        # 6. Pattern umum lainnya
+        r'resume[\s_\-]*',
+        r'curriculum[\s_\-]*vitae[\s_\-]*',
+        r'application[\s_\-]*',
+        r'^[\s_\-]+',             # Spasi/underscore di awal
+        r'[\s_\-]+$',             # Spasi/underscore di akhir
+    ]
+    
+    for pattern in patterns_to_remove:
+        name = re.sub(pattern, ' ', name, flags=re.IGNORECASE)  # Gunakan flag di luar pola
+        # Debug setiap step
+        # print(f"  Debug - After pattern '{pattern}': {name}")
+    
+    # HAPUS KHUSUS untuk kasus "CV_nama_kandidat" 
+    # Split by underscore dan ambil bagian yang bukan "CV" (case-insensitive)
+    parts = re.split(r'[\s_\-]+', name)
+    print(f"  Debug - Parts after split: {parts}")
+    
+    filtered_parts = []
+    for part in parts:
+        part_lower = part.lower()
+        # Skip jika bagian adalah "cv" dalam berbagai bentuk
+        if part_lower in ['cv', 'c_v', 'c-v']:
+            continue
+        # Skip jika bagian terlalu pendek (kurang dari 2 karakter)
+        if len(part) < 2:
+            continue
+        filtered_parts.append(part)
+    
+    name = ' '.join(filtered_parts)
+    
+    # Clean up: hapus spasi berlebih
+    name = re.sub(r'\s+', ' ', name).strip()
+    
+    print(f"  Debug - Final name before title case: {name}")
+    
+    # Title case untuk nama
+    if name:
+        name = name.title()
+    
+    print(f"  Debug - Final name: {name}")
+    
+    return name
+
+def benchmark_filename_normalizer(num_files: int = 10000, seed: int = 0) -> Dict:
+    """
+    Ukur throughput extract_name_from_filename vs implementasi lama pada korpus nama file sintetis.
+    Returns: statistik (file, detik lama, detik baru tanpa cache, detik baru dengan cache, speedup, hasil berbeda)
+    """
+    rng = random.Random(seed)
+    first_names = ['Budi', 'Siti', 'Agus', 'Dewi', 'Rizki', 'Putri', 'Andi', 'Hendra', 'Nur', 'Fajar']
+    last_names = ['Santoso', 'Wijaya', 'Saputra', 'Pratama', 'Hidayat', 'Nasution', 'Siregar', 'Lubis']
+    templates = ['CV_{name}_{n}.pdf', 'cv-{name}-{n}.pdf', '{name}_CV ({n}).pdf', 'Assessment {name} {n}.pdf',
+                 'Resume_{name}_v{n}.pdf', 'Curriculum Vitae - {name} [{n}].pdf', 'Penilaian_{name}.{n}.pdf']
+    filenames = []
+    for index in range(num_files):
+        name = f"{rng.choice(first_names)} {rng.choice(last_names)}"
+        separator = rng.choice([' ', '_', '-'])
+        filenames.append(rng.choice(templates).format(name=name.replace(' ', separator), n=index))
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        started = time.perf_counter()
+        legacy = [_extract_name_from_filename_legacy(filename) for filename in filenames]
+        legacy_seconds = time.perf_counter() - started
+
+    extract_name_from_filename.cache_clear()
+    started = time.perf_counter()
+    current = [extract_name_from_filename(filename) for filename in filenames]
+    cold_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for filename in filenames:
+        extract_name_from_filename(filename)
+    warm_seconds = time.perf_counter() - started
+
+    stats = {
+        'files': num_files,
+        'legacy_seconds': legacy_seconds,
+        'cold_seconds': cold_seconds,
+        'warm_seconds': warm_seconds,
+        'speedup': legacy_seconds / cold_seconds if cold_seconds else 0.0,
+        'mismatches': sum(old != new for old, new in zip(legacy, current)),
+    }
+    print(f"Benchmark nama file: {num_files} file, lama {legacy_seconds:.2f}s, baru {cold_seconds:.3f}s "
+          f"(cache {warm_seconds:.3f}s), {stats['speedup']:.0f}x lebih cepat, hasil berbeda: {stats['mismatches']}")
+    return stats
+
+if __name__ == "__main__":
+    benchmark_filename_normalizer(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
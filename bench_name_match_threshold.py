@@ -0,0 +1,98 @@
+"""
+Kalibrasi NAME_MATCH_THRESHOLD untuk name_similarity (Dice bigram) pada pasangan nama file CV vs nama
+file/header Assessment sintetis. Variasi meniru data nyata: gelar, salah baca OCR, huruf hilang, nama tengah
+hilang, urutan kata terbalik, singkatan (Muh./M.) dan ejaan lama (Achmad/Noor). Negatif = orang berbeda,
+dipisah antara acak dan yang berbagi satu token nama (Budi Santoso / Budi Hartono).
+Jalankan dari root repo: python bench_name_match_threshold.py [jumlah_orang]
+"""
+import random
+import sys
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from ocr_processor import NAME_MATCH_THRESHOLD, name_similarity, name_tokens
+
+FIRST_NAMES = ['Budi', 'Siti', 'Agus', 'Dewi', 'Rizki', 'Putri', 'Andi', 'Hendra', 'Nur', 'Fajar', 'Muhammad',
+               'Ahmad', 'Sri', 'Eko', 'Dian', 'Yusuf', 'Rina', 'Wahyu', 'Indra', 'Ratna']
+MIDDLE_NAMES = ['', '', 'Nur', 'Dwi', 'Tri', 'Adi', 'Eka', 'Putra', 'Sari', 'Rahmat']
+LAST_NAMES = ['Santoso', 'Wijaya', 'Saputra', 'Pratama', 'Hidayat', 'Nasution', 'Siregar', 'Lubis', 'Hartono',
+              'Setiawan', 'Kurniawan', 'Susanto', 'Gunawan', 'Hasibuan', 'Purnomo', 'Rahman', 'Harahap',
+              'Simanjuntak', 'Utomo', 'Nugroho']
+# Salah baca OCR yang umum
+OCR_CONFUSIONS = {'m': 'rn', 'l': 'i', 'o': '0', 'e': 'c', 'h': 'b', 'u': 'v', 'i': 'l', 'a': 'o'}
+
+
+def name_variant(name: str, rng: random.Random) -> str:
+    """Satu variasi nama seperti yang muncul di nama file / header Assessment"""
+    parts = name.split()
+    kind = rng.randrange(8)
+    if kind == 1:
+        return rng.choice(['Dr. ', 'Ir. ', '']) + name + rng.choice([', S.E.', ', M.M.', ', S.T., M.B.A.', ''])
+    if kind == 2:
+        position = rng.randrange(len(name))
+        char = name[position].lower()
+        return name[:position] + OCR_CONFUSIONS.get(char, char) + name[position + 1:]
+    if kind == 3:
+        position = rng.randrange(1, len(name))
+        return name[:position - 1] + name[position:]
+    if kind == 4 and len(parts) > 2:
+        return f"{parts[0]} {parts[-1]}"
+    if kind == 5 and len(parts) > 1:
+        return " ".join(reversed(parts))
+    if kind == 6:
+        return (name.replace('Muhammad', rng.choice(['Muh.', 'Muhamad', 'M.']))
+                .replace('Ahmad', 'Achmad').replace('Nur', 'Noor'))
+    if kind == 7 and len(parts) > 1:
+        return " ".join([parts[0][0] + '.'] + parts[1:])
+    return name
+
+
+def calibration_scores(num_people: int = 3000, seed: int = 0) -> Dict[str, np.ndarray]:
+    """Skor (dice, sequence_matcher) untuk pasangan positif, negatif acak dan negatif berbagi token"""
+    rng = random.Random(seed)
+    people = sorted({" ".join(part for part in (rng.choice(FIRST_NAMES), rng.choice(MIDDLE_NAMES),
+                                                rng.choice(LAST_NAMES)) if part)
+                     for _ in range(num_people)})
+
+    def scores(a: str, b: str) -> Tuple[float, float]:
+        return (name_similarity(name_tokens(a), name_tokens(b)),
+                SequenceMatcher(None, a.lower(), b.lower()).ratio())
+
+    positive = [scores(person, name_variant(person, rng)) for person in people]
+    negative, shared = [], []
+    for _ in range(len(people) * 2):
+        a, b = rng.sample(people, 2)
+        pair_scores = scores(a, name_variant(b, rng))
+        negative.append(pair_scores)
+        if set(a.split()) & set(b.split()):
+            shared.append(pair_scores)
+    return {'positive': np.array(positive), 'negative': np.array(negative), 'shared': np.array(shared)}
+
+
+def threshold_table(samples: Dict[str, np.ndarray], column: int,
+                    thresholds: List[float]) -> List[Tuple[float, float, float, float]]:
+    """[(threshold, recall positif, false positive acak, false positive berbagi token)]"""
+    return [(threshold, (samples['positive'][:, column] >= threshold).mean(),
+             (samples['negative'][:, column] >= threshold).mean(),
+             (samples['shared'][:, column] >= threshold).mean()) for threshold in thresholds]
+
+
+def recommend_threshold(samples: Dict[str, np.ndarray], min_recall: float = 0.99) -> float:
+    """Threshold Dice dengan false positive berbagi token terendah selama recall >= min_recall"""
+    table = threshold_table(samples, 0, [round(value, 2) for value in np.arange(0.40, 0.91, 0.01)])
+    eligible = [row for row in table if row[1] >= min_recall]
+    return min(eligible, key=lambda row: (row[3], -row[1]))[0]
+
+
+if __name__ == "__main__":
+    samples = calibration_scores(int(sys.argv[1]) if len(sys.argv) > 1 else 3000)
+    for column, scorer in ((0, 'Dice bigram (name_similarity)'), (1, 'SequenceMatcher (lama)')):
+        print(f"\n{scorer}")
+        for threshold, recall, false_positive, false_positive_shared in threshold_table(
+                samples, column, [round(value, 2) for value in np.arange(0.50, 0.86, 0.05)]):
+            print(f"  threshold {threshold:.2f}: recall {recall:.3f}, FP acak {false_positive:.4f}, "
+                  f"FP berbagi token {false_positive_shared:.4f}")
+    print(f"\nRekomendasi threshold Dice (recall >= 0.99): {recommend_threshold(samples):.2f} "
+          f"(NAME_MATCH_THRESHOLD saat ini {NAME_MATCH_THRESHOLD})")
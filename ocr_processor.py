@@ -1,17 +1,30 @@
 import os
 import glob
 import re
+import json
+import hashlib
+import random
+import sqlite3
+import multiprocessing
+import numpy as np
 import pandas as pd
+from scipy.optimize import linear_sum_assignment
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 import pytesseract
 from pdf2image import convert_from_path
+from PyPDF2 import PdfReader
 from PIL import Image, ImageEnhance, ImageFilter
 import time
+import atexit
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Set
+from typing import Dict, Iterator, List, Optional, Tuple, Set, Union
 import warnings
-from collections import defaultdict
-from difflib import SequenceMatcher
+from collections import Counter, defaultdict
 from dotenv import load_dotenv 
 
 warnings.filterwarnings('ignore')
@@ -33,39 +46,171 @@ else:
 
 def verify_ocr_installation():
     """Verify that OCR engine is properly installed"""
-    try:
-        # Try to get tesseract version
-        version = pytesseract.get_tesseract_version()
-        print(f"✓ Tesseract OCR version: {version}")
+    # Probe di-cache, jadi pengecekan per PDF berikutnya tidak spawn proses tesseract lagi
+    available, info = probe_tesseract()
+    if available:
+        print(f"✓ Tesseract OCR version: {info}")
+        print(f"✓ OCR engine: {get_ocr_engine().name}")
         return True
-    except Exception as e:
-        print(f"✗ Tesseract OCR not found or not accessible: {e}")
-        print("  Please ensure tesseract-ocr is installed in Railway environment")
-        return False
+    print(f"✗ Tesseract OCR not found or not accessible: {info}")
+    print("  Please ensure tesseract-ocr is installed in Railway environment")
+    return False
 
 # Konfigurasi Gemini API
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") 
 GEMINI_MODEL = "gemini-2.5-flash-lite"
 
-# Inisialisasi Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
+# Backend LLM: 'gemini' (default) atau 'fake' (lokal, tanpa jaringan/kuota, untuk load test & benchmark).
+# genai.configure dipanggil saat backend Gemini pertama kali dibuat.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
 
-def similarity_ratio(a: str, b: str) -> float:
-    """Menghitung similarity ratio antara dua string"""
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+# Kuota Gemini (sesuaikan dengan tier project): request per menit dan token (input + output) per menit.
+# Semua request LLM melewati satu limiter bersama, jadi kandidat bisa diproses paralel tanpa sleep tetap.
+LLM_RPM = float(os.getenv("LLM_RPM", "60"))
+LLM_TPM = float(os.getenv("LLM_TPM", "1000000"))
+# Jumlah request LLM bersamaan: mulai dari LLM_CONCURRENCY, lalu diatur adaptif (AIMD) antara 1 dan
+# LLM_MAX_CONCURRENCY berdasarkan response 429/5xx dari Gemini
+LLM_CONCURRENCY = max(1, int(os.getenv("LLM_CONCURRENCY", "4")))
+LLM_MAX_CONCURRENCY = max(LLM_CONCURRENCY, int(os.getenv("LLM_MAX_CONCURRENCY", str(LLM_CONCURRENCY * 2))))
 
-def find_best_name_match(name: str, candidate_names: List[str], threshold: float = 0.7) -> Optional[str]:
-    """Mencari nama terbaik yang match dari list candidate"""
-    best_match = None
-    best_score = 0
-    
-    for candidate in candidate_names:
-        score = similarity_ratio(name, candidate)
-        if score > best_score and score >= threshold:
-            best_score = score
-            best_match = candidate
-    
-    return best_match
+# Retry request LLM yang gagal sementara (429/5xx/timeout): exponential backoff dengan full jitter
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_SECONDS = 2.0
+LLM_BACKOFF_MAX_SECONDS = 60.0
+# Circuit breaker: setelah sekian kegagalan beruntun, semua request ditahan selama cooldown
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+# Berapa kali field yang masih gagal dimasukkan ulang ke antrian setelah semua kandidat selesai
+LLM_REQUEUE_ROUNDS = int(os.getenv("LLM_REQUEUE_ROUNDS", "2"))
+
+# Skills (Competency) diformat lokal dari data Excel; LLM hanya dipakai jika job memintanya
+COMPETENCY_MAX_ITEMS = 10
+COMPETENCY_MIN_LEVEL = 2
+COMPETENCY_USE_LLM = os.getenv("COMPETENCY_USE_LLM", "0") == "1"
+
+# Versi template prompt LLM. NAIKKAN setiap kali isi ANALYSIS_PROMPTS / prompt competency diubah,
+# supaya response lama di cache tidak dipakai lagi.
+PROMPT_VERSION = "1"
+# Versi pipeline analisis di luar teks prompt (compaction teks, validasi & perbaikan field). NAIKKAN setiap kali
+# logika tersebut diubah, supaya hasil kandidat lama di registry tidak dipakai lagi.
+ANALYSIS_PIPELINE_VERSION = "3"
+
+# Cache response LLM (SQLite) di depan semua request Gemini
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "cv_summary_llm",
+                                                          "llm_cache.sqlite3"))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "200"))
+
+# Registry kandidat (SQLite): kandidat yang dokumennya tidak berubah tidak di-OCR/dianalisis ulang antar run
+CANDIDATE_REGISTRY_PATH = os.getenv("CANDIDATE_REGISTRY_PATH", os.path.join(
+    os.path.expanduser("~"), ".cache", "cv_summary_registry", "candidates.sqlite3"))
+CANDIDATE_REGISTRY_ENABLED = os.getenv("CANDIDATE_REGISTRY_ENABLED", "1") != "0"
+# Entry kandidat yang tidak dipakai/diperbarui selama ini dihapus
+CANDIDATE_REGISTRY_TTL_DAYS = float(os.getenv("CANDIDATE_REGISTRY_TTL_DAYS", "180"))
+
+# Konfigurasi cache teks OCR (dipakai bersama oleh tahap matching & pemrosesan, dan antar run)
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "cv_summary_ocr"))
+OCR_CACHE_MAX_MB = float(os.getenv("OCR_CACHE_MAX_MB", "500"))
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "1") != "0"
+# Cache per halaman (hash bitmap) untuk halaman boilerplate yang sama di banyak dokumen
+OCR_PAGE_CACHE_ENABLED = os.getenv("OCR_PAGE_CACHE_ENABLED", "1") != "0"
+
+# Text layer PDF (hasil export Word dll) dipakai langsung jika kualitasnya cukup
+TEXT_LAYER_ENABLED = os.getenv("TEXT_LAYER_ENABLED", "1") != "0"
+TEXT_LAYER_MIN_CHARS = 80
+TEXT_LAYER_MIN_ALNUM_RATIO = 0.6
+
+# Resolusi render halaman untuk OCR. Mode adaptive: OCR dulu di OCR_ADAPTIVE_LOW_DPI, lalu render
+# ulang di OCR_DPI hanya untuk halaman dengan rata-rata confidence tesseract < OCR_ADAPTIVE_MIN_CONFIDENCE
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_ADAPTIVE_DPI = os.getenv("OCR_ADAPTIVE_DPI", "1") != "0"
+OCR_ADAPTIVE_LOW_DPI = int(os.getenv("OCR_ADAPTIVE_LOW_DPI", "200"))
+OCR_ADAPTIVE_MIN_CONFIDENCE = float(os.getenv("OCR_ADAPTIVE_MIN_CONFIDENCE", "70"))
+
+# Preprocessing halaman sebelum OCR ('optimized' = binarisasi + crop margin + skip halaman kosong/foto)
+PREPROCESS_MODES = ('none', 'grayscale', 'optimized')
+# Statistik per halaman yang dikirim balik dari worker lalu dijumlahkan ke OCR_STATS
+PAGE_STAT_KEYS = ('pixels_in', 'pixels_out', 'preprocess_seconds', 'ocr_seconds',
+                  'page_cache_lookups', 'page_cache_hits')
+PREPROCESS_BLANK_INK_RATIO = 0.001
+PREPROCESS_CROP_MARGIN = 20
+PREPROCESS_TILE_SIZE = 32
+PREPROCESS_IMAGE_MIDTONE_RATIO = 0.5
+PREPROCESS_IMAGE_MIN_STD = 35
+PREPROCESS_IMAGE_EDGE_RATIO = 0.02
+# Tile latar gelap yang rata (header abu-abu/gelap dengan teks putih): binarisasi dibalik, tidak dianggap foto
+PREPROCESS_DARK_FLAT_RATIO = 0.5
+
+# Folder traineddata per varian (tessdata_fast lebih cepat, tessdata_best lebih akurat), opsional.
+# Tidak diinstall oleh build (railway.json); jika kosong/tidak ada, tesseract memakai traineddata default
+# yang terinstall dan resolve_ocr_settings memberi peringatan.
+TESSDATA_DIRS = {
+    'fast': os.getenv("TESSDATA_FAST_DIR", ""),
+    'best': os.getenv("TESSDATA_BEST_DIR", ""),
+}
+
+# Profil OCR: trade-off kecepatan vs akurasi, bisa dipilih per job dari Gradio/CLI
+OCR_PROFILES = {
+    'fast': {
+        'description': 'Cepat - 200 DPI, preprocessing optimized, halaman dibatasi',
+        'tessdata': 'fast',
+        'oem': 1,
+        'psm': 6,
+        'dpi': 200,
+        'adaptive': False,
+        'preprocess': 'optimized',
+        'max_pages': {'CV': 5, 'ASSESSMENT': 4, 'OTHER': 5},
+    },
+    'balanced': {
+        'description': 'Seimbang - setting default',
+        'tessdata': None,
+        'oem': 3,
+        'psm': 6,
+        'dpi': OCR_DPI,
+        'adaptive': OCR_ADAPTIVE_DPI,
+        # Tetap grayscale sampai output 'optimized' dibandingkan di dokumen nyata (header berlatar gelap)
+        'preprocess': 'grayscale',
+        'max_pages': {'CV': 10, 'ASSESSMENT': 10, 'OTHER': 10},
+    },
+    'best': {
+        'description': 'Akurat - 400 DPI, deteksi layout otomatis, lebih banyak halaman',
+        'tessdata': 'best',
+        'oem': 1,
+        'psm': 3,
+        'dpi': 400,
+        'adaptive': False,
+        'preprocess': 'grayscale',
+        'max_pages': {'CV': 15, 'ASSESSMENT': 15, 'OTHER': 15},
+    },
+}
+DEFAULT_OCR_PROFILE = os.getenv("OCR_PROFILE", "balanced").lower()
+
+# Porsi atas halaman pertama yang di-OCR saat mencari NIK/nama di tahap matching
+IDENTIFICATION_HEADER_RATIO = float(os.getenv("IDENTIFICATION_HEADER_RATIO", "0.35"))
+# Jumlah karakter awal teks yang dipindai untuk NIK/nama (NIK & nama hampir selalu di header)
+IDENTITY_SCAN_MAX_CHARS = int(os.getenv("IDENTITY_SCAN_MAX_CHARS", "6000"))
+# NIK dengan confidence >= nilai ini menghentikan pass identifikasi (NIK tanpa label tetap dicari labelnya)
+IDENTITY_STOP_CONFIDENCE = 0.8
+
+# Backend OCR: 'auto' (tesserocr jika terinstall, else pytesseract), 'tesserocr', atau 'pytesseract'
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto").lower()
+
+# Jumlah proses worker OCR paralel (1 = sequential seperti sebelumnya)
+OCR_WORKERS = max(1, int(os.getenv("OCR_WORKERS", "1")))
+# Start method process pool OCR. Default 'spawn': fork dari server Gradio yang multithread dan memegang koneksi
+# SQLite (cache LLM, registry) bisa deadlock/merusak database di proses anak. 'forkserver' juga aman (Linux)
+OCR_POOL_START_METHOD = os.getenv("OCR_POOL_START_METHOD", "spawn")
+
+# Batas memori rasterization: jumlah halaman yang dirender per panggilan poppler, dan
+# jumlah maksimum bitmap halaman yang boleh ada di memori sekaligus di seluruh pipeline
+OCR_RENDER_WINDOW = max(1, int(os.getenv("OCR_RENDER_WINDOW", "1")))
+OCR_MAX_PAGE_BITMAPS = max(1, int(os.getenv("OCR_MAX_PAGE_BITMAPS", "4")))
+
+# Statistik OCR per run (halaman text layer vs OCR, cache hit, dst)
+OCR_STATS = defaultdict(int)
 
 def read_excel_competency(excel_path: str, nik_column: str = 'nik', level_column: str = 'level', 
                          min_level: int = 2, top_n: int = 15) -> Dict[str, List[Dict]]:
@@ -136,472 +281,2972 @@ def format_competency_string(competencies_list: List[Dict]) -> str:
     
     return "\n".join(formatted_list)
 
-def extract_nik_and_name_from_text(text: str) -> Tuple[Optional[str], Optional[str]]:
+def format_competency_bullets(competencies_list: List[Dict], max_items: int = None,
+                              min_level: int = None) -> str:
     """
-    Mencoba ekstrak NIK dan Nama dari text assessment
-    Returns: (nik, nama)
+    Format competency untuk slide tanpa LLM: level >= min_level, urut level tertinggi (urutan asli
+    dipertahankan untuk level yang sama), maksimal max_items, format "• Nama (Lvl. X/5)"
     """
-    nik = None
-    nama = None
-    
-    # Pattern untuk NIK
-    nik_patterns = [
-        r'NIK\s*[:\.]?\s*(\d+)',
-        r'Nomor\s+Induk\s+Karyawan\s*[:\.]?\s*(\d+)',
-        r'Employee\s+ID\s*[:\.]?\s*(\d+)',
-        r'ID\s+Karyawan\s*[:\.]?\s*(\d+)',
-        r'\b\d{8,15}\b'
-    ]
-    
-    for pattern in nik_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        if matches:
-            nik = matches[0]
-            break
-    
-    # Pattern untuk Nama
-    name_patterns = [
-        r'Nama\s*[:\.]?\s*([A-Za-z\s\.]+)(?:\n|$)',
-        r'Name\s*[:\.]?\s*([A-Za-z\s\.]+)(?:\n|$)',
-        r'Peserta\s*[:\.]?\s*([A-Za-z\s\.]+)(?:\n|$)',
-        r'Candidate\s*[:\.]?\s*([A-Za-z\s\.]+)(?:\n|$)'
-    ]
-    
-    for pattern in name_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        if matches:
-            nama = matches[0].strip()
-            # Bersihkan nama dari karakter tidak perlu
-            nama = re.sub(r'[^A-Za-z\s\.]', '', nama)
-            nama = nama.title()
+    max_items = COMPETENCY_MAX_ITEMS if max_items is None else max_items
+    min_level = COMPETENCY_MIN_LEVEL if min_level is None else min_level
+
+    selected = [comp for comp in competencies_list or []
+                if str(comp.get('competency', '')).strip() and int(comp.get('level', 0) or 0) >= min_level]
+    selected.sort(key=lambda comp: int(comp.get('level', 0) or 0), reverse=True)
+
+    return "\n".join(f"• {str(comp['competency']).strip()} (Lvl. {int(comp['level'])}/5)"
+                     for comp in selected[:max_items])
+
+# Satu regex untuk semua pola NIK/nama; label NIK/nama di-anchor \b supaya "Teknik 2020" bukan NIK
+_IDENTITY_SCAN_RE = re.compile(r"""
+    (?=[NnEeIiPpCc\d])\b  # cek huruf pertama dulu: posisi lain dilewati tanpa mencoba semua alternatif
+    (?:
+    # Label harus kata utuh ("Namanya"/"Nikah" bukan label); NIK boleh langsung diikuti angka ("NIK12345")
+    (?P<nik_label>NIK|Nomor\s+Induk\s+Karyawan|Employee\s+ID|ID\s+Karyawan)(?![A-Za-z])\s*[:.]?\s*(?P<nik>\d+)
+  | (?P<name_label>Nama(?:\s+Lengkap)?|Name|Peserta|Candidate)\b[ \t]*[:.]?[ \t]*
+        (?P<nama>[A-Za-z][A-Za-z \t.]*?)[ \t]*$
+  | (?P<bare_nik>\d{8,15})\b
+    )
+""", re.IGNORECASE | re.MULTILINE | re.VERBOSE)
+
+# Confidence per sumber nilai
+_NIK_LABEL_CONFIDENCE = {'nik': 0.95, 'nomor induk karyawan': 0.95, 'employee id': 0.85, 'id karyawan': 0.85}
+_NAME_LABEL_CONFIDENCE = {'nama': 0.9, 'nama lengkap': 0.9, 'name': 0.85, 'peserta': 0.8, 'candidate': 0.8}
+BARE_NIK_CONFIDENCE = 0.4
+FIRST_LINES_NAME_CONFIDENCE = 0.3
+
+def _identity_hit(value: str, confidence: float, position: int, reason: str) -> Dict:
+    return {'value': value, 'confidence': confidence, 'position': position, 'reason': reason}
+
+def scan_identity(text: str, max_chars: Optional[int] = IDENTITY_SCAN_MAX_CHARS) -> Dict[str, Optional[Dict]]:
+    """
+    Pindai NIK & nama dalam satu pass atas max_chars karakter pertama (None = seluruh teks), berhenti
+    begitu NIK dan nama berlabel ditemukan. Angka 8-15 digit tanpa label hanya dipakai jika tidak ada
+    NIK berlabel; nama dari baris awal dokumen hanya jika tidak ada nama berlabel.
+    Returns: {'nik': hit, 'nama': hit}, hit = {'value', 'confidence', 'position', 'reason'} atau None
+    """
+    if not text:
+        return {'nik': None, 'nama': None}
+    end = len(text) if max_chars is None else min(len(text), max_chars)
+    nik_hit = name_hit = bare_hit = None
+
+    for match in _IDENTITY_SCAN_RE.finditer(text, 0, end):
+        if match.group('nik'):
+            if nik_hit is None:
+                label = " ".join(match.group('nik_label').lower().split())
+                nik_hit = _identity_hit(match.group('nik'), _NIK_LABEL_CONFIDENCE[label], match.start('nik'),
+                                        f"label '{match.group('nik_label')}'")
+        elif match.group('bare_nik'):
+            if bare_hit is None:
+                bare_hit = _identity_hit(match.group('bare_nik'), BARE_NIK_CONFIDENCE, match.start('bare_nik'),
+                                         "angka 8-15 digit tanpa label")
+        elif name_hit is None:
+            nama = " ".join(match.group('nama').split())
+            if len(nama) >= 3:
+                label = " ".join(match.group('name_label').lower().split())
+                name_hit = _identity_hit(nama.title(), _NAME_LABEL_CONFIDENCE[label], match.start('nama'),
+                                         f"label '{match.group('name_label')}'")
+        if nik_hit and name_hit:
             break
-    
-    # Jika tidak ditemukan pattern tertentu, cari di awal dokumen
-    if not nama:
-        lines = text.split('\n')
-        for line in lines[:10]:  # Cari di 10 baris pertama
+
+    if name_hit is None:
+        # Jika tidak ditemukan label nama, baris pendek pertama di awal dokumen diasumsikan nama
+        position = 0
+        for line in text[:end].split('\n', 10)[:10]:
             line_clean = line.strip()
             if len(line_clean) > 3 and len(line_clean.split()) <= 4:
-                # Asumsi ini adalah nama
-                nama = line_clean.title()
+                name_hit = _identity_hit(line_clean.title(), FIRST_LINES_NAME_CONFIDENCE,
+                                         position + line.index(line_clean[0]), "baris pendek di awal dokumen")
+                break
+            position += len(line) + 1
+
+    return {'nik': nik_hit or bare_hit, 'nama': name_hit}
+
+def extract_nik_and_name_from_text(text: str,
+                                   max_chars: Optional[int] = IDENTITY_SCAN_MAX_CHARS) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Mencoba ekstrak NIK dan Nama dari text assessment (lihat scan_identity)
+    Returns: (nik, nama)
+    """
+    hits = scan_identity(text, max_chars)
+    return (hits['nik']['value'] if hits['nik'] else None,
+            hits['nama']['value'] if hits['nama'] else None)
+
+# ==================== LLM RESPONSE CACHE ====================
+class LlmResponseCache:
+    """Cache response LLM di SQLite dengan TTL dan eviction berdasarkan ukuran (LRU)"""
+
+    def __init__(self, path: str, ttl_days: float, max_mb: float):
+        self.path = path
+        self.ttl_seconds = ttl_days * 24 * 3600
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                prompt_version TEXT,
+                response TEXT,
+                size INTEGER,
+                created_at REAL,
+                last_used REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, prompt_version: str, generation_config: Dict, prompt: str,
+                 safety_settings: List[Dict] = None) -> str:
+        """Key = model + versi prompt + generation config + safety settings + hash input"""
+        settings_str = json.dumps({'generation_config': generation_config, 'safety_settings': safety_settings},
+                                  sort_keys=True, default=str)
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return hashlib.sha256(f"{model}|{prompt_version}|{settings_str}|{prompt_hash}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, model: str, prompt_version: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, prompt_version, response, len(response.encode('utf-8')), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Hapus entry kadaluarsa, lalu entry paling lama tidak dipakai sampai ukuran <= max"""
+        self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used").fetchall():
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            total_size -= size
+            if total_size <= self.max_bytes:
+                break
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> Optional[LlmResponseCache]:
+    """Cache response LLM (dibuat saat pertama dipakai), None jika dinonaktifkan atau gagal dibuka"""
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            try:
+                _llm_cache = LlmResponseCache(LLM_CACHE_PATH, LLM_CACHE_TTL_DAYS, LLM_CACHE_MAX_MB)
+            except (sqlite3.Error, OSError) as e:
+                print(f"    ⚠ Cache LLM tidak dapat dibuka: {e}")
+                return None
+        return _llm_cache
+
+def close_llm_cache():
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is not None:
+            _llm_cache.close()
+            _llm_cache = None
+
+atexit.register(close_llm_cache)
+
+# ==================== CANDIDATE REGISTRY ====================
+class CandidateRegistry:
+    """
+    Registry kandidat di SQLite: identitas Assessment per hash isi dokumen, dan hasil per kandidat
+    (hash CV + hash Assessment) berisi hasil matching, referensi teks OCR, setting OCR, analisis LLM,
+    competency, versi prompt dan versi pipeline analisis. Satu NIK (atau, tanpa NIK, satu nama/CV) hanya punya
+    satu entry kandidat: dokumen baru menggantikan yang lama. Entry yang tidak dipakai > ttl_days dihapus.
+    """
+    CANDIDATE_COLUMNS = ['candidate_key', 'nik', 'nama', 'cv_hash', 'assessment_hash', 'match_result',
+                         'ocr_text_ref', 'ocr_settings', 'analysis', 'competency', 'competency_hash',
+                         'prompt_version', 'pipeline_version', 'model', 'updated_at']
+
+    def __init__(self, path: str, ttl_days: float = CANDIDATE_REGISTRY_TTL_DAYS):
+        self.path = path
+        self.ttl_seconds = ttl_days * 24 * 3600
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                content_hash TEXT PRIMARY KEY,
+                nik TEXT,
+                nama TEXT,
+                identity TEXT,
+                updated_at REAL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS candidates (
+                candidate_key TEXT PRIMARY KEY,
+                nik TEXT,
+                cv_hash TEXT,
+                assessment_hash TEXT,
+                match_result TEXT,
+                ocr_text_ref TEXT,
+                analysis TEXT,
+                competency TEXT,
+                competency_hash TEXT,
+                prompt_version TEXT,
+                model TEXT,
+                updated_at REAL
+            )
+        """)
+        # Registry dari versi sebelumnya: tambahkan kolom baru (entry lama tidak punya setting OCR/versi
+        # pipeline sehingga tidak pernah cocok dan akan diproses ulang)
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(candidates)")}
+        for column in ('nama', 'ocr_settings', 'pipeline_version'):
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE candidates ADD COLUMN {column} TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_nik ON candidates (nik)")
+        self._conn.execute("DELETE FROM candidates WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+        self._conn.execute("DELETE FROM documents WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+        self._conn.commit()
+
+    @staticmethod
+    def candidate_key(cv_hash: str, assessment_hash: str) -> str:
+        return hashlib.sha256(f"{cv_hash or ''}|{assessment_hash or ''}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def competency_hash(competencies: Optional[List[Dict]], use_llm: bool) -> str:
+        """Hash data competency + cara memformatnya (lokal / AI)"""
+        payload = json.dumps({'competencies': competencies or [], 'use_llm': bool(use_llm)},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def settings_json(settings: Dict) -> str:
+        """Serialisasi setting OCR yang stabil untuk dibandingkan antar run"""
+        return json.dumps(settings, sort_keys=True, default=str)
+
+    def get_document_identity(self, content_hash: str) -> Optional[Dict]:
+        """Identitas Assessment ({'nik', 'nama', 'stage', 'nik_evidence'}) dari run sebelumnya"""
+        with self._lock:
+            row = self._conn.execute("SELECT identity FROM documents WHERE content_hash = ?",
+                                     (content_hash,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE documents SET updated_at = ? WHERE content_hash = ?",
+                                   (time.time(), content_hash))
+                self._conn.commit()
+        return json.loads(row[0]) if row else None
+
+    def put_document_identity(self, content_hash: str, identity: Dict):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)",
+                               (content_hash, identity.get('nik'), identity.get('nama'),
+                                json.dumps(identity, ensure_ascii=False), time.time()))
+            self._conn.commit()
+
+    def get_candidate(self, cv_hash: str, assessment_hash: str) -> Optional[Dict]:
+        """Entry kandidat untuk pasangan dokumen ini (updated_at diperbarui supaya tidak kena TTL)"""
+        key = self.candidate_key(cv_hash, assessment_hash)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT nik, match_result, ocr_text_ref, ocr_settings, analysis, competency, competency_hash, "
+                "prompt_version, pipeline_version, model FROM candidates WHERE candidate_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE candidates SET updated_at = ? WHERE candidate_key = ?", (time.time(), key))
+            self._conn.commit()
+        return {
+            'nik': row[0],
+            'match_result': json.loads(row[1]),
+            'ocr_text_ref': json.loads(row[2]),
+            'ocr_settings': row[3],
+            'analysis': json.loads(row[4]),
+            'competency': row[5],
+            'competency_hash': row[6],
+            'prompt_version': row[7],
+            'pipeline_version': row[8],
+            'model': row[9],
+        }
+
+    def put_candidate(self, nik: str, nama: str, cv_hash: str, assessment_hash: str, match_result: Dict,
+                      ocr_text_ref: Dict, ocr_settings: str, analysis: Dict, competency: str, competency_hash: str,
+                      prompt_version: str, pipeline_version: str, model: str):
+        key = self.candidate_key(cv_hash, assessment_hash)
+        with self._lock:
+            # Dokumen kandidat berubah: entry lama untuk orang yang sama tidak berlaku lagi. Tanpa NIK,
+            # orang dikenali dari nama atau CV yang sama.
+            if nik:
+                self._conn.execute("DELETE FROM candidates WHERE nik = ? AND candidate_key != ?", (nik, key))
+            else:
+                self._conn.execute("DELETE FROM candidates WHERE COALESCE(nik, '') = '' AND candidate_key != ? "
+                                   "AND (nama = ? OR cv_hash = ?)", (key, nama, cv_hash))
+            values = {
+                'candidate_key': key, 'nik': nik, 'nama': nama, 'cv_hash': cv_hash,
+                'assessment_hash': assessment_hash,
+                'match_result': json.dumps(match_result, ensure_ascii=False, default=str),
+                'ocr_text_ref': json.dumps(ocr_text_ref, ensure_ascii=False), 'ocr_settings': ocr_settings,
+                'analysis': json.dumps(analysis, ensure_ascii=False), 'competency': competency,
+                'competency_hash': competency_hash, 'prompt_version': prompt_version,
+                'pipeline_version': pipeline_version, 'model': model, 'updated_at': time.time(),
+            }
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO candidates ({', '.join(self.CANDIDATE_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in self.CANDIDATE_COLUMNS)})",
+                [values[column] for column in self.CANDIDATE_COLUMNS]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_candidate_registry = None
+_candidate_registry_lock = threading.Lock()
+
+def get_candidate_registry() -> Optional[CandidateRegistry]:
+    """Registry kandidat (dibuat saat pertama dipakai), None jika dinonaktifkan atau gagal dibuka"""
+    global _candidate_registry
+    if not CANDIDATE_REGISTRY_ENABLED:
+        return None
+    with _candidate_registry_lock:
+        if _candidate_registry is None:
+            try:
+                _candidate_registry = CandidateRegistry(CANDIDATE_REGISTRY_PATH)
+            except (sqlite3.Error, OSError) as e:
+                print(f"    ⚠ Registry kandidat tidak dapat dibuka: {e}")
+                return None
+        return _candidate_registry
+
+def close_candidate_registry():
+    global _candidate_registry
+    with _candidate_registry_lock:
+        if _candidate_registry is not None:
+            _candidate_registry.close()
+            _candidate_registry = None
+
+atexit.register(close_candidate_registry)
+
+# ==================== LLM METRICS ====================
+# prompt/output_tokens = token yang benar-benar dikirim ke API (0 untuk cache hit); cached_tokens = estimasi
+# token yang dihemat cache. call_share = porsi panggilan (1/n untuk tiap kandidat dalam request batch)
+LLM_METRIC_COLUMNS = ['model', 'category', 'candidate', 'call_share', 'prompt_tokens', 'output_tokens',
+                      'cached_tokens', 'tokens_estimated', 'latency_seconds', 'wait_seconds', 'retries',
+                      'cache_hit', 'error']
+# Kolom yang dibagi rata ke kandidat dalam satu request batch
+_LLM_METRIC_SPLIT_COLUMNS = ('prompt_tokens', 'output_tokens', 'cached_tokens', 'latency_seconds', 'wait_seconds',
+                             'retries')
+
+class LlmMetricsRecorder:
+    """Catatan per panggilan llm_generate (thread-safe) untuk satu run; diagregasi per kategori dan kandidat"""
+
+    def __init__(self):
+        self._records = []
+        self._lock = threading.Lock()
+
+    def record(self, **values):
+        """candidate berupa list (request batch): satu baris per kandidat dengan porsi panggilan yang sama"""
+        candidates = values.get('candidate')
+        if not isinstance(candidates, (list, tuple)) or not candidates:
+            candidates = [candidates or None]
+        share = 1 / len(candidates)
+        rows = []
+        for candidate in candidates:
+            row = {column: values.get(column) for column in LLM_METRIC_COLUMNS}
+            row.update(candidate=candidate, call_share=share)
+            for column in _LLM_METRIC_SPLIT_COLUMNS:
+                row[column] = (row[column] or 0) * share
+            rows.append(row)
+        with self._lock:
+            self._records.extend(rows)
+
+    def reset(self):
+        with self._lock:
+            self._records = []
+
+    def records_frame(self) -> pd.DataFrame:
+        with self._lock:
+            return pd.DataFrame(list(self._records), columns=LLM_METRIC_COLUMNS)
+
+    @staticmethod
+    def _aggregate(frame: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+        # Panggilan/cache hit/error dihitung berbobot porsi panggilan (request batch dibagi ke kandidatnya)
+        frame = frame.assign(cache_hit=frame['cache_hit'].astype(float) * frame['call_share'],
+                             error=frame['error'].astype(float) * frame['call_share'])
+        grouped = frame.groupby(keys, sort=False)
+        table = grouped.agg(
+            calls=('call_share', 'sum'),
+            cache_hits=('cache_hit', 'sum'),
+            errors=('error', 'sum'),
+            retries=('retries', 'sum'),
+            prompt_tokens=('prompt_tokens', 'sum'),
+            output_tokens=('output_tokens', 'sum'),
+            cached_tokens=('cached_tokens', 'sum'),
+            latency_total_s=('latency_seconds', 'sum'),
+            latency_p95_s=('latency_seconds', lambda values: values.quantile(0.95)),
+        ).reset_index()
+        table.insert(table.columns.get_loc('latency_p95_s'), 'latency_avg_s',
+                     table['latency_total_s'] / table['calls'])
+        for column in ('prompt_tokens', 'output_tokens', 'cached_tokens'):
+            table[column] = table[column].round().astype(int)
+        for column in ('calls', 'cache_hits', 'errors', 'retries'):
+            table[column] = table[column].round(2)
+        return table.sort_values('latency_total_s', ascending=False).round(3)
+
+    def summary_by_category(self) -> pd.DataFrame:
+        frame = self.records_frame()
+        if frame.empty:
+            return frame
+        return self._aggregate(frame, ['model', 'category'])
+
+    def summary_by_candidate(self) -> pd.DataFrame:
+        frame = self.records_frame()
+        if frame.empty:
+            return frame
+        return self._aggregate(frame.fillna({'candidate': '-'}), ['candidate'])
+
+LLM_METRICS = LlmMetricsRecorder()
+_llm_call_context = threading.local()
+
+@contextmanager
+def llm_call_context(candidate: Union[str, List[str]]):
+    """
+    Tandai panggilan LLM di thread ini sebagai milik `candidate` (untuk metrik per kandidat);
+    list kandidat untuk request batch (metrik dibagi rata ke kandidat tersebut)
+    """
+    previous = getattr(_llm_call_context, 'candidate', None)
+    _llm_call_context.candidate = candidate
+    try:
+        yield
+    finally:
+        _llm_call_context.candidate = previous
+
+def reset_llm_metrics():
+    """Reset metrik LLM untuk run baru"""
+    LLM_METRICS.reset()
+
+def format_llm_metrics() -> str:
+    """Ringkasan metrik LLM satu run, kategori paling mahal (waktu total) di atas"""
+    table = LLM_METRICS.summary_by_category()
+    if table.empty:
+        return "Tidak ada panggilan LLM"
+    lines = []
+    for row in table.itertuples(index=False):
+        lines.append(f"{row.category:<28}: {row.calls:g} panggilan ({row.cache_hits:g} cache, "
+                     f"{row.cached_tokens:,} token dihemat), "
+                     f"token {row.prompt_tokens:,} in / {row.output_tokens:,} out, "
+                     f"latency total {row.latency_total_s:.1f}s (rata-rata {row.latency_avg_s:.2f}s), "
+                     f"retry {row.retries:g}, gagal {row.errors:g}")
+    return "\n".join(lines)
+
+def save_llm_metrics(path: str) -> Optional[str]:
+    """Simpan metrik LLM (per kategori, per kandidat, detail panggilan) ke Excel. Returns: path atau None"""
+    detail = LLM_METRICS.records_frame()
+    if detail.empty:
+        return None
+    try:
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            LLM_METRICS.summary_by_category().to_excel(writer, index=False, sheet_name='Per Kategori')
+            LLM_METRICS.summary_by_candidate().to_excel(writer, index=False, sheet_name='Per Kandidat')
+            detail.round(3).to_excel(writer, index=False, sheet_name='Detail Panggilan')
+    except Exception as e:
+        print(f"⚠ Gagal menyimpan metrik LLM: {e}")
+        return None
+    return path
+
+# ==================== LLM DISPATCH ====================
+class TokenBucketLimiter:
+    """Rate limiter token bucket (thread-safe) untuk batas request/menit dan token/menit sekaligus"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_allowance = float(requests_per_minute)
+        self._token_allowance = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._request_allowance = min(self.requests_per_minute,
+                                      self._request_allowance + elapsed * self.requests_per_minute / 60)
+        self._token_allowance = min(self.tokens_per_minute,
+                                    self._token_allowance + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int) -> float:
+        """Tunggu sampai ada kuota untuk satu request dengan estimasi `tokens`. Returns: detik menunggu"""
+        # Request yang lebih besar dari kapasitas bucket tetap boleh jalan setelah bucket penuh
+        tokens = min(tokens, self.tokens_per_minute)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._request_allowance >= 1 and self._token_allowance >= tokens:
+                    self._request_allowance -= 1
+                    self._token_allowance -= tokens
+                    return waited
+                delay = max((1 - self._request_allowance) * 60 / self.requests_per_minute,
+                            (tokens - self._token_allowance) * 60 / self.tokens_per_minute,
+                            0.01)
+            time.sleep(delay)
+            waited += delay
+
+LLM_RATE_LIMITER = TokenBucketLimiter(LLM_RPM, LLM_TPM)
+
+def estimate_tokens(text: str) -> int:
+    """Estimasi kasar jumlah token (~4 karakter per token) tanpa memanggil API count_tokens"""
+    return len(text) // 4 + 1
+
+class LlmBackend:
+    """
+    Interface backend LLM: generate() mengembalikan teks response atau melempar exception dari API.
+    last_usage() boleh mengembalikan (prompt_tokens, output_tokens) dari panggilan terakhir di thread ini.
+    """
+    name = 'base'
+    model_name = ''
+
+    def generate(self, prompt: str, generation_config: Dict, safety_settings: List[Dict] = None) -> str:
+        raise NotImplementedError
+
+    def last_usage(self) -> Optional[Tuple[int, int]]:
+        return None
+
+class GeminiBackend(LlmBackend):
+    """
+    Google Gemini lewat google.generativeai. GenerativeModel dibuat sekali per kombinasi generation config +
+    safety settings lalu dipakai ulang oleh semua thread; semua model berbagi client default genai
+    (koneksi ke API tetap hidup antar request).
+    """
+    name = 'gemini'
+
+    def __init__(self, api_key: str = None, model_name: str = None):
+        self.model_name = model_name or GEMINI_MODEL
+        genai.configure(api_key=api_key or GEMINI_API_KEY)
+        self._models = {}
+        self._lock = threading.Lock()
+        self._usage = threading.local()
+
+    def get_model(self, generation_config: Dict, safety_settings: List[Dict] = None):
+        key = json.dumps({'generation_config': generation_config, 'safety_settings': safety_settings},
+                         sort_keys=True, default=str)
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = genai.GenerativeModel(
+                        model_name=self.model_name,
+                        generation_config=generation_config,
+                        safety_settings=safety_settings
+                    )
+                    self._models[key] = model
+        return model
+
+    def generate(self, prompt, generation_config, safety_settings=None):
+        self._usage.value = None
+        response = self.get_model(generation_config, safety_settings).generate_content(prompt)
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            self._usage.value = (usage.prompt_token_count, usage.candidates_token_count)
+        try:
+            return response.text
+        except ValueError:
+            # Response diblokir safety filter / tanpa kandidat: bukan error yang perlu di-retry
+            return ""
+
+    def last_usage(self):
+        return getattr(self._usage, 'value', None)
+
+class FakeLlmBackend(LlmBackend):
+    """
+    Backend lokal tanpa jaringan untuk load test: response realistis sesuai jenis prompt, dengan latency
+    (detik, +/- jitter) dan error rate (429/503 seperti Gemini) yang bisa diatur.
+    """
+    name = 'fake'
+    model_name = 'fake-llm'
+
+    SAMPLE_FIELDS = {
+        'education': "S1 Teknik Industri, Institut Teknologi Bandung | S2 Master of Business Administration, "
+                     "Universitas Indonesia",
+        'experience': "Direktur Commercial\nPT Telekomunikasi Selular\n2021 – Saat ini\n\n"
+                      "Head of Human Capital Management\nPT Finnet Indonesia\n2020 – 2021\n\n"
+                      "VP Human Capital Management\nPT Jalin Pembayaran Nusantara\n2018 – 2020\n\n"
+                      "SO Human Capital\nPT Jalin Pembayaran Nusantara\n2017 – 2018",
+        'business_impact': "• Led a major organizational transformation project\n"
+                           "• Enhanced Total Rewards framework\n"
+                           "• Standardized Human Capital policies company-wide\n"
+                           "• Revamped Procurement policies and procedures\n"
+                           "• Implemented SAP-based HCIS platform",
+        'position': "Direktur Commercial",
+        'summary_executive': "Profesional berpengalaman 15+ tahun di bidang Human Capital Management dengan "
+                             "track record memimpin transformasi organisasi. Saat ini menjabat sebagai Direktur "
+                             "Commercial di PT Telekomunikasi Selular. Memiliki keahlian kuat dalam strategic "
+                             "planning dan talent management.",
+    }
+
+    def __init__(self, latency_seconds: float = None, error_rate: float = None, jitter: float = 0.3,
+                 seed: int = None):
+        self.latency_seconds = FAKE_LLM_LATENCY_MS / 1000 if latency_seconds is None else latency_seconds
+        self.error_rate = FAKE_LLM_ERROR_RATE if error_rate is None else error_rate
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, generation_config, safety_settings=None):
+        with self._lock:
+            delay = self.latency_seconds * (1 + self._random.uniform(-self.jitter, self.jitter))
+            failure = self._random.random() < self.error_rate
+            error_class = self._random.choice([google_exceptions.ResourceExhausted,
+                                               google_exceptions.ServiceUnavailable])
+        time.sleep(max(0.0, delay))
+        if failure:
+            raise error_class("fake backend: simulated quota/overload error")
+
+        schema = generation_config.get('response_schema')
+        if schema and schema.get('type') == 'ARRAY':
+            fields = schema['items']['properties']
+            candidate_ids = re.findall(r'^<<<KANDIDAT (\S+)>>>$', prompt, re.MULTILINE)
+            return json.dumps([{field: candidate_id if field == 'candidate_id' else self.SAMPLE_FIELDS.get(field, "")
+                                for field in fields} for candidate_id in candidate_ids], ensure_ascii=False)
+        if schema:
+            return json.dumps({field: self.SAMPLE_FIELDS.get(field, "") for field in schema.get('properties', {})},
+                              ensure_ascii=False)
+
+        competencies = re.findall(r'^\s*- (.+?) \(Level (\d)/5\)', prompt, re.MULTILINE)
+        if competencies:
+            return format_competency_bullets([{'competency': name, 'level': int(level)}
+                                              for name, level in competencies])
+
+        for category, prompt_template in ANALYSIS_PROMPTS.items():
+            if prompt.startswith(prompt_template[:80]):
+                return self.SAMPLE_FIELDS.get(category, "")
+        return "Tidak dapat menganalisis dengan AI"
+
+_llm_backend = None
+_llm_backend_lock = threading.Lock()
+
+def get_llm_backend() -> LlmBackend:
+    """Backend LLM milik proses ini (LLM_BACKEND), dibuat saat pertama dipakai"""
+    global _llm_backend
+    with _llm_backend_lock:
+        if _llm_backend is None:
+            if LLM_BACKEND == 'fake':
+                _llm_backend = FakeLlmBackend()
+            else:
+                if LLM_BACKEND != 'gemini':
+                    print(f"    ⚠ Backend LLM '{LLM_BACKEND}' tidak dikenal, menggunakan gemini")
+                _llm_backend = GeminiBackend()
+        return _llm_backend
+
+def set_llm_backend(backend: Optional[LlmBackend]):
+    """Ganti backend LLM (mis. FakeLlmBackend untuk benchmark); None = kembali ke LLM_BACKEND"""
+    global _llm_backend
+    with _llm_backend_lock:
+        _llm_backend = backend
+
+class LlmRequestError(Exception):
+    """Request LLM tetap gagal setelah retry; field terkait dimasukkan ulang ke antrian oleh pemanggil"""
+
+    def __init__(self, message: str, retries: int = 0, wait_seconds: float = 0.0):
+        super().__init__(message)
+        self.retries = retries
+        self.wait_seconds = wait_seconds
+
+# Status HTTP yang menandakan kuota/overload sementara (layak di-retry)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def is_retryable_llm_error(error: Exception) -> bool:
+    if isinstance(error, google_exceptions.GoogleAPICallError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (google_exceptions.RetryError, ConnectionError, TimeoutError))
+
+class AdaptiveConcurrencyController:
+    """
+    Batas request LLM bersamaan yang adaptif (AIMD) + circuit breaker.
+    - sukses: limit naik ~1 per satu "window" request (additive increase)
+    - 429/5xx: limit dibagi dua, maksimal sekali per cooldown (multiplicative decrease)
+    - kegagalan sementara (throttle/transient) beruntun >= breaker_threshold: semua request ditahan selama
+      breaker_cooldown. Error permanen (request salah, safety block, API key salah) tidak dihitung, supaya
+      prompt yang memang gagal tidak menghentikan worker lain
+    """
+
+    def __init__(self, initial_limit: int, max_limit: int, breaker_threshold: int, breaker_cooldown: float):
+        self.max_limit = max_limit
+        self.limit = float(initial_limit)
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._in_flight = 0
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if now < self._open_until:
+                    self._condition.wait(self._open_until - now)
+                    continue
+                if self._in_flight < int(self.limit):
+                    self._in_flight += 1
+                    return
+                self._condition.wait()
+
+    def release(self, throttled: bool = False, failed: bool = False):
+        """
+        throttled: error sementara (429/5xx/timeout) -> limit turun dan dihitung untuk circuit breaker.
+        failed (tanpa throttled): error permanen -> limit dan hitungan kegagalan beruntun tidak berubah.
+        """
+        with self._condition:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self._last_decrease > 1.0:
+                    self.limit = max(1.0, self.limit / 2)
+                    self._last_decrease = now
+                self._consecutive_failures += 1
+                if self._consecutive_failures >= self.breaker_threshold:
+                    print(f"    ⚠ Circuit breaker LLM terbuka: {self._consecutive_failures} kegagalan beruntun, "
+                          f"jeda {self.breaker_cooldown:.0f} detik")
+                    self._open_until = now + self.breaker_cooldown
+                    self._consecutive_failures = 0
+            elif not failed:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+                self._consecutive_failures = 0
+            self._condition.notify_all()
+
+LLM_CONCURRENCY_CONTROLLER = AdaptiveConcurrencyController(LLM_CONCURRENCY, LLM_MAX_CONCURRENCY,
+                                                           LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN_SECONDS)
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff dengan full jitter (detik) untuk percobaan ke-attempt (mulai 0)"""
+    return random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+def _call_llm_with_retry(backend: LlmBackend, prompt: str, generation_config: Dict,
+                        safety_settings: Optional[List[Dict]], estimated_tokens: int) -> Tuple[str, int, float]:
+    """
+    backend.generate di bawah limiter + controller; error sementara di-retry dengan backoff.
+    Returns: (teks, jumlah retry, detik menunggu limiter + backoff)
+    """
+    waited = 0.0
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        waited += LLM_RATE_LIMITER.acquire(estimated_tokens)
+        LLM_CONCURRENCY_CONTROLLER.acquire()
+        try:
+            text = backend.generate(prompt, generation_config, safety_settings)
+        except Exception as e:
+            retryable = is_retryable_llm_error(e)
+            LLM_CONCURRENCY_CONTROLLER.release(throttled=retryable, failed=True)
+            if not retryable or attempt == LLM_MAX_RETRIES:
+                raise LlmRequestError(str(e), retries=attempt, wait_seconds=waited) from e
+            delay = backoff_delay(attempt)
+            print(f"    ⚠ LLM sibuk/kuota habis ({e.__class__.__name__}), retry dalam {delay:.1f} detik")
+            time.sleep(delay)
+            waited += delay
+            continue
+        LLM_CONCURRENCY_CONTROLLER.release()
+        return text, attempt, waited
+
+def llm_generate(prompt: str, generation_config: Dict, safety_settings: List[Dict] = None,
+                 use_cache: bool = True, category: str = None) -> str:
+    """
+    Teks response LLM untuk satu prompt: dari cache jika ada, jika tidak panggil backend aktif
+    (get_llm_backend) setelah mendapat kuota dari limiter bersama. use_cache=False melewati pembacaan cache tetapi
+    response baru tetap disimpan (refresh). Response kosong tidak disimpan ke cache.
+    Setiap panggilan dicatat di LLM_METRICS dengan label `category` dan kandidat dari llm_call_context.
+    Raises: LlmRequestError jika request tetap gagal setelah retry
+    """
+    try:
+        backend = get_llm_backend()
+    except Exception as e:
+        raise LlmRequestError(f"inisialisasi backend LLM gagal: {e}") from e
+
+    started = time.perf_counter()
+    metric = {'model': backend.model_name, 'category': category or '-',
+              'candidate': getattr(_llm_call_context, 'candidate', None),
+              'prompt_tokens': estimate_tokens(prompt), 'output_tokens': 0, 'cached_tokens': 0,
+              'tokens_estimated': True, 'wait_seconds': 0.0, 'retries': 0, 'cache_hit': False, 'error': False}
+
+    cache = get_llm_cache()
+    cache_key = None
+    if cache is not None:
+        cache_key = LlmResponseCache.make_key(backend.model_name, PROMPT_VERSION, generation_config, prompt,
+                                              safety_settings)
+        cached = None
+        if use_cache:
+            try:
+                cached = cache.get(cache_key)
+            except sqlite3.Error as e:
+                print(f"    ⚠ Cache LLM tidak dapat dibaca: {e}")
+        if cached is not None:
+            # Cache hit tidak memakai token API: estimasi token yang dihemat dicatat terpisah
+            metric.update(cache_hit=True, cached_tokens=metric['prompt_tokens'] + estimate_tokens(cached),
+                          prompt_tokens=0)
+            LLM_METRICS.record(**metric, latency_seconds=time.perf_counter() - started)
+            return cached
+
+    try:
+        text, retries, waited = _call_llm_with_retry(
+            backend, prompt, generation_config, safety_settings,
+            metric['prompt_tokens'] + generation_config.get('max_output_tokens', 1024))
+    except LlmRequestError as e:
+        metric.update(error=True, retries=e.retries, wait_seconds=e.wait_seconds)
+        LLM_METRICS.record(**metric, latency_seconds=time.perf_counter() - started)
+        raise
+    metric.update(retries=retries, wait_seconds=waited, output_tokens=estimate_tokens(text) if text else 0)
+    usage = backend.last_usage()
+    if usage:
+        metric.update(prompt_tokens=usage[0], output_tokens=usage[1], tokens_estimated=False)
+    LLM_METRICS.record(**metric, latency_seconds=time.perf_counter() - started)
+
+    if cache_key and text:
+        try:
+            cache.put(cache_key, backend.model_name, PROMPT_VERSION, text)
+        except sqlite3.Error as e:
+            print(f"    ⚠ Gagal menyimpan cache LLM: {e}")
+    return text
+
+def dispatch_llm_jobs(func, items: List, workers: int = None) -> List:
+    """
+    Jalankan func(item) untuk banyak kandidat secara paralel (thread), hasil sesuai urutan input.
+    Jumlah thread = batas atas; jumlah request yang benar-benar jalan diatur LLM_CONCURRENCY_CONTROLLER.
+    """
+    workers = min(workers or LLM_MAX_CONCURRENCY, len(items)) if items else 1
+    if workers <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm") as executor:
+        return list(executor.map(func, items))
+
+# ==================== PROMPT COMPACTION ====================
+_DOCUMENT_MARKER_RE = re.compile(r'^=== (.+) ===$')
+_NORMALIZE_LINE_RE = re.compile(r'[\d\W_]+')
+
+def _is_noise_line(line: str) -> bool:
+    """Baris sisa OCR: terlalu pendek atau didominasi simbol"""
+    stripped = line.strip()
+    alnum = sum(ch.isalnum() for ch in stripped)
+    return alnum < 2 or alnum / len(stripped) < 0.5
+
+def clean_document_text(text: str, repeat_threshold: int = 3, min_repeat_gap: int = 15) -> str:
+    """
+    Bersihkan teks OCR sebelum dikirim ke LLM: buang baris noise, header/footer halaman dan paragraf
+    duplikat. Header/footer = baris (angka diabaikan) yang muncul >= repeat_threshold kali dengan jarak
+    >= min_repeat_gap baris antar kemunculan; hanya kemunculan pertama yang disimpan. Syarat jarak
+    mencegah nama perusahaan yang berulang di riwayat jabatan ikut terbuang.
+    """
+    lines = text.split('\n')
+    normalized = [_NORMALIZE_LINE_RE.sub(' ', line.lower()).strip() for line in lines]
+    positions = defaultdict(list)
+    for index, key in enumerate(normalized):
+        if key:
+            positions[key].append(index)
+    page_furniture = {
+        key for key, indexes in positions.items()
+        if len(indexes) >= repeat_threshold
+        and min(b - a for a, b in zip(indexes, indexes[1:])) >= min_repeat_gap
+    }
+
+    kept_lines = []
+    seen_repeated = set()
+    for line, key in zip(lines, normalized):
+        if _DOCUMENT_MARKER_RE.match(line.strip()):
+            kept_lines.append(line.strip())
+            continue
+        if not line.strip():
+            kept_lines.append("")
+            continue
+        if _is_noise_line(line):
+            continue
+        if key in page_furniture:
+            if key in seen_repeated:
+                continue
+            seen_repeated.add(key)
+        kept_lines.append(line.rstrip())
+
+    # Paragraf duplikat (mis. CV yang ter-scan dua kali) hanya disimpan sekali
+    paragraphs = re.split(r'\n\s*\n', "\n".join(kept_lines))
+    seen_paragraphs = set()
+    unique_paragraphs = []
+    for paragraph in paragraphs:
+        key = " ".join(paragraph.lower().split())
+        if not key:
+            continue
+        if len(key) > 40 and key in seen_paragraphs:
+            continue
+        seen_paragraphs.add(key)
+        unique_paragraphs.append(paragraph.strip('\n'))
+    return "\n\n".join(unique_paragraphs)
+
+_HEADING_PREFIX_RE = re.compile(r'^(?:[0-9]+[.)]|[ivxIVX]+[.)]|[A-Ea-e][.)]|[•\-*#]+)\s*')
+_HEADING_WORD_RE = re.compile(r"[^\W\d_]+")
+
+def _section_for_heading(line: str) -> Optional[str]:
+    """
+    Nama section jika baris adalah judul section yang berdiri sendiri, else None. Judul = seluruh baris hanya
+    berisi kata kunci section (+ kata pelengkap), ATAU baris kapital / berakhiran ':' yang memuat kata kunci
+    dan bukan nama jabatan. "Business Development Manager" / "Training Specialist" bukan judul.
+    """
+    stripped = _HEADING_PREFIX_RE.sub('', line.strip())
+    has_colon = stripped.endswith(':')
+    stripped = stripped.rstrip(':').strip()
+    if not stripped or len(stripped) > 60 or len(stripped.split()) > 6 or stripped.endswith('.'):
+        return None
+    lowered = stripped.lower()
+    words = _HEADING_WORD_RE.findall(lowered)
+    if not words:
+        return None
+
+    for section, keywords in SECTION_HEADINGS.items():
+        matched = [keyword for keyword in keywords if re.search(rf'\b{keyword}s?\b', lowered)]
+        if not matched:
+            continue
+        keyword_words = {word for keyword in matched for word in keyword.split()}
+        standalone = all(word in keyword_words or word.rstrip('s') in keyword_words
+                         or word in SECTION_HEADING_FILLER_WORDS for word in words)
+        if standalone:
+            return section
+        if (stripped.isupper() or has_colon) and not SECTION_HEADING_ROLE_WORDS.intersection(words):
+            return section
+    return None
+
+def split_document_sections(text: str) -> List[Tuple[str, str, str]]:
+    """
+    Pecah teks gabungan CV/Assessment menjadi section berurutan.
+    Returns: list (dokumen, nama section, teks section)
+    """
+    sections = []
+    document, section, buffer = "", 'header', []
+
+    def flush():
+        body = "\n".join(buffer).strip()
+        if body:
+            sections.append((document, section, body))
+
+    for line in text.split('\n'):
+        marker = _DOCUMENT_MARKER_RE.match(line.strip())
+        if marker:
+            flush()
+            document, section, buffer = marker.group(1), 'header', []
+            continue
+        heading = _section_for_heading(line)
+        if heading:
+            flush()
+            section, buffer = heading, [line]
+            continue
+        buffer.append(line)
+    flush()
+    return sections
+
+def compact_text_for_fields(text_content: str, fields: List[str], token_budget: int) -> str:
+    """
+    Pilih section yang relevan untuk field-field analisis dalam batas token_budget, dengan urutan
+    prioritas FIELD_SECTION_PRIORITY. Jika section utama suatu field tidak ditemukan (CV tanpa judul
+    section yang dikenali), sisa teks ikut diisi sesuai urutan dokumen sampai budget habis.
+    """
+    sections = split_document_sections(clean_document_text(text_content))
+    available = {name for _, name, _ in sections}
+
+    priority = []
+    for field in fields:
+        for name in FIELD_SECTION_PRIORITY.get(field, []):
+            if name not in priority:
+                priority.append(name)
+    fallback = any(FIELD_SECTION_PRIORITY.get(field, ['header'])[0] not in available for field in fields)
+    if fallback:
+        priority.extend(name for _, name, _ in sections if name not in priority)
+
+    budget_chars = token_budget * 4
+    selected = set()
+    used_chars = 0
+    for name in priority:
+        for index, (_, section_name, body) in enumerate(sections):
+            if section_name != name or index in selected:
+                continue
+            remaining = budget_chars - used_chars
+            if remaining <= 0:
                 break
+            if section_name == 'header' and not fallback:
+                # Header cukup untuk identitas & profil singkat; isi laporan tanpa judul tidak ikut
+                remaining = min(remaining, ANALYSIS_HEADER_MAX_CHARS)
+            if len(body) > remaining:
+                body = body[:remaining] + "..."
+                sections[index] = (sections[index][0], section_name, body)
+            selected.add(index)
+            used_chars += len(body)
+
+    # Susun ulang sesuai urutan dokumen supaya konteks (CV vs Assessment) tetap jelas
+    parts = []
+    current_document = None
+    for index in sorted(selected):
+        document, _, body = sections[index]
+        if document and document != current_document:
+            parts.append(f"=== {document} ===")
+            current_document = document
+        parts.append(body)
+    return "\n\n".join(parts)
+
+def generate_competency_with_ai(competencies_list: List[Dict], use_cache: bool = True) -> str:
+    """
+    Menggunakan AI untuk membuat Skills (Competency) dari data Excel
+    use_cache: False untuk bypass cache response LLM
+    """
+    if not competencies_list:
+        return ""
+    
+    # Format data competency untuk AI
+    competency_data = "\n".join([
+        f"- {comp['competency']} (Level {comp['level']}/5)"
+        for comp in competencies_list
+    ])
+    
+    prompt = f"""Dari data competency Excel berikut, identifikasi dan format kompetensi kandidat dalam Bahasa Indonesia. Ambil maksimal 10 kompetensi dengan level minimal 2.
+
+        Data Competency:
+        {competency_data}
+        
+        ATURAN SANGAT PENTING:
+        1. Urutkan dari level tertinggi ke terendah
+        2. Hanya ambil kompetensi dengan level >= 2
+        3. Format: • [Nama Kompetensi] (Lvl. [X]/5) hanya berikan spasi setelah bullet point
+        4. Maksimal 10 kompetensi
+        5. Jangan ada penjelasan tambahan, langsung ke poin-poin
+        6. jangan gunakan \t setelah bullet point, cukup spasi saja jadi bullet pointnya seperti ini "• Career Planning & Succession Management (Lvl. 4/5)" tanpa tab setelah bullet pointnya
+        
+        Format output yang diharapkan (urutkan dari level tertinggi ke terendah):
+        • Career Planning & Succession Management (Lvl. 4/5)
+        • Employee Performance Management (Lvl. 4/5)
+        • Human Capital Strategy (Lvl. 4/5)
+        • Industrial Relations Management (Lvl. 3/5)
+        • Learning Management & Development (Lvl. 3/5)
+        • Organization Planning & Development (Lvl. 3/5)
+        • Talent Scouting & Acquisition (Lvl. 2/5)
+
+        Output:"""
+    
+    generation_config = {
+        "temperature": 0.2,
+        "top_p": 0.8,
+        "top_k": 40,
+        "max_output_tokens": 1024,
+    }
     
-    return nik, nama
+    try:
+        response_text = llm_generate(prompt, generation_config, use_cache=use_cache, category='competency')
+        
+        if response_text:
+            return response_text.strip()
+        else:
+            # Fallback ke format manual
+            return format_competency_bullets(competencies_list)
+            
+    except Exception as e:
+        print(f"    Error generating competency with AI: {e}")
+        # Fallback ke format manual
+        return format_competency_bullets(competencies_list)
+
+# Prompt per field analisis (mode per_category memakai prompt ini apa adanya, mode combined menggabungkan instruksinya)
+ANALYSIS_PROMPTS = {
+    'education': """
+    Dari teks CV/penilaian berikut, ekstrak informasi tentang pendidikan dalam Bahasa Indonesia:
+    1. Gelar pendidikan tertinggi
+    2. Institusi pendidikan
+    3. Tahun lulus
+    4. Jurusan/field study
+    5. Usahakan jika ada S1 maka tampilkan S1 terlebih dahulu baru S2 jika ada S2
+    
+    Format output yang diharapkan: "S1 Teknik Informatika, ITB | S2 Master of Business Administration, ITB"
+    Hanya tampilkan yang memang ada saja, jika tidak ada jangan ditampilkan dan jika ada S1 maka tampilkan terlebih dahulu yang S1 baru S2 jika S1 tidak ada maka gunakan template seperti ini "S1 Teknik Informatika, ITB" atau pada S2 seperti ini "S2 Master of Business Administration, ITB"
+    Jangan gunakan bintang atau poin-poin, langsung format string seperti contoh.
+    
+    Teks yang akan dianalisis:
+    """,
+    
+    'experience': """
+    Dari teks CV/penilaian berikut, ekstrak informasi tentang pengalaman kerja dalam Bahasa Indonesia:
+    Ambil 4 posisi jabatan terakhir saja.
+    
+    Format output yang diharapkan:
+    Direktur Commercial
+    PT Telekomunikasi Selular
+    2021 – Saat ini
+    
+    Head of Human Capital Management 
+    PT Finnet Indonesia
+    2020 – 2021
+    
+    VP Human Capital Management 
+    PT Jalin Pembayaran Nusantara 
+    2018 – 2020
+    
+    SO Human Capital
+    PT Jalin Pembayaran Nusantara
+    2017 – 2018
+    
+    Jangan ada preambles pada awal jawaban jadi langsung pada 4 posisi jabatan terakhirnya, jangan gunakan bintang untuk poin-poinnya, jangan tampilkan reasoning, langsung format seperti contoh dan untuk setiap posisi jabatan pergunakan huruf kapital diawalnya saja misal SO Human Capital serta nama companynya juga huruf awalnya saja untuk huruf PT tetap besar misal PT Telkom Indonesia
+    
+    Teks yang akan dianalisis:
+    """,
+    
+    'business_impact': """
+    Dari teks CV/penilaian berikut, identifikasi potensi dampak bisnis dalam Bahasa Inggris:
+    Ambil top 5 business impact.
+
+    ATURAN SANGAT PENTING:
+    - DILARANG KERAS menulis: "Berikut adalah", "Berdasarkan teks", "Top 5", atau penjelasan apapun
+    - LANGSUNG mulai dengan bullet point pertama
+    - HARUS tepat 5 poin
+    - Format: • [Dampak bisnis]
+    - Hanya kalimat singkat pada dampak bisnis saja seperti 5-7 kata saja, tanpa tambahan konteks atau penjelasan lainnya jadi to the point saja pada business impactnya
+    
+    Format output yang diharapkan:
+    • Led a major organizational transformation project
+    • Enhanced Total Rewards framework
+    • Established, updated, and standardized Human Capital policies
+    • Revamped Procurement policies and procedures
+    • Redesigned and enhanced workplace areas
+    
+    Jangan ada preambles atau penjelasan pada awal response seperti "Berikut adalah top 5 potensi dampak bisnis yang diidentifikasi dari teks CV/penilaian:" hilangkan dan tidak usah digunakan saja jadi response jawaban seperti itu sehingga langsung ke poin-poin business impactnya.
+    
+    Teks yang akan dianalisis:
+    """,
+    
+    'position': """
+    Dari teks CV/penilaian berikut, identifikasi POSISI TERAKHIR/JABATAN TERAKHIR dalam Bahasa Indonesia:
+    Hanya ambil satu posisi terakhir saja.
+    
+    Contoh output:
+    Direktur Commercial
+    
+    atau
+    
+    Head of Human Capital Management
+    
+    Hanya berikan jawaban singkat nama posisinya saja, tanpa penjelasan tambahan.
+    
+    Teks yang akan dianalisis:
+    """,
+    
+    'summary_executive': """
+    Dari teks CV dan Assessment berikut, buatlah Summary Executive profesional dalam Bahasa Indonesia.
+    
+    Persyaratan:
+    1. Panjang: 3-5 kalimat
+    2. Highlight: Posisi terakhir, pengalaman tahun, keahlian utama, pencapaian signifikan
+    3. Tone: Profesional dan ringkas
+    4. Fokus pada value dan kontribusi kandidat
+    
+    Contoh format:
+    "Profesional berpengalaman 15+ tahun di bidang Human Capital Management dengan track record memimpin transformasi organisasi di perusahaan telekomunikasi dan fintech. Saat ini menjabat sebagai Direktur Commercial di PT Telekomunikasi Selular, sebelumnya sebagai Head of Human Capital Management di PT Finnet Indonesia. Memiliki keahlian kuat dalam strategic planning, talent management, dan organizational development. Sukses mengimplementasikan SAP-Based HCIS dan meningkatkan employee engagement hingga 85%. Pendidikan S2 Master of Business Administration dari ITB dengan spesialisasi Strategic Management."
+    
+    Jangan ada preambles, langsung summary executive-nya.
+    
+    Teks yang akan dianalisis:
+    """,
+    
+    'skills_competency': """
+    Dari data competency Excel berikut, identifikasi dan format kompetensi kandidat dalam Bahasa Indonesia. Ambil maksimal 10 kompetensi dengan level minimal 2.
+
+    ATURAN SANGAT PENTING:
+    1. Urutkan dari level tertinggi ke terendah
+    2. Hanya ambil kompetensi dengan level >= 2
+    3. Format: • [Nama Kompetensi] (Lvl. [X]/5) hanya berikan spasi setelah bullet point
+    4. Maksimal 10 kompetensi
+    5. Jangan ada penjelasan tambahan, langsung ke poin-poin
+    6. jangan gunakan \t setelah bullet point, cukup spasi saja jadi bullet pointnya seperti ini "• Career Planning & Succession Management (Lvl. 4/5)" tanpa tab setelah bullet pointnya
+
+    Format output yang diharapkan (urutkan dari level tertinggi ke terendah):
+    • Career Planning & Succession Management (Lvl. 4/5)
+    • Employee Performance Management (Lvl. 4/5)
+    • Human Capital Strategy (Lvl. 4/5)
+    • Industrial Relations Management (Lvl. 3/5)
+    • Learning Management & Development (Lvl. 3/5)
+    • Organization Planning & Development (Lvl. 3/5)
+    • Talent Scouting & Acquisition (Lvl. 2/5)
+
+    Output:
+    """
+}
+
+# Field analisis yang diambil dari teks CV/Assessment (skills_competency berasal dari data Excel)
+TEXT_ANALYSIS_CATEGORIES = ['education', 'experience', 'business_impact', 'position', 'summary_executive']
+
+# 'combined': satu request JSON untuk semua field teks; 'per_category': satu request per field (mode lama)
+LLM_ANALYSIS_MODE = os.getenv("LLM_ANALYSIS_MODE", "combined").lower()
+
+# Budget token input per field setelah kompaksi (≈ 4 karakter per token). Mode combined memakai
+# gabungan section semua field dengan budget ANALYSIS_COMBINED_TOKEN_BUDGET.
+ANALYSIS_FIELD_TOKEN_BUDGETS = {
+    'education': 1500,
+    'experience': 3500,
+    'business_impact': 4500,
+    'position': 1500,
+    'summary_executive': 6000,
+}
+ANALYSIS_COMBINED_TOKEN_BUDGET = int(os.getenv("ANALYSIS_COMBINED_TOKEN_BUDGET", "7500"))
+ANALYSIS_HEADER_MAX_CHARS = 1500
+# Konteks teks sumber untuk prompt koreksi satu field (jauh lebih kecil dari analisis penuh)
+ANALYSIS_REPAIR_CONTEXT_TOKENS = 1000
+# Isi field jika LLM tidak memberikan jawaban sama sekali
+ANALYSIS_EMPTY_RESULT = "Tidak dapat menganalisis dengan AI"
+
+# Batching multi-kandidat: kandidat dengan teks pendek (setelah kompaksi <= LLM_BATCH_MAX_CANDIDATE_TOKENS)
+# digabung dalam satu request JSON array sampai LLM_BATCH_TOKEN_BUDGET token input / LLM_BATCH_MAX_CANDIDATES
+LLM_BATCHING = os.getenv("LLM_BATCHING", "1") != "0"
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "8000"))
+LLM_BATCH_MAX_CANDIDATES = int(os.getenv("LLM_BATCH_MAX_CANDIDATES", "5"))
+LLM_BATCH_MAX_CANDIDATE_TOKENS = int(os.getenv("LLM_BATCH_MAX_CANDIDATE_TOKENS", "2000"))
+# Budget output per kandidat dalam satu batch
+LLM_BATCH_OUTPUT_TOKENS_PER_CANDIDATE = 1200
+
+# Kata kunci judul section (dicocokkan per kata utuh, bentuk jamak bahasa Inggris ikut cocok)
+SECTION_HEADINGS = {
+    'education': ('pendidikan', 'education', 'academic', 'akademik'),
+    'experience': ('pengalaman', 'experience', 'riwayat pekerjaan', 'riwayat jabatan', 'employment',
+                   'work history', 'career', 'karir', 'karier'),
+    'achievements': ('prestasi', 'pencapaian', 'achievement', 'accomplishment', 'penghargaan', 'award',
+                     'proyek', 'project'),
+    'skills': ('keahlian', 'skill', 'kompetensi', 'competency', 'competencies', 'sertifikasi', 'certification',
+               'pelatihan', 'training'),
+    'assessment': ('kesimpulan', 'rekomendasi', 'recommendation', 'kekuatan', 'strength',
+                   'area pengembangan', 'development', 'ringkasan', 'summary', 'profil', 'profile'),
+}
+# Kata pelengkap yang boleh ada di judul section ("Riwayat Pendidikan Formal", "Work Experience")
+SECTION_HEADING_FILLER_WORDS = {
+    'riwayat', 'data', 'latar', 'belakang', 'kerja', 'pekerjaan', 'jabatan', 'formal', 'non', 'nonformal',
+    'informal', 'dan', 'and', 'of', 'the', 'professional', 'profesional', 'work', 'working', 'personal',
+    'pribadi', 'key', 'utama', 'area', 'history', 'singkat', 'terakhir', 'lainnya', 'other', 'relevant',
+    'pengembangan', 'organisasi', 'organization', 'my',
+}
+# Kata jabatan: baris kapital / berakhiran ':' yang memuatnya adalah nama jabatan, bukan judul section
+SECTION_HEADING_ROLE_WORDS = {
+    'manager', 'manajer', 'specialist', 'officer', 'director', 'direktur', 'head', 'kepala', 'staff', 'staf',
+    'lead', 'leader', 'engineer', 'analyst', 'supervisor', 'coordinator', 'koordinator', 'consultant',
+    'konsultan', 'executive', 'trainer', 'assistant', 'asisten', 'intern', 'vp', 'president', 'chief',
+    'administrator', 'associate', 'senior', 'junior', 'ketua', 'anggota', 'pimpinan',
+}
+
+# Section yang relevan per field, urut prioritas. 'header' = teks sebelum judul section pertama
+# (nama, kontak, profil singkat). Jika section utama field tidak ditemukan, sisa teks ikut dikirim.
+FIELD_SECTION_PRIORITY = {
+    'education': ['education', 'header', 'skills'],
+    'experience': ['experience', 'header', 'achievements'],
+    'business_impact': ['achievements', 'experience', 'assessment', 'header'],
+    'position': ['experience', 'header'],
+    'summary_executive': ['header', 'experience', 'achievements', 'assessment', 'education', 'skills'],
+}
+
+ANALYSIS_GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "top_p": 0.8,
+    "top_k": 40,
+    "max_output_tokens": 1024,
+}
+
+COMBINED_GENERATION_CONFIG = {
+    **ANALYSIS_GENERATION_CONFIG,
+    # Semua field dalam satu response, jadi butuh budget output lebih besar
+    "max_output_tokens": 4096,
+    "response_mime_type": "application/json",
+}
+
+GEMINI_SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+]
+
+def _analysis_instruction(category: str) -> str:
+    """Instruksi satu field tanpa penutup 'Teks yang akan dianalisis:'"""
+    return ANALYSIS_PROMPTS[category].split("Teks yang akan dianalisis:")[0].strip()
+
+def combined_response_schema(categories: List[str]) -> Dict:
+    """JSON schema response: satu property string per field"""
+    return {
+        "type": "OBJECT",
+        "properties": {category: {"type": "STRING"} for category in categories},
+        "required": list(categories),
+    }
+
+def build_combined_analysis_prompt(text_content: str, categories: List[str]) -> str:
+    """Satu prompt untuk semua field; teks dokumen hanya dikirim sekali"""
+    sections = [f'### Field "{category}"\n{_analysis_instruction(category)}' for category in categories]
+    return (
+        "Dari teks CV/penilaian berikut, isi SEMUA field di bawah dan kembalikan SATU objek JSON "
+        f"dengan key: {', '.join(categories)}.\n"
+        "Setiap value berupa string yang formatnya persis mengikuti instruksi field tersebut "
+        "(gunakan baris baru di dalam string jika format meminta beberapa baris). "
+        "Jangan menambahkan key lain atau teks di luar JSON.\n\n"
+        + "\n\n".join(sections)
+        + "\n\nTeks yang akan dianalisis:\n"
+        + text_content
+    )
+
+def normalize_field_value(value) -> str:
+    """Samakan value JSON (string/list) dengan format string yang dipakai di Excel & PPT"""
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        value = "\n".join(str(item).strip() for item in value if str(item).strip())
+    value = str(value).strip()
+    # Model kadang membungkus seluruh jawaban dengan tanda kutip seperti contoh di prompt
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        value = value[1:-1].strip()
+    return value
+
+_PREAMBLE_RE = re.compile(r'^(berikut|berdasarkan|here is|here are|based on|top \d)', re.IGNORECASE)
+_PERIOD_RE = re.compile(r'(19|20)\d{2}|saat ini|sekarang|present', re.IGNORECASE)
+
+def validate_analysis_field(category: str, value: str) -> Optional[str]:
+    """
+    Cek format satu field sesuai aturan di ANALYSIS_PROMPTS.
+    Returns: pesan kesalahan (dipakai di prompt perbaikan) atau None jika valid
+    """
+    if not value:
+        return "jawaban kosong"
+    if _PREAMBLE_RE.match(value):
+        return "jawaban diawali preamble/penjelasan"
+    if '**' in value or value.lstrip().startswith('*'):
+        return "jawaban memakai bintang/markdown"
+    lines = [line.strip() for line in value.splitlines() if line.strip()]
+
+    if category == 'position':
+        if len(lines) > 1:
+            return "nama jabatan harus satu baris saja"
+        if len(value.split()) > 12:
+            return "jawaban harus nama jabatan saja tanpa penjelasan"
+    elif category == 'education':
+        if len(lines) > 1:
+            return "harus satu baris, setiap jenjang dipisah ' | '"
+        if value.startswith(('•', '-')):
+            return "tidak boleh berupa bullet point"
+    elif category == 'business_impact':
+        if any(not line.startswith('•') for line in lines):
+            return "setiap baris harus diawali '• '"
+        if len(lines) != 5:
+            return f"harus tepat 5 poin (saat ini {len(lines)} poin)"
+        if any(len(line.split()) > 13 for line in lines):
+            return "setiap poin harus kalimat singkat 5-7 kata"
+    elif category == 'experience':
+        blocks = [block for block in re.split(r'\n\s*\n', value.strip()) if block.strip()]
+        if len(blocks) > 4:
+            return f"maksimal 4 posisi jabatan terakhir (saat ini {len(blocks)})"
+        for block in blocks:
+            block_lines = [line for line in block.splitlines() if line.strip()]
+            if not 2 <= len(block_lines) <= 3:
+                return "setiap posisi terdiri dari baris jabatan, perusahaan, dan periode, dipisah baris kosong"
+            if not _PERIOD_RE.search(block_lines[-1]):
+                return "baris terakhir setiap posisi harus berisi periode (mis. 2020 – 2021)"
+    elif category == 'summary_executive':
+        if value.startswith(('•', '-')):
+            return "harus paragraf, bukan bullet point"
+        sentences = [sentence for sentence in split_sentences(value) if len(sentence.split()) >= 4]
+        if not 3 <= len(sentences) <= 5:
+            return f"harus 3-5 kalimat (saat ini {len(sentences)})"
+    return None
+
+_SENTENCE_BOUNDARY_RE = re.compile(r'(\S+)[.!?]["\')”]?\s+(?=["“(]?[A-Z0-9])')
+# Singkatan yang diakhiri titik tapi bukan akhir kalimat (gelar & sapaan)
+_SENTENCE_ABBREVIATIONS = {'dr', 'drs', 'dra', 'ir', 'prof', 'hj', 'mr', 'mrs', 'ms', 'bpk', 'no', 'st'}
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Pecah paragraf menjadi kalimat pada [.!?] + spasi + huruf kapital/angka. Tidak memecah setelah singkatan
+    bertitik (gelar "S.E.", "S.Kom.", "M.M."), inisial satu huruf, atau singkatan umum ("Dr.", "Ir.", "Prof.").
+    """
+    sentences, start = [], 0
+    for match in _SENTENCE_BOUNDARY_RE.finditer(text):
+        token = match.group(1).strip('"“(')
+        if '.' in token or token.lower() in _SENTENCE_ABBREVIATIONS or (token.isalpha() and len(token) == 1):
+            continue
+        sentences.append(text[start:match.end()].strip())
+        start = match.end()
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+def build_repair_prompt(category: str, value: str, reason: str, context: str) -> str:
+    """Prompt koreksi singkat untuk satu field yang formatnya salah"""
+    return (
+        f'Jawaban sebelumnya untuk field "{category}" tidak sesuai format: {reason}.\n'
+        "Perbaiki jawaban tersebut sesuai instruksi di bawah. Pertahankan isi yang sudah benar, "
+        "lengkapi dari teks sumber bila perlu. Langsung berikan jawaban yang sudah diperbaiki, "
+        "tanpa preamble atau penjelasan.\n\n"
+        f"Instruksi:\n{_analysis_instruction(category)}\n\n"
+        f"Jawaban sebelumnya:\n{value}\n\n"
+        f"Teks sumber (ringkas):\n{context}\n\n"
+        "Jawaban yang diperbaiki:"
+    )
+
+def repair_analysis_field(category: str, value: str, reason: str, text_content: str,
+                          use_cache: bool = True) -> Optional[str]:
+    """
+    Minta ulang HANYA satu field dengan prompt koreksi singkat (bukan seluruh analisis kandidat).
+    Returns: jawaban yang sudah valid, atau None jika perbaikan gagal / tetap tidak valid
+    """
+    print(f"    ↻ Memperbaiki field {category} ({reason})")
+    context = compact_text_for_fields(text_content, [category], ANALYSIS_REPAIR_CONTEXT_TOKENS)
+    try:
+        repaired = normalize_field_value(llm_generate(build_repair_prompt(category, value, reason, context),
+                                                      ANALYSIS_GENERATION_CONFIG, GEMINI_SAFETY_SETTINGS,
+                                                      use_cache=use_cache, category=f"{category} (koreksi)"))
+    except LlmRequestError as e:
+        print(f"    Error saat memperbaiki field {category}: {e}")
+        return None
+    error = validate_analysis_field(category, repaired)
+    if error:
+        print(f"    ⚠ Perbaikan field {category} masih tidak valid ({error})")
+        return None
+    return repaired
+
+def parse_combined_analysis(response_text: str,
+                            categories: List[str]) -> Tuple[Dict[str, str], Dict[str, Tuple[str, str]]]:
+    """
+    Parse response JSON gabungan lalu validasi per field.
+    Returns: (field valid, {field tidak valid: (alasan, jawaban)})
+    """
+    cleaned = (response_text or "").strip()
+    # Jaga-jaga jika model tetap membungkus JSON dengan code fence
+    fence = re.match(r'^```(?:json)?\s*(.*?)\s*```$', cleaned, re.DOTALL)
+    if fence:
+        cleaned = fence.group(1)
+
+    try:
+        data = json.loads(cleaned)
+    except ValueError:
+        return {}, {category: ("response bukan JSON valid", "") for category in categories}
+    if not isinstance(data, dict):
+        return {}, {category: ("response JSON bukan objek", "") for category in categories}
+
+    valid, invalid = {}, {}
+    for category in categories:
+        value = normalize_field_value(data.get(category))
+        error = validate_analysis_field(category, value)
+        if error:
+            invalid[category] = (error, value)
+        else:
+            valid[category] = value
+    return valid, invalid
+
+def _analyze_single_category(category: str, text_content: str, competency_data: List[Dict] = None,
+                             use_cache: bool = True) -> Optional[str]:
+    """
+    Satu request Gemini untuk satu field (mode per_category & fallback mode combined).
+    Returns: None jika request gagal setelah retry (field dimasukkan ulang ke antrian oleh pemanggil)
+    """
+    print(f"  Menganalisis {category} dengan Gemini AI...")
+
+    try:
+        # Special handling untuk skills_competency
+        if category == 'skills_competency':
+            if competency_data and len(competency_data) > 0:
+                # Format competency data untuk prompt
+                competency_list = "Data Competency:\n"
+                for comp in competency_data:
+                    comp_name = comp.get('competency', '')
+                    level = comp.get('level', 0)
+                    competency_list += f"- {comp_name} (Level {level}/5)\n"
+
+                # Replace placeholder dengan data actual
+                full_prompt = ANALYSIS_PROMPTS[category].replace('{competency_list}', competency_list)
+            else:
+                print(f"    ⚠ Tidak ada data competency, menggunakan fallback")
+                return ""
+        else:
+            compact_text = compact_text_for_fields(text_content, [category],
+                                                   ANALYSIS_FIELD_TOKEN_BUDGETS.get(category, ANALYSIS_COMBINED_TOKEN_BUDGET))
+            full_prompt = ANALYSIS_PROMPTS[category] + "\n\n" + compact_text
+
+        response_text = llm_generate(full_prompt, ANALYSIS_GENERATION_CONFIG, GEMINI_SAFETY_SETTINGS,
+                                        use_cache=use_cache, category=category)
+
+        if response_text:
+            result = normalize_field_value(response_text) if category in TEXT_ANALYSIS_CATEGORIES else response_text.strip()
+        else:
+            result = ANALYSIS_EMPTY_RESULT
+
+    except Exception as e:
+        print(f"    Error dalam analisis Gemini untuk {category}: {e}")
+        return None
+
+    return result
+
+def analyze_combined_with_gemini(text_content: str, categories: List[str],
+                                use_cache: bool = True) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Satu request JSON untuk semua field teks.
+    Returns: (field valid, {field tidak valid: (alasan, jawaban)}) - field tidak valid diperbaiki/diulang oleh pemanggil
+    Raises: LlmRequestError jika request gagal (tidak dipecah per kategori supaya beban ke API tidak berlipat)
+    """
+    print(f"  Menganalisis {len(categories)} field sekaligus dengan Gemini AI (JSON)...")
+    generation_config = {**COMBINED_GENERATION_CONFIG, "response_schema": combined_response_schema(categories)}
+    compact_text = compact_text_for_fields(text_content, categories, ANALYSIS_COMBINED_TOKEN_BUDGET)
+    prompt = build_combined_analysis_prompt(compact_text, categories)
+    response_text = llm_generate(prompt, generation_config, GEMINI_SAFETY_SETTINGS, use_cache=use_cache,
+                                 category='combined')
+    return parse_combined_analysis(response_text, categories)
+
+def build_batch_analysis_prompt(items: List[Tuple[str, str]], categories: List[str]) -> str:
+    """Satu prompt untuk beberapa kandidat (id, teks); instruksi field hanya dikirim sekali"""
+    sections = [f'### Field "{category}"\n{_analysis_instruction(category)}' for category in categories]
+    documents = [f"<<<KANDIDAT {candidate_id}>>>\n{text}\n<<<AKHIR KANDIDAT {candidate_id}>>>"
+                 for candidate_id, text in items]
+    return (
+        f"Berikut teks CV/penilaian dari {len(items)} kandidat BERBEDA, masing-masing diapit penanda "
+        "<<<KANDIDAT id>>> dan <<<AKHIR KANDIDAT id>>>. Analisis setiap kandidat HANYA dari teksnya sendiri.\n"
+        "Kembalikan SATU array JSON berisi satu objek per kandidat dengan key candidate_id (persis seperti "
+        f"id di penanda) dan key: {', '.join(categories)}.\n"
+        "Setiap value berupa string yang formatnya persis mengikuti instruksi field tersebut "
+        "(gunakan baris baru di dalam string jika format meminta beberapa baris). "
+        "Jangan menambahkan key lain atau teks di luar JSON.\n\n"
+        + "\n\n".join(sections)
+        + "\n\nTeks kandidat yang akan dianalisis:\n\n"
+        + "\n\n".join(documents)
+    )
+
+def batch_response_schema(categories: List[str]) -> Dict:
+    """JSON schema response batch: array objek (candidate_id + satu property string per field)"""
+    item_schema = combined_response_schema(categories)
+    item_schema["properties"] = {"candidate_id": {"type": "STRING"}, **item_schema["properties"]}
+    item_schema["required"] = ["candidate_id"] + item_schema["required"]
+    return {"type": "ARRAY", "items": item_schema}
+
+def parse_batch_analysis(response_text: str, candidate_ids: List[str],
+                         categories: List[str]) -> Dict[str, Tuple[Dict[str, str], Dict[str, Tuple[str, str]]]]:
+    """
+    Parse response batch dan petakan kembali ke kandidat lewat candidate_id.
+    Returns: {candidate_id: (field valid, {field tidak valid: (alasan, jawaban)})}; kandidat yang tidak ada di
+    response (atau response rusak) tidak muncul di hasil
+    """
+    cleaned = (response_text or "").strip()
+    fence = re.match(r'^```(?:json)?\s*(.*?)\s*```$', cleaned, re.DOTALL)
+    if fence:
+        cleaned = fence.group(1)
+    try:
+        data = json.loads(cleaned)
+    except ValueError:
+        return {}
+    if not isinstance(data, list):
+        return {}
+
+    parsed = {}
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        candidate_id = str(item.get('candidate_id', '')).strip()
+        if candidate_id not in candidate_ids or candidate_id in parsed:
+            continue
+        valid, invalid = parse_combined_analysis(json.dumps(item), categories)
+        parsed[candidate_id] = (valid, invalid)
+    return parsed
+
+def _plan_llm_batches(compact_texts: List[str]) -> Tuple[List[List[int]], List[int]]:
+    """Kelompokkan index kandidat pendek ke batch sesuai budget token. Returns: (batch, index single)"""
+    batches, singles = [], []
+    current, current_tokens = [], 0
+    for index, text in enumerate(compact_texts):
+        tokens = estimate_tokens(text)
+        if tokens > LLM_BATCH_MAX_CANDIDATE_TOKENS:
+            singles.append(index)
+            continue
+        if current and (current_tokens + tokens > LLM_BATCH_TOKEN_BUDGET or len(current) >= LLM_BATCH_MAX_CANDIDATES):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+
+    # Batch berisi satu kandidat tidak ada gunanya: proses sebagai request biasa
+    singles.extend(batch[0] for batch in batches if len(batch) == 1)
+    return [batch for batch in batches if len(batch) > 1], sorted(singles)
+
+def _analyze_batch(texts: List[str], compact_texts: List[str], indexes: List[int], categories: List[str],
+                   use_cache: bool, labels: List[str]) -> Dict[int, Dict[str, str]]:
+    """
+    Satu request untuk beberapa kandidat. Item batch yang tidak valid / tidak ada di response diulang per
+    kandidat; jika request batch sendiri gagal (LlmRequestError: kuota/overload) semua kandidat dikembalikan
+    tanpa field supaya diantrikan ulang oleh pemanggil, bukan dipecah jadi satu request per kandidat.
+    """
+    candidate_ids = [f"K{position + 1}" for position in range(len(indexes))]
+    print(f"  Menganalisis {len(indexes)} kandidat dalam satu request batch...")
+    generation_config = {
+        **COMBINED_GENERATION_CONFIG,
+        "max_output_tokens": LLM_BATCH_OUTPUT_TOKENS_PER_CANDIDATE * len(indexes),
+        "response_schema": batch_response_schema(categories),
+    }
+    prompt = build_batch_analysis_prompt([(candidate_id, compact_texts[index])
+                                          for candidate_id, index in zip(candidate_ids, indexes)], categories)
+    try:
+        with llm_call_context([labels[index] for index in indexes]):
+            parsed = parse_batch_analysis(llm_generate(prompt, generation_config, GEMINI_SAFETY_SETTINGS,
+                                                       use_cache=use_cache, category='batch'),
+                                          candidate_ids, categories)
+    except LlmRequestError as e:
+        print(f"    Error dalam request batch: {e} - {len(indexes)} kandidat diantrikan ulang")
+        return {index: {} for index in indexes}
+    if not parsed:
+        print(f"    ⚠ Response batch tidak valid, fallback ke request per kandidat")
+
+    results = {}
+    for candidate_id, index in zip(candidate_ids, indexes):
+        valid, invalid = parsed.get(candidate_id, ({}, {category: ("tidak ada di response batch", "")
+                                                        for category in categories}))
+        results[index] = dict(valid)
+        with llm_call_context(labels[index]):
+            repaired, remaining = _repair_invalid_fields(invalid, texts[index], use_cache)
+            results[index].update(repaired)
+            if remaining:
+                results[index].update(analyze_with_gemini_advanced(texts[index], categories=remaining,
+                                                                   use_cache=use_cache))
+    return results
+
+def analyze_candidates_with_llm(texts: List[str], categories: List[str] = None, use_cache: bool = True,
+                                batching: bool = None, labels: List[str] = None) -> List[Dict[str, str]]:
+    """
+    Analisis banyak kandidat sekaligus. Kandidat dengan teks pendek digabung ke request batch (jika
+    batching aktif), sisanya satu request per kandidat; semuanya dijalankan paralel lewat dispatch_llm_jobs.
+    labels: nama kandidat untuk metrik LLM (default "#<urutan>")
+    Returns: hasil analyze_with_gemini_advanced per kandidat, sesuai urutan texts
+    """
+    categories = categories or TEXT_ANALYSIS_CATEGORIES
+    labels = labels or [f"#{index + 1}" for index in range(len(texts))]
+    batching = LLM_BATCHING if batching is None else batching
+    mode_is_combined = LLM_ANALYSIS_MODE == 'combined'
+
+    if batching and mode_is_combined and len(texts) > 1:
+        compact_texts = [compact_text_for_fields(text, categories, ANALYSIS_COMBINED_TOKEN_BUDGET) for text in texts]
+        batches, singles = _plan_llm_batches(compact_texts)
+    else:
+        compact_texts, batches, singles = list(texts), [], list(range(len(texts)))
+    if batches:
+        print(f"  {sum(len(batch) for batch in batches)} kandidat digabung dalam {len(batches)} request batch")
+
+    def run(job: Tuple[str, List[int]]) -> Dict[int, Dict[str, str]]:
+        kind, indexes = job
+        if kind == 'batch':
+            return _analyze_batch(texts, compact_texts, indexes, categories, use_cache, labels)
+        index = indexes[0]
+        with llm_call_context(labels[index]):
+            return {index: analyze_with_gemini_advanced(texts[index], categories=categories, use_cache=use_cache)}
+
+    jobs = [('batch', batch) for batch in batches] + [('single', [index]) for index in singles]
+    results = [{} for _ in texts]
+    for partial in dispatch_llm_jobs(run, jobs):
+        for index, analysis in partial.items():
+            results[index] = analysis
+    return results
+
+def _repair_invalid_fields(invalid: Dict[str, Tuple[str, str]], text_content: str,
+                           use_cache: bool) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Perbaiki field yang formatnya salah dengan prompt koreksi; field tanpa jawaban (atau yang perbaikannya
+    gagal) dikembalikan untuk diminta ulang dengan prompt lengkap. Returns: (field diperbaiki, field sisa)
+    """
+    repaired, remaining = {}, []
+    for category, (reason, value) in invalid.items():
+        fixed = repair_analysis_field(category, value, reason, text_content, use_cache) if value else None
+        if fixed is None:
+            remaining.append(category)
+        else:
+            repaired[category] = fixed
+    return repaired, remaining
+
+def analyze_with_gemini_advanced(text_content: str, competency_data: List[Dict] = None,
+                                 categories: List[str] = ['education', 'experience', 'business_impact', 'position', 'summary_executive', 'skills_competency'],
+                                 mode: str = None, use_cache: bool = True) -> Dict:
+    """
+    Menggunakan Gemini AI untuk menganalisis teks dan mengekstrak informasi
+    mode: 'combined' (satu request JSON untuk semua field teks) atau 'per_category' (default LLM_ANALYSIS_MODE)
+    use_cache: False untuk bypass cache response LLM (mis. setelah prompt diperbaiki tanpa menaikkan versi)
+    Field yang request-nya gagal setelah retry TIDAK ada di hasil, supaya pemanggil bisa mengantrikannya ulang.
+    """
+    mode = (mode or LLM_ANALYSIS_MODE).lower()
+    results = {}
+    pending = [category for category in categories if category in ANALYSIS_PROMPTS]
+
+    if mode == 'combined':
+        combined_categories = [category for category in pending if category in TEXT_ANALYSIS_CATEGORIES]
+        if combined_categories:
+            try:
+                valid, invalid = analyze_combined_with_gemini(text_content, combined_categories, use_cache=use_cache)
+            except LlmRequestError as e:
+                print(f"    Error dalam analisis gabungan Gemini: {e}")
+                valid, invalid = {}, {}
+                pending = [category for category in pending if category not in combined_categories]
+            results.update(valid)
+            # Field yang formatnya salah: coba prompt koreksi dulu, baru prompt lengkap per kategori
+            repaired, _ = _repair_invalid_fields(invalid, text_content, use_cache)
+            results.update(repaired)
+            pending = [category for category in pending if category not in results]
+
+    for category in pending:
+        result = _analyze_single_category(category, text_content, competency_data, use_cache=use_cache)
+        if result is None:
+            continue
+        error = (validate_analysis_field(category, result)
+                 if category in TEXT_ANALYSIS_CATEGORIES and result != ANALYSIS_EMPTY_RESULT else None)
+        if error:
+            # Simpan jawaban asli jika perbaikan gagal: lebih baik daripada field kosong
+            result = repair_analysis_field(category, result, error, text_content, use_cache) or result
+        results[category] = result
+
+    return {category: results[category] for category in categories if category in results}
+
+def benchmark_llm_pipeline(num_candidates: int = 50, latency_seconds: float = None, error_rate: float = None,
+                           text_content: str = None) -> Dict:
+    """
+    Ukur throughput tahap analisis LLM secara offline dengan FakeLlmBackend. Selama benchmark cache LLM
+    dinonaktifkan (response palsu tidak masuk cache persisten), dipakai controller concurrency dan pencatat
+    metrik sendiri, supaya batas AIMD dan metrik_llm_*.xlsx milik job sungguhan tidak ikut berubah.
+    Returns: statistik (kandidat, detik, kandidat/menit, panggilan LLM, field kosong, batas concurrency akhir)
+    """
+    global LLM_CACHE_ENABLED, LLM_CONCURRENCY_CONTROLLER, LLM_METRICS
+    sample_text = text_content or ("=== CV ===\nBudi Santoso\nPENGALAMAN KERJA\nDirektur Commercial\n"
+                                   "PT Telekomunikasi Selular\n2021 – Saat ini\n")
+    texts = [f"{sample_text}\nKandidat #{index}" for index in range(num_candidates)]
+    previous_backend = _llm_backend
+    previous = LLM_CACHE_ENABLED, LLM_CONCURRENCY_CONTROLLER, LLM_METRICS
+    controller = AdaptiveConcurrencyController(LLM_CONCURRENCY, LLM_MAX_CONCURRENCY,
+                                               LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN_SECONDS)
+    metrics = LlmMetricsRecorder()
+    set_llm_backend(FakeLlmBackend(latency_seconds=latency_seconds, error_rate=error_rate))
+    LLM_CACHE_ENABLED, LLM_CONCURRENCY_CONTROLLER, LLM_METRICS = False, controller, metrics
+    try:
+        started = time.perf_counter()
+        analyses = analyze_candidates_with_llm(texts, TEXT_ANALYSIS_CATEGORIES, use_cache=False)
+        elapsed = time.perf_counter() - started
+    finally:
+        LLM_CACHE_ENABLED, LLM_CONCURRENCY_CONTROLLER, LLM_METRICS = previous
+        set_llm_backend(previous_backend)
+
+    missing = sum(len(TEXT_ANALYSIS_CATEGORIES) - len(analysis) for analysis in analyses)
+    stats = {
+        'candidates': num_candidates,
+        'seconds': elapsed,
+        'candidates_per_minute': num_candidates / elapsed * 60 if elapsed else 0.0,
+        'llm_calls': len(metrics.records_frame()),
+        'missing_fields': missing,
+        'concurrency_limit': controller.limit,
+    }
+    print(f"Benchmark LLM (fake): {num_candidates} kandidat dalam {elapsed:.1f} detik "
+          f"({stats['candidates_per_minute']:.0f} kandidat/menit), field kosong: {missing}, "
+          f"batas concurrency akhir: {stats['concurrency_limit']:.1f}")
+    return stats
+
+# ==================== OCR TEXT CACHE ====================
+def file_content_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Menghitung SHA-256 dari isi file (bukan nama file)"""
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def ocr_cache_key(content_hash: str, **settings) -> str:
+    """Key cache = hash isi PDF + setting OCR (lang, dpi, psm, range halaman, dst)"""
+    settings_str = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha256(f"{content_hash}|{settings_str}".encode('utf-8')).hexdigest()
+
+def _ocr_cache_path(key: str) -> str:
+    return os.path.join(OCR_CACHE_DIR, key[:2], f"{key}.txt")
+
+def ocr_cache_get(key: str) -> Optional[str]:
+    """Ambil teks OCR dari cache disk, None jika tidak ada"""
+    path = _ocr_cache_path(key)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        # Update mtime supaya entry yang sering dipakai tidak dievict duluan (LRU)
+        os.utime(path, None)
+        return text
+    except (FileNotFoundError, OSError):
+        return None
+
+def ocr_cache_put(key: str, text: str):
+    """
+    Simpan teks OCR ke cache disk. Tanpa eviction (juga dipanggil dari worker OCR): evict_ocr_cache
+    dijalankan sekali per batch di proses utama oleh pdf_to_text_ocr_batch / identify_assessments
+    """
+    path = _ocr_cache_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        # Atomic replace supaya pembaca lain tidak melihat file setengah jadi
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"    ⚠ Gagal menyimpan cache OCR: {e}")
+
+def evict_ocr_cache(max_mb: float = None):
+    """Hapus entry cache paling lama tidak dipakai sampai total ukuran <= max_mb"""
+    max_bytes = (OCR_CACHE_MAX_MB if max_mb is None else max_mb) * 1024 * 1024
+    entries = []
+    total_size = 0
+    for path in glob.glob(os.path.join(OCR_CACHE_DIR, '*', '*.txt')):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total_size += stat.st_size
+
+    if total_size <= max_bytes:
+        return
+
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+            total_size -= size
+        except OSError:
+            continue
+        if total_size <= max_bytes:
+            break
+
+def page_image_hash(image: Image.Image) -> str:
+    """Hash bitmap halaman hasil render (mode + ukuran + pixel), sama untuk halaman identik di PDF berbeda"""
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(f"{image.mode}|{image.size}".encode('utf-8'))
+    hasher.update(image.tobytes())
+    return hasher.hexdigest()
+
+def page_cache_get(key: str) -> Optional[Tuple[str, Optional[float]]]:
+    """Ambil (teks, confidence) satu halaman dari cache, None jika tidak ada"""
+    cached = ocr_cache_get(key)
+    if cached is None:
+        return None
+    try:
+        entry = json.loads(cached)
+        return entry['text'], entry.get('confidence')
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def page_cache_put(key: str, text: str, confidence: Optional[float]):
+    """Simpan hasil OCR satu halaman (di worker OCR)"""
+    ocr_cache_put(key, json.dumps({'text': text, 'confidence': confidence}, ensure_ascii=False))
+
+# ==================== PDF TEXT LAYER ====================
+def reset_ocr_stats():
+    """Reset statistik OCR untuk run baru"""
+    OCR_STATS.clear()
+
+def format_ocr_stats() -> str:
+    """Ringkasan statistik OCR satu run"""
+    text_pages = OCR_STATS['pages_text_layer']
+    ocr_pages = OCR_STATS['pages_ocr']
+    total_pages = text_pages + ocr_pages
+    lines = [
+        f"Dokumen diproses        : {OCR_STATS['documents']}",
+        f"Dokumen dari cache      : {OCR_STATS['documents_cached']}",
+        f"Halaman via text layer  : {text_pages}/{total_pages}",
+        f"Halaman via OCR         : {ocr_pages}/{total_pages}",
+        f"Halaman OCR ulang (DPI tinggi): {OCR_STATS['pages_reocr']}",
+        f"Halaman kosong (skip OCR): {OCR_STATS['pages_blank']}",
+        f"Cache halaman           : {OCR_STATS['page_cache_hits']}/{OCR_STATS['page_cache_lookups']} hit"
+        f" ({OCR_STATS['page_cache_hits'] / max(OCR_STATS['page_cache_lookups'], 1):.0%})",
+        f"NIK via header/halaman 1: {OCR_STATS['nik_via_text_layer'] + OCR_STATS['nik_via_header'] + OCR_STATS['nik_via_first_page']}"
+        f", via dokumen penuh: {OCR_STATS['nik_via_full_document']}",
+    ]
+    if OCR_STATS['pixels_in']:
+        saved_ratio = 1 - OCR_STATS['pixels_out'] / OCR_STATS['pixels_in']
+        lines.append(f"Pixel dikirim ke OCR    : {OCR_STATS['pixels_out']:,}/{OCR_STATS['pixels_in']:,} "
+                     f"(hemat {saved_ratio:.0%})")
+    if ocr_pages:
+        lines.append(f"Waktu per halaman OCR   : preprocessing {OCR_STATS['preprocess_seconds'] / ocr_pages:.2f}s, "
+                     f"tesseract {OCR_STATS['ocr_seconds'] / ocr_pages:.2f}s")
+    return "\n".join(lines)
+
+def is_text_layer_usable(text: str) -> bool:
+    """Cek apakah teks embedded di PDF cukup bagus sehingga halaman tidak perlu di-OCR"""
+    if not text:
+        return False
+    stripped = "".join(text.split())
+    if len(stripped) < TEXT_LAYER_MIN_CHARS:
+        return False
+    # Text layer hasil scan/OCR jelek biasanya penuh simbol aneh
+    alnum_count = sum(1 for ch in stripped if ch.isalnum())
+    return alnum_count / len(stripped) >= TEXT_LAYER_MIN_ALNUM_RATIO
+
+def extract_text_layer(pdf_path: str, max_pages: int) -> Tuple[List[str], Optional[int]]:
+    """
+    Ambil teks embedded per halaman (maksimal max_pages) memakai PyPDF2
+    Returns: (list teks per halaman, total halaman PDF atau None jika gagal dibaca)
+    """
+    try:
+        reader = PdfReader(pdf_path)
+        if reader.is_encrypted:
+            reader.decrypt('')
+        page_count = len(reader.pages)
+    except Exception as e:
+        print(f"    ⚠ Text layer tidak dapat dibaca: {e}")
+        return [], None
+
+    page_texts = []
+    for page_index in range(min(page_count, max_pages)):
+        try:
+            page_texts.append(reader.pages[page_index].extract_text() or "")
+        except Exception:
+            page_texts.append("")
+    return page_texts, page_count
+
+def _group_consecutive_pages(page_numbers: List[int]) -> List[Tuple[int, int]]:
+    """[1, 2, 3, 7, 8] -> [(1, 3), (7, 8)] supaya poppler dipanggil per rentang, bukan per halaman"""
+    ranges = []
+    for page_number in sorted(page_numbers):
+        if ranges and page_number == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], page_number)
+        else:
+            ranges.append((page_number, page_number))
+    return ranges
+
+# ==================== OCR PROFILES ====================
+@lru_cache(maxsize=None)
+def _tessdata_dir(variant: str, lang: str) -> Optional[str]:
+    """
+    Folder traineddata varian profil (TESSDATA_FAST_DIR / TESSDATA_BEST_DIR) jika berisi bahasa yang diminta.
+    Jika tidak diset atau tidak lengkap, beri peringatan sekali dan pakai traineddata default (None)
+    """
+    env_name = f"TESSDATA_{variant.upper()}_DIR"
+    tessdata_dir = TESSDATA_DIRS.get(variant, "")
+    if not tessdata_dir:
+        print(f"    ⚠ {env_name} tidak diset: profil memakai traineddata default, bukan tessdata_{variant}")
+        return None
+    missing = [code for code in lang.split('+') if not os.path.isfile(os.path.join(tessdata_dir, f"{code}.traineddata"))]
+    if missing:
+        print(f"    ⚠ {env_name}={tessdata_dir} tidak berisi {', '.join(f'{code}.traineddata' for code in missing)}: "
+              f"profil memakai traineddata default")
+        return None
+    return tessdata_dir
+
+def resolve_ocr_settings(profile: str = None, lang: str = 'ind', doc_type: str = None, dpi: int = None,
+                         adaptive: bool = None, preprocess=None) -> Dict:
+    """
+    Gabungkan profil OCR dengan override eksplisit menjadi setting efektif satu dokumen
+    (config tesseract, DPI, mode adaptive, preprocessing, batas halaman per tipe dokumen)
+    """
+    profile_name = (profile or DEFAULT_OCR_PROFILE).lower()
+    if profile_name not in OCR_PROFILES:
+        print(f"    ⚠ Profil OCR '{profile_name}' tidak dikenal, menggunakan 'balanced'")
+        profile_name = 'balanced'
+    selected = OCR_PROFILES[profile_name]
+
+    custom_config = f"--oem {selected['oem']} --psm {selected['psm']} -l {lang}"
+    tessdata_dir = _tessdata_dir(selected['tessdata'], lang) if selected['tessdata'] else None
+    if tessdata_dir:
+        custom_config += f' --tessdata-dir "{tessdata_dir}"'
+
+    max_pages = selected['max_pages']
+    return {
+        'profile': profile_name,
+        'lang': lang,
+        'config': custom_config,
+        'dpi': dpi or selected['dpi'],
+        'adaptive': selected['adaptive'] if adaptive is None else adaptive,
+        'preprocess': normalize_preprocess_mode(preprocess, selected['preprocess']),
+        'max_pages': max_pages.get(doc_type or 'OTHER', max_pages['OTHER']),
+    }
+
+# ==================== IMAGE PREPROCESSING ====================
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Threshold Otsu dari histogram grayscale (vectorized, tanpa loop per pixel)"""
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = histogram.sum()
+    if total == 0:
+        return 128
+    levels = np.arange(256, dtype=np.float64)
+    weight_background = np.cumsum(histogram)
+    weight_foreground = total - weight_background
+    cumulative_mean = np.cumsum(histogram * levels)
+    mean_background = cumulative_mean / np.maximum(weight_background, 1)
+    mean_foreground = (cumulative_mean[-1] - cumulative_mean) / np.maximum(weight_foreground, 1)
+    between_variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+    return int(np.argmax(between_variance))
+
+def _image_region_mask(gray: np.ndarray) -> np.ndarray:
+    """
+    Mask pixel yang termasuk area gambar (foto, logo berwarna): tile dengan banyak mid-tone
+    dan variasi tinggi, yang bertetangga dengan tile sejenis. Teks hitam di atas putih dan
+    shading tabel yang rata tidak ikut ter-mask.
+    """
+    tile = PREPROCESS_TILE_SIZE
+    height, width = gray.shape
+    tiles_y, tiles_x = height // tile, width // tile
+    mask = np.zeros(gray.shape, dtype=bool)
+    if tiles_y < 3 or tiles_x < 3:
+        return mask
+
+    tiles = gray[:tiles_y * tile, :tiles_x * tile].reshape(tiles_y, tile, tiles_x, tile).swapaxes(1, 2)
+    midtone_ratio = ((tiles > 60) & (tiles < 200)).mean(axis=(2, 3))
+    tile_std = tiles.std(axis=(2, 3))
+    image_tiles = (midtone_ratio > PREPROCESS_IMAGE_MIDTONE_RATIO) & (tile_std > PREPROCESS_IMAGE_MIN_STD)
+
+    # Opening 3x3: buang tile terisolasi (biasanya teks tebal), pertahankan blok gambar besar
+    padded = np.pad(image_tiles, 1)
+    neighbours = sum(padded[dy:dy + tiles_y, dx:dx + tiles_x] for dy in range(3) for dx in range(3))
+    core = neighbours == 9
+    padded_core = np.pad(core, 1)
+    opened = sum(padded_core[dy:dy + tiles_y, dx:dx + tiles_x] for dy in range(3) for dx in range(3)) > 0
+    opened &= image_tiles
+
+    # Tile di tepi foto hanya sebagian tertutup; ikutkan tetangga yang masih banyak mid-tone
+    padded_opened = np.pad(opened, 1)
+    near_image = sum(padded_opened[dy:dy + tiles_y, dx:dx + tiles_x] for dy in range(3) for dx in range(3)) > 0
+    opened |= near_image & (midtone_ratio > PREPROCESS_IMAGE_EDGE_RATIO)
+
+    mask[:tiles_y * tile, :tiles_x * tile] = np.repeat(np.repeat(opened, tile, axis=0), tile, axis=1)
+    return mask
+
+def _dark_background_mask(gray: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Mask pixel area berlatar gelap yang rata (bar header abu-abu/hitam berisi teks putih): tile dengan
+    median di bawah threshold dan sebagian besar pixel dekat median, yang bertetangga dengan tile sejenis.
+    Foto (sebaran nilai lebar) dan huruf tebal tunggal tidak ikut ter-mask.
+    """
+    tile = PREPROCESS_TILE_SIZE
+    height, width = gray.shape
+    tiles_y, tiles_x = height // tile, width // tile
+    mask = np.zeros(gray.shape, dtype=bool)
+    if tiles_y < 3 or tiles_x < 3:
+        return mask
+
+    tiles = gray[:tiles_y * tile, :tiles_x * tile].reshape(tiles_y, tile, tiles_x, tile).swapaxes(1, 2)
+    flat = tiles.reshape(tiles_y, tiles_x, tile * tile)
+    median = np.median(flat, axis=2)
+    flat_ratio = (np.abs(flat.astype(np.int16) - median[..., None]) < 25).mean(axis=2)
+    dark_tiles = (median < threshold) & (flat_ratio > PREPROCESS_DARK_FLAT_RATIO)
+
+    padded = np.pad(dark_tiles, 1)
+    neighbours = sum(padded[dy:dy + tiles_y, dx:dx + tiles_x] for dy in range(3) for dx in range(3))
+    dark_tiles &= neighbours >= 3
+
+    mask[:tiles_y * tile, :tiles_x * tile] = np.repeat(np.repeat(dark_tiles, tile, axis=0), tile, axis=1)
+    return mask
+
+def preprocess_page_image(image: Image.Image, mode: str = 'optimized') -> Tuple[Optional[Image.Image], Dict]:
+    """
+    Preprocessing halaman sebelum OCR.
+    - 'none': gambar asli
+    - 'grayscale': hanya konversi ke grayscale (perilaku lama)
+    - 'optimized': grayscale + binarisasi Otsu + buang area foto/logo + crop margin putih;
+      area berlatar gelap (teks putih di bar abu-abu) dibinarisasi terbalik;
+      halaman kosong dikembalikan sebagai None supaya tidak dikirim ke tesseract
+    Returns: (gambar siap OCR atau None jika halaman kosong, statistik)
+    """
+    started = time.perf_counter()
+    width, height = image.size
+    stats = {'pixels_in': width * height, 'pixels_out': width * height, 'blank': False}
+
+    if mode == 'none':
+        processed = image
+    elif mode == 'grayscale':
+        processed = image.convert('L')
+    else:
+        gray = np.asarray(image.convert('L'), dtype=np.uint8)
+        if (gray < 160).mean() < PREPROCESS_BLANK_INK_RATIO:
+            stats.update({'pixels_out': 0, 'blank': True,
+                          'preprocess_seconds': time.perf_counter() - started})
+            return None, stats
+
+        threshold = otsu_threshold(gray)
+        # Kelas gelap Otsu = level <= threshold (halaman dua level: threshold = level tinta itu sendiri)
+        ink = gray <= threshold
+        dark = _dark_background_mask(gray, threshold)
+        if dark.any():
+            # Teks putih di latar gelap: yang jadi tinta adalah pixel terang (threshold lokal area gelap;
+            # minimal threshold global supaya bar polos tanpa teks tidak berubah jadi blok hitam)
+            dark_pixels = gray[dark]
+            ink[dark] = dark_pixels > max(otsu_threshold(dark_pixels), threshold)
+        ink &= ~(_image_region_mask(gray) & ~dark)
+
+        rows = np.flatnonzero(ink.any(axis=1))
+        cols = np.flatnonzero(ink.any(axis=0))
+        if rows.size == 0 or cols.size == 0:
+            stats.update({'pixels_out': 0, 'blank': True,
+                          'preprocess_seconds': time.perf_counter() - started})
+            return None, stats
+
+        margin = PREPROCESS_CROP_MARGIN
+        top, bottom = max(rows[0] - margin, 0), min(rows[-1] + margin + 1, height)
+        left, right = max(cols[0] - margin, 0), min(cols[-1] + margin + 1, width)
+        binary = np.where(ink[top:bottom, left:right], 0, 255).astype(np.uint8)
+        processed = Image.fromarray(binary, mode='L')
+        stats['pixels_out'] = binary.size
+
+    stats['preprocess_seconds'] = time.perf_counter() - started
+    return processed, stats
+
+def normalize_preprocess_mode(preprocess, default_mode: str) -> str:
+    """True -> mode default profil, False -> 'none', string -> mode itu sendiri"""
+    if preprocess is True or preprocess is None:
+        return default_mode
+    if preprocess is False:
+        return 'none'
+    if preprocess not in PREPROCESS_MODES:
+        print(f"    ⚠ Mode preprocessing '{preprocess}' tidak dikenal, menggunakan {default_mode}")
+        return default_mode
+    return preprocess
+
+# ==================== OCR ENGINE ====================
+@lru_cache(maxsize=1)
+def probe_tesseract() -> Tuple[bool, str]:
+    """Cek sekali per proses apakah tesseract tersedia. Returns: (tersedia, versi atau pesan error)"""
+    try:
+        return True, str(pytesseract.get_tesseract_version())
+    except Exception as e:
+        return False, str(e)
+
+def parse_tesseract_config(custom_config: str) -> Dict:
+    """Ambil --oem, --psm, -l dan --tessdata-dir dari string config tesseract"""
+    def _option(pattern):
+        match = re.search(pattern, custom_config or '')
+        return match.group(1) if match else None
+
+    oem = _option(r'--oem\s+(\d+)')
+    psm = _option(r'--psm\s+(\d+)')
+    return {
+        'oem': int(oem) if oem is not None else None,
+        'psm': int(psm) if psm is not None else None,
+        'lang': _option(r'(?:^|\s)-l\s+(\S+)'),
+        'tessdata_dir': _option(r'--tessdata-dir\s+"([^"]+)"') or _option(r'--tessdata-dir\s+([^"\s]+)'),
+    }
+
+class OcrEngine:
+    """Interface backend OCR: satu instance hidup selama proses (per worker)"""
+    name = 'base'
+
+    def image_to_text(self, image: Image.Image, lang: str, custom_config: str) -> str:
+        raise NotImplementedError
+
+    def image_to_text_with_confidence(self, image: Image.Image, lang: str, custom_config: str) -> Tuple[str, float]:
+        """Returns: (teks, rata-rata confidence kata 0-100; 0 jika tidak ada kata)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class PytesseractEngine(OcrEngine):
+    """Fallback: satu proses tesseract (dan load traineddata) per panggilan lewat pytesseract"""
+    name = 'pytesseract'
+
+    def image_to_text(self, image, lang, custom_config):
+        return pytesseract.image_to_string(image, lang=lang, config=custom_config)
+
+    def image_to_text_with_confidence(self, image, lang, custom_config):
+        data = pytesseract.image_to_data(image, lang=lang, config=custom_config,
+                                         output_type=pytesseract.Output.DICT)
+        confidences = [float(conf) for conf, word in zip(data.get('conf', []), data.get('text', []))
+                       if word and word.strip() and float(conf) >= 0]
+        mean_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return tesseract_data_to_text(data), mean_confidence
+
+class TesserocrEngine(OcrEngine):
+    """Binding in-process (tesserocr): traineddata di-load sekali per kombinasi setting lalu dipakai ulang"""
+    name = 'tesserocr'
+
+    def __init__(self):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._apis = {}
+        self._lock = threading.Lock()
+
+    def _get_api(self, lang: str, custom_config: str):
+        options = parse_tesseract_config(custom_config)
+        key = (options['lang'] or lang, options['oem'], options['psm'], options['tessdata_dir'])
+        api = self._apis.get(key)
+        if api is None:
+            kwargs = {'lang': key[0]}
+            if key[1] is not None:
+                kwargs['oem'] = key[1]
+            if key[2] is not None:
+                kwargs['psm'] = key[2]
+            tessdata_dir = key[3] or os.getenv("TESSDATA_PREFIX")
+            if tessdata_dir:
+                kwargs['path'] = tessdata_dir
+            api = self._tesserocr.PyTessBaseAPI(**kwargs)
+            self._apis[key] = api
+        return api
+
+    def image_to_text(self, image, lang, custom_config):
+        return self.image_to_text_with_confidence(image, lang, custom_config)[0]
+
+    def image_to_text_with_confidence(self, image, lang, custom_config):
+        with self._lock:
+            api = self._get_api(lang, custom_config)
+            api.SetImage(image)
+            text = api.GetUTF8Text()
+            confidences = [conf for conf in api.AllWordConfidences() if conf >= 0]
+            api.Clear()
+        mean_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return text, float(mean_confidence)
+
+    def close(self):
+        with self._lock:
+            for api in self._apis.values():
+                api.End()
+            self._apis.clear()
+
+_ocr_engine = None
+
+def get_ocr_engine() -> OcrEngine:
+    """Engine OCR milik proses ini (dibuat sekali, dipakai ulang untuk semua halaman)"""
+    global _ocr_engine
+    if _ocr_engine is None:
+        if OCR_ENGINE in ('auto', 'tesserocr'):
+            try:
+                _ocr_engine = TesserocrEngine()
+            except Exception as e:
+                if OCR_ENGINE == 'tesserocr':
+                    print(f"    ⚠ tesserocr tidak tersedia ({e}), menggunakan pytesseract")
+        if _ocr_engine is None:
+            _ocr_engine = PytesseractEngine()
+    return _ocr_engine
+
+def close_ocr_engine():
+    """Tutup engine OCR proses ini"""
+    global _ocr_engine
+    if _ocr_engine is not None:
+        _ocr_engine.close()
+        _ocr_engine = None
+
+atexit.register(close_ocr_engine)
+
+# ==================== PARALLEL OCR ====================
+_ocr_executor = None
+_ocr_executor_workers = 0
+
+def _init_ocr_worker():
+    """Initializer proses worker: batasi thread OpenMP tesseract lalu siapkan engine OCR sekali"""
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    get_ocr_engine()
+
+def get_ocr_executor(workers: int) -> Optional[ProcessPoolExecutor]:
+    """Process pool OCR bersama (dibuat sekali, dipakai ulang antar dokumen)"""
+    global _ocr_executor, _ocr_executor_workers
+    if workers <= 1:
+        return None
+    if _ocr_executor is None or _ocr_executor_workers != workers:
+        shutdown_ocr_executor()
+        print(f"    ⚙️  Menjalankan OCR paralel dengan {workers} worker")
+        _ocr_executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_ocr_worker,
+                                            mp_context=multiprocessing.get_context(OCR_POOL_START_METHOD))
+        _ocr_executor_workers = workers
+    return _ocr_executor
+
+def shutdown_ocr_executor():
+    """Matikan process pool OCR jika ada"""
+    global _ocr_executor, _ocr_executor_workers
+    if _ocr_executor is not None:
+        _ocr_executor.shutdown(wait=True)
+        _ocr_executor = None
+        _ocr_executor_workers = 0
+
+atexit.register(shutdown_ocr_executor)
+
+def iter_pdf_page_images(pdf_path: str, first_page: int, last_page: int, render_dpi: int,
+                         window: int = None) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Generator halaman PDF sebagai gambar: render per window kecil (default 1 halaman),
+    yield satu per satu, dan bebaskan bitmap setelah consumer selesai
+    """
+    window = max(1, min(window or OCR_RENDER_WINDOW, OCR_MAX_PAGE_BITMAPS))
+    for window_start in range(first_page, last_page + 1, window):
+        window_end = min(window_start + window - 1, last_page)
+        images = convert_from_path(
+            pdf_path,
+            dpi=render_dpi,
+            first_page=window_start,
+            last_page=window_end,
+            thread_count=1
+        )
+        try:
+            for page_number, image in enumerate(images, start=window_start):
+                yield page_number, image
+                image.close()
+        finally:
+            for image in images:
+                image.close()
+            del images
+
+def tesseract_data_to_text(data: Dict) -> str:
+    """Susun ulang teks dari output image_to_data (per baris dan paragraf) seperti image_to_string"""
+    lines = []
+    current_key = None
+    current_paragraph = None
+    current_words = []
+    for index, word in enumerate(data.get('text', [])):
+        if not word or not word.strip():
+            continue
+        paragraph = (data['block_num'][index], data['par_num'][index])
+        line_key = paragraph + (data['line_num'][index],)
+        if line_key != current_key:
+            if current_words:
+                lines.append(" ".join(current_words))
+            if current_paragraph is not None and paragraph != current_paragraph:
+                lines.append("")
+            current_key = line_key
+            current_paragraph = paragraph
+            current_words = []
+        current_words.append(word.strip())
+    if current_words:
+        lines.append(" ".join(current_words))
+    return "\n".join(lines) + ("\n" if lines else "")
+
+def _ocr_single_image(image: Image.Image, lang: str, custom_config: str, preprocess: str,
+                      with_confidence: bool) -> Tuple[str, Optional[float], Dict]:
+    """Preprocess lalu OCR satu gambar halaman. Returns: (teks, confidence, statistik halaman)"""
+    ocr_image, stats = preprocess_page_image(image, preprocess)
+    if ocr_image is None:
+        # Halaman kosong: tidak perlu memanggil tesseract
+        return "", (100.0 if with_confidence else None), stats
+    try:
+        engine = get_ocr_engine()
+        started = time.perf_counter()
+        if with_confidence:
+            text, confidence = engine.image_to_text_with_confidence(ocr_image, lang, custom_config)
+        else:
+            text, confidence = engine.image_to_text(ocr_image, lang, custom_config), None
+        stats['ocr_seconds'] = time.perf_counter() - started
+        return text, confidence, stats
+    finally:
+        if ocr_image is not image:
+            ocr_image.close()
+
+def _ocr_page_image(image: Image.Image, lang: str, custom_config: str, preprocess: str,
+                    with_confidence: bool, page_cache: bool) -> Tuple[str, Optional[float], Dict]:
+    """_ocr_single_image dengan cache per halaman berdasarkan hash bitmap + setting OCR"""
+    if not page_cache:
+        return _ocr_single_image(image, lang, custom_config, preprocess, with_confidence)
+
+    key = ocr_cache_key(page_image_hash(image), kind='page', lang=lang, config=custom_config,
+                        preprocess=preprocess)
+    cached = page_cache_get(key)
+    if cached is not None and (cached[1] is not None or not with_confidence):
+        text, confidence = cached
+        return text, confidence, {'page_cache_lookups': 1, 'page_cache_hits': 1}
+
+    text, confidence, stats = _ocr_single_image(image, lang, custom_config, preprocess, with_confidence)
+    page_cache_put(key, text, confidence)
+    stats['page_cache_lookups'] = 1
+    return text, confidence, stats
+
+def _merge_page_stats(page_info: Dict, stats: Dict):
+    """Akumulasi statistik preprocessing/OCR (bisa lebih dari satu pass per halaman)"""
+    for key in PAGE_STAT_KEYS:
+        page_info[key] = page_info.get(key, 0) + stats.get(key, 0)
+    page_info['blank'] = stats.get('blank', False)
+
+def ocr_page_range(pdf_path: str, first_page: int, last_page: int, render_dpi: int, lang: str,
+                   custom_config: str, preprocess: str, adaptive: Optional[Dict] = None,
+                   page_cache: bool = False) -> List[Tuple[int, str, Optional[str], Dict]]:
+    """
+    Rasterize lalu OCR satu rentang halaman secara streaming. Dipanggil langsung atau di proses worker.
+    Mode adaptive ({'low_dpi': .., 'min_confidence': ..}): OCR dulu di DPI rendah, lalu render ulang
+    di render_dpi hanya untuk halaman dengan confidence di bawah threshold.
+    page_cache: pakai ulang teks halaman yang bitmap-nya identik (cover, legenda, rubrik penilaian).
+    Returns: list (nomor halaman, teks, pesan error atau None, info halaman)
+    """
+    first_pass_dpi = adaptive['low_dpi'] if adaptive else render_dpi
+    results = []
+    next_page = first_page
+    try:
+        for page_number, image in iter_pdf_page_images(pdf_path, first_page, last_page, first_pass_dpi):
+            next_page = page_number + 1
+            page_info = {'dpi': first_pass_dpi, 'reocr': False}
+            try:
+                text, confidence, stats = _ocr_page_image(image, lang, custom_config, preprocess,
+                                                          with_confidence=bool(adaptive), page_cache=page_cache)
+                _merge_page_stats(page_info, stats)
+                page_info['confidence'] = confidence
+                if adaptive and confidence < adaptive['min_confidence'] and render_dpi > first_pass_dpi:
+                    # Bebaskan bitmap DPI rendah sebelum render ulang supaya budget memori tetap
+                    image.close()
+                    for _, high_image in iter_pdf_page_images(pdf_path, page_number, page_number, render_dpi):
+                        text, confidence, stats = _ocr_page_image(high_image, lang, custom_config, preprocess,
+                                                                  with_confidence=True, page_cache=page_cache)
+                        _merge_page_stats(page_info, stats)
+                    page_info.update({'dpi': render_dpi, 'reocr': True, 'confidence': confidence})
+                results.append((page_number, text, None, page_info))
+            except Exception as e:
+                results.append((page_number, "", f"Error OCR page {page_number}: {e}", page_info))
+    except Exception as e:
+        results.extend((page_number, "", f"Error mengkonversi PDF: {e}", {})
+                       for page_number in range(next_page, last_page + 1))
+    return results
+
+def _adaptive_settings(settings: Dict) -> Optional[Dict]:
+    """Parameter OCR adaptive dari setting efektif (None jika adaptive tidak aktif)"""
+    if not settings['adaptive']:
+        return None
+    return {'low_dpi': min(OCR_ADAPTIVE_LOW_DPI, settings['dpi']), 'min_confidence': OCR_ADAPTIVE_MIN_CONFIDENCE}
+
+def document_cache_key(content_hash: str, settings: Dict, use_text_layer: bool) -> str:
+    """Key cache teks OCR satu dokumen penuh (hash isi + setting efektif dari resolve_ocr_settings)"""
+    return ocr_cache_key(
+        content_hash,
+        lang=settings['lang'], dpi=settings['dpi'], adaptive=_adaptive_settings(settings), config=settings['config'],
+        first_page=1, last_page=settings['max_pages'], preprocess=settings['preprocess'],
+        text_layer=use_text_layer
+    )
+
+def cached_document_text(content_hash: str, profile: str = None, lang: str = 'ind', doc_type: str = None,
+                         use_text_layer: bool = None) -> Optional[str]:
+    """Teks OCR dokumen dari cache disk tanpa membuka PDF, None jika tidak ada (atau cache nonaktif)"""
+    if not (OCR_CACHE_ENABLED and content_hash):
+        return None
+    if use_text_layer is None:
+        use_text_layer = TEXT_LAYER_ENABLED
+    settings = resolve_ocr_settings(profile, lang, doc_type)
+    return ocr_cache_get(document_cache_key(content_hash, settings, use_text_layer))
+
+def _prepare_pdf_job(pdf_path: str, settings: Dict, use_cache: bool, use_text_layer: bool) -> Dict:
+    """Tahap 1: cek cache dan text layer, tentukan halaman mana yang perlu di-OCR"""
+    print(f"    Memproses PDF: {os.path.basename(pdf_path)} (profil {settings['profile']})")
+
+    # Setting OCR efektif (juga menjadi bagian dari key cache)
+    lang = settings['lang']
+    preprocess = settings['preprocess']
+    job = {
+        'pdf_path': pdf_path,
+        'lang': lang,
+        'preprocess': preprocess,
+        'max_pages': settings['max_pages'],
+        'render_dpi': settings['dpi'],
+        'adaptive': _adaptive_settings(settings),
+        'custom_config': settings['config'],
+        'page_cache': use_cache and OCR_CACHE_ENABLED and OCR_PAGE_CACHE_ENABLED,
+        'cache_key': None,
+        'cached_text': None,
+        'page_texts': {},
+        'pages_to_ocr': [],
+        'text_layer_pages': 0,
+        'had_errors': False,
+        'failed': False,
+    }
+    max_pages = job['max_pages']
+
+    OCR_STATS['documents'] += 1
+
+    if use_cache and OCR_CACHE_ENABLED:
+        try:
+            job['cache_key'] = document_cache_key(file_content_hash(pdf_path), settings, use_text_layer)
+            cached_text = ocr_cache_get(job['cache_key'])
+            if cached_text is not None:
+                print(f"    ⚡ Menggunakan hasil OCR dari cache ({len(cached_text)} karakter)")
+                OCR_STATS['documents_cached'] += 1
+                job['cached_text'] = cached_text
+                return job
+        except OSError as e:
+            print(f"    ⚠ Cache OCR tidak dapat dibaca: {e}")
+            job['cache_key'] = None
+
+    # Check file size
+    try:
+        file_size = os.path.getsize(pdf_path) / (1024*1024)  # in MB
+        print(f"    📄 File size: {file_size:.2f} MB")
+    except OSError as e:
+        print(f"    ❌ File tidak dapat dibaca: {e}")
+        job['failed'] = True
+        return job
+
+    # Limit pages untuk mencegah hang
+    print(f"    ⚙️  Membatasi proses ke {max_pages} halaman pertama")
+
+    # Tentukan per halaman: pakai text layer atau perlu OCR
+    if use_text_layer:
+        layer_texts, page_count = extract_text_layer(pdf_path, max_pages)
+    else:
+        layer_texts, page_count = [], None
+
+    if page_count is None:
+        # Jumlah halaman tidak diketahui: OCR semua halaman dalam limit seperti biasa
+        job['pages_to_ocr'] = list(range(1, max_pages + 1))
+    else:
+        for page_number in range(1, min(page_count, max_pages) + 1):
+            layer_text = layer_texts[page_number - 1] if page_number <= len(layer_texts) else ""
+            if is_text_layer_usable(layer_text):
+                job['page_texts'][page_number] = layer_text
+            else:
+                job['pages_to_ocr'].append(page_number)
+
+    job['text_layer_pages'] = len(job['page_texts'])
+    if use_text_layer and page_count is not None:
+        print(f"    📑 Text layer: {job['text_layer_pages']} halaman, perlu OCR: {len(job['pages_to_ocr'])} halaman")
+
+    if job['pages_to_ocr']:
+        # Verifikasi OCR tersedia (probe hanya dijalankan sekali per proses)
+        ocr_available, ocr_info = probe_tesseract()
+        if not ocr_available:
+            print(f"    ⚠ OCR Engine not available: {ocr_info}")
+            job['pages_to_ocr'] = []
+            job['had_errors'] = True
+            job['failed'] = not job['page_texts']
+
+    return job
+
+def _ocr_tasks_for_job(job: Dict, split_pages: bool) -> List[Tuple]:
+    """Argumen ocr_page_range untuk halaman yang perlu OCR (per halaman jika paralel)"""
+    if split_pages:
+        # Halaman di luar jumlah halaman PDF menghasilkan list kosong dari pdf2image
+        page_ranges = [(page_number, page_number) for page_number in job['pages_to_ocr']]
+    else:
+        page_ranges = _group_consecutive_pages(job['pages_to_ocr'])
+
+    return [(job['pdf_path'], first_page, last_page, job['render_dpi'], job['lang'],
+             job['custom_config'], job['preprocess'], job['adaptive'], job['page_cache'])
+            for first_page, last_page in page_ranges]
+
+def _apply_ocr_results(job: Dict, results: List[Tuple[int, str, Optional[str], Dict]]):
+    """Masukkan hasil ocr_page_range ke job"""
+    for page_number, text, error, page_info in results:
+        if error:
+            print(f"    ❌ {error}")
+            job['had_errors'] = True
+            job['page_texts'][page_number] = ""
+        else:
+            job['page_texts'][page_number] = text
+            job['ocr_pages'] = job.get('ocr_pages', 0) + 1
+            for key in PAGE_STAT_KEYS:
+                OCR_STATS[key] += page_info.get(key, 0)
+            if page_info.get('blank'):
+                OCR_STATS['pages_blank'] += 1
+            if page_info.get('reocr'):
+                job['reocr_pages'] = job.get('reocr_pages', 0) + 1
+                print(f"    🔁 Halaman {page_number} di-OCR ulang pada {page_info['dpi']} DPI "
+                      f"(confidence {page_info['confidence']:.0f})")
+
+def _finish_pdf_job(job: Dict, output_txt_path: Optional[str]) -> str:
+    """Tahap 3: gabungkan teks per halaman sesuai urutan, simpan ke cache dan file"""
+    if job['cached_text'] is not None:
+        _save_ocr_text(job['cached_text'], output_txt_path)
+        return job['cached_text']
+
+    if job['failed'] or not job['page_texts']:
+        print(f"    ❌ Tidak ada halaman yang berhasil diproses: {os.path.basename(job['pdf_path'])}")
+        return ""
 
-def generate_competency_with_ai(competencies_list: List[Dict]) -> str:
+    ocr_page_count = job.get('ocr_pages', 0)
+    OCR_STATS['pages_text_layer'] += job['text_layer_pages']
+    OCR_STATS['pages_ocr'] += ocr_page_count
+    OCR_STATS['pages_reocr'] += job.get('reocr_pages', 0)
+    print(f"    📊 {os.path.basename(job['pdf_path'])}: {job['text_layer_pages']} halaman via text layer, "
+          f"{ocr_page_count} halaman via OCR")
+
+    result_text = "\n".join(job['page_texts'][page_number] for page_number in sorted(job['page_texts']))
+
+    # Jangan cache hasil yang gagal sebagian supaya run berikutnya mencoba lagi
+    if job['cache_key'] and not job['had_errors']:
+        ocr_cache_put(job['cache_key'], result_text)
+
+    _save_ocr_text(result_text, output_txt_path)
+
+    return result_text
+
+def pdf_to_text_ocr_advanced(pdf_path, output_txt_path=None, lang='ind', preprocess=None, dpi=None, use_cache=True,
+                             use_text_layer=None, workers=None, adaptive=None, profile=None, doc_type=None):
+    """Fungsi OCR untuk convert PDF ke text"""
+    texts = pdf_to_text_ocr_batch(
+        [pdf_path],
+        output_txt_paths={pdf_path: output_txt_path} if output_txt_path else None,
+        lang=lang, preprocess=preprocess, dpi=dpi, use_cache=use_cache,
+        use_text_layer=use_text_layer, workers=workers, adaptive=adaptive, profile=profile,
+        doc_types={pdf_path: doc_type} if doc_type else None
+    )
+    return texts.get(pdf_path, "")
+
+def pdf_to_text_ocr_batch(pdf_paths: List[str], output_txt_paths: Dict[str, str] = None, lang='ind',
+                          preprocess=None, dpi=None, use_cache=True, use_text_layer=None,
+                          workers=None, adaptive=None, profile=None,
+                          doc_types: Dict[str, str] = None) -> Dict[str, str]:
     """
-    Menggunakan AI untuk membuat Skills (Competency) dari data Excel
+    OCR banyak PDF sekaligus. Dengan workers > 1 halaman dari semua PDF disebar ke process pool
+    (rasterize + tesseract di worker), urutan halaman tiap dokumen tetap terjaga.
+    dpi/adaptive/preprocess default mengikuti profil OCR; doc_types ({path: 'CV'/'ASSESSMENT'})
+    menentukan batas halaman per dokumen.
+    Returns: {pdf_path: teks}
     """
-    if not competencies_list:
-        return ""
-    
-    # Format data competency untuk AI
-    competency_data = "\n".join([
-        f"- {comp['competency']} (Level {comp['level']}/5)"
-        for comp in competencies_list
-    ])
-    
-    prompt = f"""Dari data competency Excel berikut, identifikasi dan format kompetensi kandidat dalam Bahasa Indonesia. Ambil maksimal 10 kompetensi dengan level minimal 2.
+    if use_text_layer is None:
+        use_text_layer = TEXT_LAYER_ENABLED
+    doc_types = doc_types or {}
+    if workers is None:
+        workers = OCR_WORKERS
+    output_txt_paths = output_txt_paths or {}
 
-        Data Competency:
-        {competency_data}
-        
-        ATURAN SANGAT PENTING:
-        1. Urutkan dari level tertinggi ke terendah
-        2. Hanya ambil kompetensi dengan level >= 2
-        3. Format: • [Nama Kompetensi] (Lvl. [X]/5) hanya berikan spasi setelah bullet point
-        4. Maksimal 10 kompetensi
-        5. Jangan ada penjelasan tambahan, langsung ke poin-poin
-        6. jangan gunakan \t setelah bullet point, cukup spasi saja jadi bullet pointnya seperti ini "• Career Planning & Succession Management (Lvl. 4/5)" tanpa tab setelah bullet pointnya
-        
-        Format output yang diharapkan (urutkan dari level tertinggi ke terendah):
-        • Career Planning & Succession Management (Lvl. 4/5)
-        • Employee Performance Management (Lvl. 4/5)
-        • Human Capital Strategy (Lvl. 4/5)
-        • Industrial Relations Management (Lvl. 3/5)
-        • Learning Management & Development (Lvl. 3/5)
-        • Organization Planning & Development (Lvl. 3/5)
-        • Talent Scouting & Acquisition (Lvl. 2/5)
+    # Tahap 1: cache & text layer (murah, di proses utama)
+    jobs = []
+    seen_paths = set()
+    for pdf_path in pdf_paths:
+        if pdf_path in seen_paths:
+            continue
+        seen_paths.add(pdf_path)
+        settings = resolve_ocr_settings(profile, lang, doc_types.get(pdf_path), dpi, adaptive, preprocess)
+        jobs.append(_prepare_pdf_job(pdf_path, settings, use_cache, use_text_layer))
 
-        Output:"""
-    
+    # Tahap 2: rasterize + OCR halaman yang tersisa
+    pending_pages = sum(len(job['pages_to_ocr']) for job in jobs)
+    executor = get_ocr_executor(workers) if pending_pages > 1 else None
+
+    if executor is None:
+        for job in jobs:
+            for task in _ocr_tasks_for_job(job, split_pages=False):
+                print(f"    🔍 OCR {os.path.basename(job['pdf_path'])} halaman {task[1]}-{task[2]}")
+                _apply_ocr_results(job, ocr_page_range(*task))
+    else:
+        # Setiap task memegang maksimal OCR_RENDER_WINDOW bitmap, jadi jumlah task yang berjalan
+        # dibatasi supaya total bitmap di semua worker <= OCR_MAX_PAGE_BITMAPS
+        max_in_flight = max(1, OCR_MAX_PAGE_BITMAPS // min(OCR_RENDER_WINDOW, OCR_MAX_PAGE_BITMAPS))
+        print(f"    🚀 OCR paralel: {pending_pages} halaman dari {len(jobs)} dokumen "
+              f"(maks {max_in_flight} halaman di memori)")
+        pending_tasks = [(job, task) for job in jobs for task in _ocr_tasks_for_job(job, split_pages=True)]
+        pending_tasks.reverse()
+        in_flight = {}
+        while pending_tasks or in_flight:
+            while pending_tasks and len(in_flight) < max_in_flight:
+                job, task = pending_tasks.pop()
+                in_flight[executor.submit(ocr_page_range, *task)] = job
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = in_flight.pop(future)
+                try:
+                    _apply_ocr_results(job, future.result())
+                except Exception as e:
+                    print(f"    ❌ Error worker OCR {os.path.basename(job['pdf_path'])}: {e}")
+                    job['had_errors'] = True
+
+    # Tahap 3: gabungkan hasil per dokumen
+    texts = {job['pdf_path']: _finish_pdf_job(job, output_txt_paths.get(job['pdf_path'])) for job in jobs}
+    # Eviction cache sekali per batch (bukan per entry): scan folder cache hanya di proses utama
+    if use_cache and pending_pages:
+        evict_ocr_cache()
+    return texts
+
+def _save_ocr_text(text: str, output_txt_path: Optional[str]):
+    """Simpan hasil OCR ke file txt jika diminta"""
+    if not output_txt_path:
+        return
     try:
-        model = genai.GenerativeModel(
-            model_name=GEMINI_MODEL,
-            generation_config={
-                "temperature": 0.2,
-                "top_p": 0.8,
-                "top_k": 40,
-                "max_output_tokens": 1024,
-            }
-        )
-        
-        response = model.generate_content(prompt)
-        
-        if response.text:
-            return response.text.strip()
-        else:
-            # Fallback ke format manual
-            return format_competency_string(competencies_list[:11])
-            
+        os.makedirs(os.path.dirname(output_txt_path), exist_ok=True)
+        with open(output_txt_path, 'w', encoding='utf-8') as f:
+            f.write(text)
     except Exception as e:
-        print(f"    Error generating competency with AI: {e}")
-        # Fallback ke format manual
-        return format_competency_string(competencies_list[:11])
+        print(f"    ❌ Error saving text: {e}")
 
-def analyze_with_gemini_advanced(text_content: str, competency_data: List[Dict] = None, categories: List[str] = ['education', 'experience', 'business_impact', 'position', 'summary_executive', 'skills_competency']) -> Dict:
+# ==================== HEADER-ONLY IDENTIFICATION ====================
+def _ocr_cached(cache_key: Optional[str], compute) -> Tuple[str, bool]:
+    """Helper cache kecil untuk hasil OCR parsial. Returns: (teks, dari cache)"""
+    if cache_key:
+        cached_text = ocr_cache_get(cache_key)
+        if cached_text is not None:
+            return cached_text, True
+    text = compute()
+    if cache_key:
+        ocr_cache_put(cache_key, text)
+    return text, False
+
+def identify_from_pdf_header(pdf_path: str, lang: str = 'ind', use_cache: bool = True,
+                             use_text_layer: bool = None, profile: str = None) -> Dict:
     """
-    Menggunakan Gemini AI untuk menganalisis teks dan mengekstrak informasi
+    Pass identifikasi murah untuk NIK & nama: text layer halaman 1, lalu OCR potongan header
+    halaman 1, lalu halaman 1 penuh. Berhenti di tahap pertama yang menemukan NIK.
+    Aman dijalankan di proses worker.
+    NIK tanpa label (confidence rendah) disimpan tetapi tahap berikutnya tetap dicoba untuk mencari NIK berlabel.
+    Returns: {'nik', 'nama', 'stage', 'nik_evidence'} dengan stage 'text_layer' / 'header' / 'first_page' / None
+             dan nik_evidence = hit dari scan_identity (alasan NIK dipilih)
     """
-    
-    results = {}
-    
-    prompts = {
-        'education': """
-        Dari teks CV/penilaian berikut, ekstrak informasi tentang pendidikan dalam Bahasa Indonesia:
-        1. Gelar pendidikan tertinggi
-        2. Institusi pendidikan
-        3. Tahun lulus
-        4. Jurusan/field study
-        5. Usahakan jika ada S1 maka tampilkan S1 terlebih dahulu baru S2 jika ada S2
-        
-        Format output yang diharapkan: "S1 Teknik Informatika, ITB | S2 Master of Business Administration, ITB"
-        Hanya tampilkan yang memang ada saja, jika tidak ada jangan ditampilkan dan jika ada S1 maka tampilkan terlebih dahulu yang S1 baru S2 jika S1 tidak ada maka gunakan template seperti ini "S1 Teknik Informatika, ITB" atau pada S2 seperti ini "S2 Master of Business Administration, ITB"
-        Jangan gunakan bintang atau poin-poin, langsung format string seperti contoh.
-        
-        Teks yang akan dianalisis:
-        """,
-        
-        'experience': """
-        Dari teks CV/penilaian berikut, ekstrak informasi tentang pengalaman kerja dalam Bahasa Indonesia:
-        Ambil 4 posisi jabatan terakhir saja.
-        
-        Format output yang diharapkan:
-        Direktur Commercial
-        PT Telekomunikasi Selular
-        2021 – Saat ini
-        
-        Head of Human Capital Management 
-        PT Finnet Indonesia
-        2020 – 2021
-        
-        VP Human Capital Management 
-        PT Jalin Pembayaran Nusantara 
-        2018 – 2020
-        
-        SO Human Capital
-        PT Jalin Pembayaran Nusantara
-        2017 – 2018
-        
-        Jangan ada preambles pada awal jawaban jadi langsung pada 4 posisi jabatan terakhirnya, jangan gunakan bintang untuk poin-poinnya, jangan tampilkan reasoning, langsung format seperti contoh dan untuk setiap posisi jabatan pergunakan huruf kapital diawalnya saja misal SO Human Capital serta nama companynya juga huruf awalnya saja untuk huruf PT tetap besar misal PT Telkom Indonesia
-        
-        Teks yang akan dianalisis:
-        """,
-        
-        'business_impact': """
-        Dari teks CV/penilaian berikut, identifikasi potensi dampak bisnis dalam Bahasa Inggris:
-        Ambil top 5 business impact.
+    if use_text_layer is None:
+        use_text_layer = TEXT_LAYER_ENABLED
+    result = {'nik': None, 'nama': None, 'stage': None, 'nik_evidence': None}
 
-        ATURAN SANGAT PENTING:
-        - DILARANG KERAS menulis: "Berikut adalah", "Berdasarkan teks", "Top 5", atau penjelasan apapun
-        - LANGSUNG mulai dengan bullet point pertama
-        - HARUS tepat 5 poin
-        - Format: • [Dampak bisnis]
-        - Hanya kalimat singkat pada dampak bisnis saja seperti 5-7 kata saja, tanpa tambahan konteks atau penjelasan lainnya jadi to the point saja pada business impactnya
-        
-        Format output yang diharapkan:
-        • Led a major organizational transformation project
-        • Enhanced Total Rewards framework
-        • Established, updated, and standardized Human Capital policies
-        • Revamped Procurement policies and procedures
-        • Redesigned and enhanced workplace areas
-        
-        Jangan ada preambles atau penjelasan pada awal response seperti "Berikut adalah top 5 potensi dampak bisnis yang diidentifikasi dari teks CV/penilaian:" hilangkan dan tidak usah digunakan saja jadi response jawaban seperti itu sehingga langsung ke poin-poin business impactnya.
-        
-        Teks yang akan dianalisis:
-        """,
-        
-        'position': """
-        Dari teks CV/penilaian berikut, identifikasi POSISI TERAKHIR/JABATAN TERAKHIR dalam Bahasa Indonesia:
-        Hanya ambil satu posisi terakhir saja.
-        
-        Contoh output:
-        Direktur Commercial
-        
-        atau
-        
-        Head of Human Capital Management
-        
-        Hanya berikan jawaban singkat nama posisinya saja, tanpa penjelasan tambahan.
-        
-        Teks yang akan dianalisis:
-        """,
-        
-        'summary_executive': """
-        Dari teks CV dan Assessment berikut, buatlah Summary Executive profesional dalam Bahasa Indonesia.
-        
-        Persyaratan:
-        1. Panjang: 3-5 kalimat
-        2. Highlight: Posisi terakhir, pengalaman tahun, keahlian utama, pencapaian signifikan
-        3. Tone: Profesional dan ringkas
-        4. Fokus pada value dan kontribusi kandidat
-        
-        Contoh format:
-        "Profesional berpengalaman 15+ tahun di bidang Human Capital Management dengan track record memimpin transformasi organisasi di perusahaan telekomunikasi dan fintech. Saat ini menjabat sebagai Direktur Commercial di PT Telekomunikasi Selular, sebelumnya sebagai Head of Human Capital Management di PT Finnet Indonesia. Memiliki keahlian kuat dalam strategic planning, talent management, dan organizational development. Sukses mengimplementasikan SAP-Based HCIS dan meningkatkan employee engagement hingga 85%. Pendidikan S2 Master of Business Administration dari ITB dengan spesialisasi Strategic Management."
-        
-        Jangan ada preambles, langsung summary executive-nya.
-        
-        Teks yang akan dianalisis:
-        """,
-        
-        'skills_competency': """
-        Dari data competency Excel berikut, identifikasi dan format kompetensi kandidat dalam Bahasa Indonesia. Ambil maksimal 10 kompetensi dengan level minimal 2.
+    def _check(text, stage):
+        hits = scan_identity(text)
+        if hits['nama'] and not result['nama']:
+            result['nama'] = hits['nama']['value']
+        evidence = hits['nik']
+        if evidence and (result['nik_evidence'] is None
+                         or evidence['confidence'] > result['nik_evidence']['confidence']):
+            result.update({'nik': evidence['value'], 'stage': stage, 'nik_evidence': {**evidence, 'stage': stage}})
+        return bool(result['nik_evidence']) and result['nik_evidence']['confidence'] >= IDENTITY_STOP_CONFIDENCE
 
-        ATURAN SANGAT PENTING:
-        1. Urutkan dari level tertinggi ke terendah
-        2. Hanya ambil kompetensi dengan level >= 2
-        3. Format: • [Nama Kompetensi] (Lvl. [X]/5) hanya berikan spasi setelah bullet point
-        4. Maksimal 10 kompetensi
-        5. Jangan ada penjelasan tambahan, langsung ke poin-poin
-        6. jangan gunakan \t setelah bullet point, cukup spasi saja jadi bullet pointnya seperti ini "• Career Planning & Succession Management (Lvl. 4/5)" tanpa tab setelah bullet pointnya
+    # 1. Text layer halaman pertama (tanpa render sama sekali)
+    if use_text_layer:
+        layer_texts, _ = extract_text_layer(pdf_path, max_pages=1)
+        if layer_texts and is_text_layer_usable(layer_texts[0]) and _check(layer_texts[0], 'text_layer'):
+            return result
 
-        Format output yang diharapkan (urutkan dari level tertinggi ke terendah):
-        • Career Planning & Succession Management (Lvl. 4/5)
-        • Employee Performance Management (Lvl. 4/5)
-        • Human Capital Strategy (Lvl. 4/5)
-        • Industrial Relations Management (Lvl. 3/5)
-        • Learning Management & Development (Lvl. 3/5)
-        • Organization Planning & Development (Lvl. 3/5)
-        • Talent Scouting & Acquisition (Lvl. 2/5)
+    if not probe_tesseract()[0]:
+        return result
 
-        Output:
-        """
-    }
-    
-    generation_config = {
-        "temperature": 0.3,
-        "top_p": 0.8,
-        "top_k": 40,
-        "max_output_tokens": 1024,
-    }
-    
-    safety_settings = [
-        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-    ]
-    
-    try:
-        model = genai.GenerativeModel(
-            model_name=GEMINI_MODEL,
-            generation_config=generation_config,
-            safety_settings=safety_settings
-        )
-    except Exception as e:
-        print(f"Error inisialisasi model Gemini: {e}")
-        for category in categories:
-            results[category] = f"Error inisialisasi model: {str(e)}"
-        return results
-    
-    for category in categories:
-        if category in prompts:
-            print(f"  Menganalisis {category} dengan Gemini AI...")
-            
+    settings = resolve_ocr_settings(profile, lang, 'ASSESSMENT')
+    content_hash = file_content_hash(pdf_path) if use_cache and OCR_CACHE_ENABLED else None
+
+    def _key(mode):
+        if not content_hash:
+            return None
+        return ocr_cache_key(content_hash, mode=mode, lang=lang, dpi=settings['dpi'], config=settings['config'],
+                             preprocess=settings['preprocess'], header_ratio=IDENTIFICATION_HEADER_RATIO)
+
+    def _ocr_first_page(header_only):
+        for _, page_image in iter_pdf_page_images(pdf_path, 1, 1, settings['dpi']):
+            image = page_image
+            if header_only:
+                width, height = page_image.size
+                image = page_image.crop((0, 0, width, int(height * IDENTIFICATION_HEADER_RATIO)))
             try:
-                # Special handling untuk skills_competency
-                if category == 'skills_competency':
-                    if competency_data and len(competency_data) > 0:
-                        # Format competency data untuk prompt
-                        competency_list = "Data Competency:\n"
-                        for comp in competency_data:
-                            comp_name = comp.get('competency', '')
-                            level = comp.get('level', 0)
-                            competency_list += f"- {comp_name} (Level {level}/5)\n"
-                        
-                        # Replace placeholder dengan data actual
-                        full_prompt = prompts[category].replace('{competency_list}', competency_list)
-                    else:
-                        print(f"    ⚠ Tidak ada data competency, menggunakan fallback")
-                        results[category] = ""
-                        continue
-                else:
-                    max_text_length = 30000
-                    truncated_text = text_content[:max_text_length] + "..." if len(text_content) > max_text_length else text_content
-                    full_prompt = prompts[category] + "\n\n" + truncated_text
-                
-                response = model.generate_content(full_prompt)
-                
-                if response.text:
-                    results[category] = response.text.strip()
-                else:
-                    results[category] = "Tidak dapat menganalisis dengan AI"
-                    
+                text, _, _ = _ocr_single_image(image, lang, settings['config'], settings['preprocess'],
+                                               with_confidence=False)
+            finally:
+                # Bitmap halaman ditutup oleh iter_pdf_page_images; potongan header milik fungsi ini
+                if image is not page_image:
+                    image.close()
+            return text
+        return ""
+
+    # 2. OCR potongan header halaman pertama (biasanya berisi NIK & nama)
+    header_text, _ = _ocr_cached(_key('header'), lambda: _ocr_first_page(True))
+    if _check(header_text, 'header'):
+        return result
+
+    # 3. Halaman pertama penuh
+    page_text, _ = _ocr_cached(_key('first_page'), lambda: _ocr_first_page(False))
+    _check(page_text, 'first_page')
+    return result
+
+def identify_assessments(pdf_paths: List[str], lang: str = 'ind', workers: int = None,
+                         profile: str = None) -> Dict[str, Dict]:
+    """
+    Cari NIK & nama dari banyak Assessment: pass header dulu (paralel jika ada worker),
+    OCR dokumen penuh hanya untuk yang NIK-nya belum ketemu.
+    Returns: {pdf_path: {'nik', 'nama', 'stage'}}
+    """
+    if workers is None:
+        workers = OCR_WORKERS
+    results = {}
+    executor = get_ocr_executor(workers) if len(pdf_paths) > 1 else None
+
+    if executor is None:
+        for pdf_path in pdf_paths:
+            try:
+                results[pdf_path] = identify_from_pdf_header(pdf_path, lang, profile=profile)
             except Exception as e:
-                print(f"    Error dalam analisis Gemini untuk {category}: {e}")
-                results[category] = f"Error: {str(e)}"
-            
-            time.sleep(0.5)
-    
+                print(f"    ⚠ Pass header gagal untuk {os.path.basename(pdf_path)}: {e}")
+                results[pdf_path] = {'nik': None, 'nama': None, 'stage': None, 'nik_evidence': None}
+    else:
+        # Setiap pass header me-render halaman 1 (bitmap); batasi task yang berjalan seperti pdf_to_text_ocr_batch
+        max_in_flight = max(1, OCR_MAX_PAGE_BITMAPS // min(OCR_RENDER_WINDOW, OCR_MAX_PAGE_BITMAPS))
+        pending_paths = list(reversed(pdf_paths))
+        in_flight = {}
+        while pending_paths or in_flight:
+            while pending_paths and len(in_flight) < max_in_flight:
+                pdf_path = pending_paths.pop()
+                in_flight[executor.submit(identify_from_pdf_header, pdf_path, lang, profile=profile)] = pdf_path
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                pdf_path = in_flight.pop(future)
+                try:
+                    results[pdf_path] = future.result()
+                except Exception as e:
+                    print(f"    ⚠ Pass header gagal untuk {os.path.basename(pdf_path)}: {e}")
+                    results[pdf_path] = {'nik': None, 'nama': None, 'stage': None, 'nik_evidence': None}
+        # Urutan hasil mengikuti urutan input (bukan urutan selesai)
+        results = {pdf_path: results[pdf_path] for pdf_path in pdf_paths if pdf_path in results}
+
+    for pdf_path, result in results.items():
+        if result['stage']:
+            OCR_STATS[f"nik_via_{result['stage']}"] += 1
+
+    # Fallback: OCR dokumen penuh (hasilnya masuk cache dan dipakai ulang di tahap pemrosesan)
+    fallback_paths = [pdf_path for pdf_path, result in results.items() if not result['nik']]
+    if fallback_paths:
+        print(f"    🔎 NIK tidak ada di header untuk {len(fallback_paths)} dokumen, OCR dokumen penuh...")
+        full_texts = pdf_to_text_ocr_batch(fallback_paths, lang=lang, workers=workers, profile=profile,
+                                           doc_types={pdf_path: 'ASSESSMENT' for pdf_path in fallback_paths})
+        for pdf_path in fallback_paths:
+            # NIK bisa ada di halaman mana saja: pindai seluruh teks (tetap satu pass)
+            hits = scan_identity(full_texts.get(pdf_path, ""), max_chars=None)
+            nama = hits['nama']['value'] if hits['nama'] else None
+            if hits['nik']:
+                OCR_STATS['nik_via_full_document'] += 1
+                results[pdf_path] = {'nik': hits['nik']['value'], 'nama': nama or results[pdf_path]['nama'],
+                                     'stage': 'full_document',
+                                     'nik_evidence': {**hits['nik'], 'stage': 'full_document'}}
+            elif nama and not results[pdf_path]['nama']:
+                results[pdf_path]['nama'] = nama
+
+    # Hasil OCR header ditulis ke cache oleh worker; eviction sekali di proses utama
+    evict_ocr_cache()
     return results
 
-def pdf_to_text_ocr_advanced(pdf_path, output_txt_path=None, lang='ind', preprocess=True, dpi=300):
-    """Fungsi OCR untuk convert PDF ke text"""
-    print(f"    Memproses PDF: {os.path.basename(pdf_path)}")
-    
-    try:
-        # First verify OCR is available
-        try:
-            pytesseract.get_tesseract_version()
-            print(f"    ✓ Tesseract tersedia")
-        except Exception as ocr_err:
-            print(f"    ⚠ OCR Engine not available: {ocr_err}")
-            return ""
-        
-        # Check file size
-        file_size = os.path.getsize(pdf_path) / (1024*1024)  # in MB
-        print(f"    📄 File size: {file_size:.2f} MB")
-        
-        # Limit pages untuk mencegah hang
-        max_pages = 10
-        print(f"    ⚙️  Membatasi proses ke {max_pages} halaman pertama")
-        
-        try:
-            print(f"    🕐 Mengkonversi PDF ke gambar...")
-            # Convert with limited pages
-            images = convert_from_path(
-                pdf_path, 
-                dpi=200,  # Reduced DPI untuk kecepatan
-                first_page=1, 
-                last_page=max_pages,
-                thread_count=1  # Single thread untuk stabilitas
-            )
-            
-            if not images:
-                print(f"    ❌ Tidak ada gambar yang dihasilkan")
-                return ""
-                
-            print(f"    ✓ Berhasil mengkonversi {len(images)} halaman")
-            
-        except Exception as e:
-            print(f"    ❌ Error mengkonversi PDF: {e}")
-            return ""
-        
-    except Exception as e:
-        print(f"    ❌ Error dalam setup OCR: {e}")
-        return ""
-    
-    # Process images
-    full_text = []
-    
-    for i, image in enumerate(images, start=1):
-        print(f"    🔍 Processing page {i}/{len(images)}")
-        
-        if preprocess:
-            # Simple preprocessing
-            image = image.convert('L')  # Grayscale saja
-        
-        # OCR config
-        custom_config = r'--oem 3 --psm 6 -l ind'
-        
-        try:
-            text = pytesseract.image_to_string(image, lang=lang, config=custom_config)
-            full_text.append(text)
-            print(f"    ✓ Page {i} selesai ({len(text)} karakter)")
-        except Exception as e:
-            print(f"    ❌ Error OCR page {i}: {e}")
-            full_text.append("")
-    
-    result_text = "\n".join(full_text)
-    
-    # Save if requested
-    if output_txt_path:
-        try:
-            os.makedirs(os.path.dirname(output_txt_path), exist_ok=True)
-            with open(output_txt_path, 'w', encoding='utf-8') as f:
-                f.write(result_text)
-        except Exception as e:
-            print(f"    ❌ Error saving text: {e}")
-    
-    return result_text
+# Karakter pemisah/noise di nama file (angka, _, -, ., kurung) -> spasi
+_FILENAME_SEPARATOR_RE = re.compile(r'[\d_\-\.\(\)\[\]\{\}]+')
+# Kata penanda dokumen yang bukan bagian nama
+_FILENAME_NOISE_WORDS_RE = re.compile(r'resume\s*|curriculum\s*vitae\s*|application\s*', re.IGNORECASE)
 
-def extract_name_from_filename(filename):
-    """Ekstrak nama dari filename dengan berbagai pattern"""
-    # Hapus ekstensi file
+@lru_cache(maxsize=16384)
+def extract_name_from_filename(filename: str) -> str:
+    """
+    Ekstrak nama dari filename: buang ekstensi, angka/tanda baca, kata penanda (resume, curriculum vitae,
+    application) dan token "CV", lalu title case. Contoh: "CV_budi_santoso_2023.pdf" -> "Budi Santoso"
+    """
     name = os.path.splitext(filename)[0]
-    
-    print(f"  Debug - Original filename: {filename}")
-    print(f"  Debug - Name after removing extension: {name}")
-    
-    # HAPUS SEMUA PATTERN CV (case-insensitive) TERLEBIH DAHULU
-    # Pattern untuk menghapus "CV_" di awal, tengah, atau akhir
-    patterns_to_remove = [
-        # 1. Pattern untuk CV di awal dengan berbagai separator
-        r'^cv[\s_\-]+',           # "CV_" di awal
-        r'^cv$',                  # Hanya "CV"
-        
-        # 2. Pattern untuk CV di tengah dengan berbagai separator
-        r'[\s_\-]+cv[\s_\-]+',    # "_CV_" di tengah
-        
-        # 3. Pattern untuk CV di akhir
-        r'[\s_\-]+cv$',           # "_CV" di akhir
-        
-        # 4. Pattern khusus untuk "Cv_" (huruf besar C, kecil v)
-        r'^Cv[\s_\-]+',           # "Cv_" di awal
-        r'[\s_\-]+Cv[\s_\-]+',    # "_Cv_" di tengah
-        r'[\s_\-]+Cv$',           # "_Cv" di akhir
-        
-        # 5. Hapus karakter khusus dan angka
-        r'[\d_\-\.\(\)\[\]\{\}]+',
-        
-        # 6. Pattern umum lainnya
-        r'resume[\s_\-]*',
-        r'curriculum[\s_\-]*vitae[\s_\-]*',
-        r'application[\s_\-]*',
-        r'^[\s_\-]+',             # Spasi/underscore di awal
-        r'[\s_\-]+$',             # Spasi/underscore di akhir
-    ]
-    
-    for pattern in patterns_to_remove:
-        name = re.sub(pattern, ' ', name, flags=re.IGNORECASE)  # Gunakan flag di luar pola
-        # Debug setiap step
-        # print(f"  Debug - After pattern '{pattern}': {name}")
-    
-    # HAPUS KHUSUS untuk kasus "CV_nama_kandidat" 
-    # Split by underscore dan ambil bagian yang bukan "CV" (case-insensitive)
-    parts = re.split(r'[\s_\-]+', name)
-    print(f"  Debug - Parts after split: {parts}")
-    
-    filtered_parts = []
-    for part in parts:
-        part_lower = part.lower()
-        # Skip jika bagian adalah "cv" dalam berbagai bentuk
-        if part_lower in ['cv', 'c_v', 'c-v']:
-            continue
-        # Skip jika bagian terlalu pendek (kurang dari 2 karakter)
-        if len(part) < 2:
+    name = _FILENAME_NOISE_WORDS_RE.sub(' ', _FILENAME_SEPARATOR_RE.sub(' ', name))
+    # Token "CV" (di awal/tengah/akhir) dan token 1 huruf dibuang
+    return ' '.join(part for part in name.split() if len(part) >= 2 and part.lower() != 'cv').title()
+
+# ==================== NAME MATCHING ====================
+# Skor minimum pasangan CV-Assessment (name_similarity / Dice bigram, bukan SequenceMatcher). Dikalibrasi
+# dengan bench_name_match_threshold.py: recall ~0.99 pada variasi nama file/header, false positive antar
+# orang yang berbagi satu token nama ~3%
+NAME_MATCH_THRESHOLD = 0.72
+# Di bawah skor ini pasangan masih mungkin orang berbeda yang berbagi token nama: dicantumkan di laporan
+NAME_MATCH_REVIEW_SCORE = 0.85
+# Kunci blocking = prefix setiap token nama (toleran salah ketik di akhir kata: Muhamad/Muhammad)
+NAME_BLOCK_PREFIX = 3
+# Kunci yang terlalu umum (mis. "muh" untuk ribuan Muhammad) diabaikan jika nama punya kunci lain
+NAME_BLOCK_MAX_SIZE = 1000
+# Jumlah kandidat per nama (paling banyak berbagi kunci) yang dihitung skor penuhnya
+NAME_MATCH_MAX_CANDIDATES = 20
+# Gelar/sapaan yang bukan bagian nama
+NAME_STOPWORDS = {
+    'dr', 'drs', 'dra', 'ir', 'prof', 'hj', 'st', 'se', 'sh', 'mm', 'mba', 'msc', 'mt', 'msi', 'mkom',
+    'skom', 'ssi', 'spd', 'sos', 'ssos', 'ak', 'cpa', 'bapak', 'ibu', 'sdr', 'sdri', 'assessment', 'penilaian',
+    'laporan', 'report', 'hasil', 'cv', 'resume',
+}
+_NAME_TOKEN_RE = re.compile(r'[^\W\d_]+')
+
+@lru_cache(maxsize=65536)
+def name_tokens(name: str) -> Tuple[str, ...]:
+    """Token nama ternormalisasi: huruf kecil, tanpa angka/tanda baca/gelar"""
+    if not name:
+        return ()
+    return tuple(token for token in _NAME_TOKEN_RE.findall(name.lower())
+                 if len(token) >= 2 and token not in NAME_STOPWORDS)
+
+@lru_cache(maxsize=65536)
+def name_bigrams(tokens: Tuple[str, ...]) -> frozenset:
+    """Bigram karakter setiap token (dengan spasi sebagai batas kata)"""
+    return frozenset(padded[i:i + 2] for padded in (f" {token} " for token in tokens)
+                     for i in range(len(padded) - 1))
+
+def name_similarity(a: Tuple[str, ...], b: Tuple[str, ...]) -> float:
+    """
+    Similarity dua nama (token dari name_tokens): koefisien Dice atas bigram karakter. Tidak peka urutan
+    kata, toleran salah ketik, dan jauh lebih cepat dari SequenceMatcher (operasi set di C).
+    Nama yang hanya sama nama depannya (Budi Santoso / Budi Hartono) mendapat skor rendah.
+    """
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    a_bigrams, b_bigrams = name_bigrams(a), name_bigrams(b)
+    return 2 * len(a_bigrams & b_bigrams) / (len(a_bigrams) + len(b_bigrams))
+
+class NameBlockIndex:
+    """
+    Inverted index prefix token nama -> posisi nama. Kandidat untuk satu nama = nama yang berbagi kunci,
+    diurutkan dari yang paling banyak berbagi kunci; hanya `limit` teratas yang dihitung skor penuhnya.
+    """
+
+    def __init__(self, names: List[Tuple[str, ...]]):
+        self._postings = defaultdict(list)
+        for position, tokens in enumerate(names):
+            for key in {token[:NAME_BLOCK_PREFIX] for token in tokens}:
+                self._postings[key].append(position)
+
+    def candidates(self, tokens: Tuple[str, ...], limit: int = NAME_MATCH_MAX_CANDIDATES) -> List[int]:
+        postings = sorted((self._postings[key] for key in {token[:NAME_BLOCK_PREFIX] for token in tokens}
+                           if key in self._postings), key=len)
+        if not postings:
+            return []
+        shared_keys = Counter()
+        for posting in [posting for posting in postings if len(posting) <= NAME_BLOCK_MAX_SIZE] or postings[:1]:
+            shared_keys.update(posting)
+        return [position for position, _ in shared_keys.most_common(limit)]
+
+def match_names_optimal(queries: List[List[str]], names: List[str],
+                        threshold: float = NAME_MATCH_THRESHOLD) -> List[Tuple[int, int, float]]:
+    """
+    Pasangan satu-satu terbaik antara queries (tiap query: beberapa alternatif nama, skor = maksimum)
+    dan names. Kandidat dibatasi lewat NameBlockIndex, lalu setiap komponen terhubung graf kandidat
+    diselesaikan dengan linear_sum_assignment (total skor maksimum, bukan greedy sesuai urutan).
+    Skor yang sama (mis. dua CV dengan nama identik) dimenangkan indeks terkecil (urutan input). Nama yang tidak
+    berbagi kunci blocking dengan query tidak pernah dibandingkan (salah ketik di 3 huruf awal semua token).
+    Returns: [(indeks query, indeks name, skor)] dengan skor >= threshold, urut indeks query
+    """
+    name_token_list = [name_tokens(name) for name in names]
+    index = NameBlockIndex(name_token_list)
+
+    edges = {}
+    for query_index, alternatives in enumerate(queries):
+        alternative_tokens = [tokens for tokens in {name_tokens(name) for name in alternatives if name} if tokens]
+        candidates = set()
+        for tokens in alternative_tokens:
+            candidates.update(index.candidates(tokens))
+        for name_index in candidates:
+            score = max(name_similarity(tokens, name_token_list[name_index]) for tokens in alternative_tokens)
+            if score >= threshold:
+                edges[(query_index, name_index)] = score
+
+    # Komponen terhubung (union-find) supaya matriks assignment tetap kecil walau dokumen ribuan
+    parent = {}
+    def find(node):
+        while parent.setdefault(node, node) != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+    for query_index, name_index in edges:
+        parent[find(('q', query_index))] = find(('n', name_index))
+    components = defaultdict(list)
+    for edge in edges:
+        components[find(('q', edge[0]))].append(edge)
+
+    pairs = []
+    for component_edges in components.values():
+        rows = sorted({query_index for query_index, _ in component_edges})
+        cols = sorted({name_index for _, name_index in component_edges})
+        if len(component_edges) == 1:
+            edge = component_edges[0]
+            pairs.append((edge[0], edge[1], edges[edge]))
             continue
-        filtered_parts.append(part)
-    
-    name = ' '.join(filtered_parts)
-    
-    # Clean up: hapus spasi berlebih
-    name = re.sub(r'\s+', ' ', name).strip()
-    
-    print(f"  Debug - Final name before title case: {name}")
-    
-    # Title case untuk nama
-    if name:
-        name = name.title()
-    
-    print(f"  Debug - Final name: {name}")
-    
-    return name
+        row_position = {query_index: position for position, query_index in enumerate(rows)}
+        col_position = {name_index: position for position, name_index in enumerate(cols)}
+        scores = np.zeros((len(rows), len(cols)))
+        for query_index, name_index in component_edges:
+            scores[row_position[query_index], col_position[name_index]] = edges[(query_index, name_index)]
+        for row, col in zip(*linear_sum_assignment(scores, maximize=True)):
+            if scores[row, col] >= threshold:
+                pairs.append((rows[row], cols[col], float(scores[row, col])))
+    return sorted(pairs)
 
-def group_and_match_documents(pdf_files: List[str]) -> Dict[str, Dict]:
+def group_and_match_documents(pdf_files: List[str], ocr_profile: str = None,
+                              registry: CandidateRegistry = None,
+                              document_hashes: Dict[str, str] = None) -> Dict[str, Dict]:
     """
     Mengelompokkan dan mencocokkan CV dengan Assessment berdasarkan nama
+    registry + document_hashes ({path: hash isi}): identitas Assessment yang sudah dikenal tidak di-OCR ulang
     """
+    document_hashes = document_hashes or {}
     print("\n" + "="*60)
     print("MENGGABUNGKAN CV DENGAN ASSESSMENT BERDASARKAN NAMA")
     print("="*60)
@@ -635,16 +3280,45 @@ def group_and_match_documents(pdf_files: List[str]) -> Dict[str, Dict]:
     
     print(f"\nMencari NIK dari file Assessment...")
     
+    # Identifikasi NIK dari header halaman pertama, OCR penuh hanya jika perlu
+    assessment_paths = [doc['path'] for docs in documents_by_filename_name.values()
+                        for doc in docs if doc['type'] == 'ASSESSMENT']
+    identities = {}
+    if registry is not None:
+        try:
+            for pdf_path in assessment_paths:
+                identity = registry.get_document_identity(document_hashes[pdf_path]) \
+                    if pdf_path in document_hashes else None
+                if identity and identity.get('nik'):
+                    identities[pdf_path] = {**identity, 'stage': 'registry'}
+        except sqlite3.Error as e:
+            print(f"    ⚠ Registry kandidat tidak dapat dibaca: {e}")
+        if identities:
+            print(f"  ♻️ {len(identities)} Assessment sudah dikenal di registry, identifikasi dilewati")
+    new_assessment_paths = [pdf_path for pdf_path in assessment_paths if pdf_path not in identities]
+    new_identities = identify_assessments(new_assessment_paths, lang='ind', profile=ocr_profile) \
+        if new_assessment_paths else {}
+    if registry is not None:
+        for pdf_path, identity in new_identities.items():
+            if identity.get('nik') and pdf_path in document_hashes:
+                try:
+                    registry.put_document_identity(document_hashes[pdf_path], identity)
+                except sqlite3.Error as e:
+                    print(f"    ⚠ Gagal menyimpan identitas ke registry: {e}")
+    identities.update(new_identities)
+    
     # Proses semua Assessment untuk ekstrak NIK dan nama
     for name, docs in documents_by_filename_name.items():
         for doc in docs:
             if doc['type'] == 'ASSESSMENT':
                 print(f"  Memproses Assessment: {doc['filename']}")
-                text = pdf_to_text_ocr_advanced(doc['path'], lang='ind')
-                nik, extracted_name = extract_nik_and_name_from_text(text)
+                identity = identities.get(doc['path'], {})
+                nik, extracted_name = identity.get('nik'), identity.get('nama')
                 
                 if nik:
-                    print(f"    ✓ NIK ditemukan: {nik}")
+                    evidence = identity.get('nik_evidence') or {}
+                    print(f"    ✓ NIK ditemukan: {nik} (via {identity.get('stage')}, {evidence.get('reason', '-')}, "
+                          f"confidence {evidence.get('confidence', 0):.2f})")
                     assessments_with_nik[nik] = {
                         'path': doc['path'],
                         'filename': doc['filename'],
@@ -666,7 +3340,6 @@ def group_and_match_documents(pdf_files: List[str]) -> Dict[str, Dict]:
     # Sekarang coba match CV dengan Assessment
     print(f"\nMencocokkan CV dengan Assessment...")
     
-    all_cv_names = []
     cv_documents = []
     
     # Kumpulkan semua CV
@@ -678,42 +3351,27 @@ def group_and_match_documents(pdf_files: List[str]) -> Dict[str, Dict]:
                     'filename': doc['filename'],
                     'name_from_filename': name
                 })
-                all_cv_names.append(name)
     
     print(f"Total CV ditemukan: {len(cv_documents)}")
     print(f"Total Assessment dengan NIK: {len(unmatched_assessments)}")
     
-    # Matching logic
-    for assessment in unmatched_assessments:
+    # Matching: blocking per token nama + assignment optimal (lihat match_names_optimal)
+    pairs = match_names_optimal(
+        [[assessment['name_from_filename'], assessment['assessment_data']['extracted_name']]
+         for assessment in unmatched_assessments],
+        [cv['name_from_filename'] for cv in cv_documents]
+    )
+    matched_cv_indexes = set()
+    assessment_matches = {assessment_index: (cv_index, score) for assessment_index, cv_index, score in pairs}
+    
+    for assessment_index, assessment in enumerate(unmatched_assessments):
         nik = assessment['nik']
-        assessment_name_from_filename = assessment['name_from_filename']
-        assessment_extracted_name = assessment['assessment_data']['extracted_name']
-        
-        best_match = None
-        best_match_name = None
-        best_score = 0
-        
-        # Cari CV yang cocok
-        for cv in cv_documents:
-            cv_name = cv['name_from_filename']
-            
-            # Cek similarity dengan nama dari filename Assessment
-            score1 = similarity_ratio(cv_name, assessment_name_from_filename)
-            
-            # Cek similarity dengan nama yang diekstrak dari Assessment
-            if assessment_extracted_name:
-                score2 = similarity_ratio(cv_name, assessment_extracted_name)
-            else:
-                score2 = 0
-            
-            score = max(score1, score2)
+        if assessment_index in assessment_matches:
+            cv_index, best_score = assessment_matches[assessment_index]
+            best_match = cv_documents[cv_index]
+            best_match_name = best_match['name_from_filename']
+            matched_cv_indexes.add(cv_index)
             
-            if score > best_score and score >= 0.6:  # Threshold 60%
-                best_score = score
-                best_match = cv
-                best_match_name = cv_name
-        
-        if best_match:
             print(f"\n✓ Ditemukan match:")
             print(f"  NIK: {nik}")
             print(f"  Assessment: {assessment['assessment_data']['filename']}")
@@ -732,14 +3390,13 @@ def group_and_match_documents(pdf_files: List[str]) -> Dict[str, Dict]:
                 'Assessment_filename': assessment['assessment_data']['filename'],
                 'Match_Score': best_score
             }
-            
-            # Hapus CV yang sudah dimatch dari list
-            cv_documents = [cv for cv in cv_documents if cv['path'] != best_match['path']]
         else:
             print(f"\n✗ Tidak ditemukan match untuk Assessment: {assessment['assessment_data']['filename']}")
     
     # Tambahkan CV yang tidak memiliki match
-    for cv in cv_documents:
+    for cv_index, cv in enumerate(cv_documents):
+        if cv_index in matched_cv_indexes:
+            continue
         person_key = f"NO_NIK_{cv['name_from_filename']}"
         matched_documents[person_key] = {
             'NIK': '',
@@ -760,17 +3417,115 @@ def group_and_match_documents(pdf_files: List[str]) -> Dict[str, Dict]:
     
     return matched_documents
 
-def process_matched_documents(matched_docs: Dict, competency_data: Dict, output_folder: str) -> List[Dict]:
+def _active_llm_model() -> str:
+    """Nama model backend LLM aktif (untuk registry), GEMINI_MODEL jika backend belum bisa dibuat"""
+    try:
+        return get_llm_backend().model_name
+    except Exception:
+        return GEMINI_MODEL
+
+def process_matched_documents(matched_docs: Dict, competency_data: Dict, output_folder: str,
+                              ocr_profile: str = None, use_llm_cache: bool = True,
+                              use_llm_competency: bool = None, registry: CandidateRegistry = None,
+                              document_hashes: Dict[str, str] = None) -> List[Dict]:
     """
     Proses dokumen yang sudah dimatch
+    use_llm_competency: True untuk memformat competency dengan Gemini (default COMPETENCY_USE_LLM)
+    registry + document_hashes ({path: hash isi}): kandidat yang CV & Assessment-nya tidak berubah (dengan
+    versi prompt, versi pipeline analisis, model dan setting OCR yang sama) dipakai ulang dari registry tanpa OCR
+    dan analisis LLM (file hasil_cv_*/hasil_assessment_*.txt ditulis dari cache OCR); kandidat baru disimpan
+    ke registry
     """
+    if use_llm_competency is None:
+        use_llm_competency = COMPETENCY_USE_LLM
+    document_hashes = document_hashes or {}
+    model_name = _active_llm_model()
+    # Setting OCR efektif (sama dengan yang masuk key cache OCR): hasil dengan profil/setting lain tidak dipakai ulang
+    ocr_settings = CandidateRegistry.settings_json({
+        'profile': (ocr_profile or DEFAULT_OCR_PROFILE).lower(),
+        'text_layer': TEXT_LAYER_ENABLED,
+        'documents': {doc_type: resolve_ocr_settings(ocr_profile, 'ind', doc_type) for doc_type in ('CV', 'ASSESSMENT')},
+    }) if registry is not None else None
     print("\n" + "="*60)
     print("MEMPROSES DOKUMEN YANG SUDAH DIMATCH")
     print("="*60)
     
     all_results = []
     
+    def document_hashes_for(person_data: Dict) -> Tuple[Optional[str], Optional[str]]:
+        # (hash CV, hash Assessment); Assessment kosong -> '' supaya kandidat tanpa Assessment tetap punya key
+        assessment_hash = document_hashes.get(person_data['Assessment']) if person_data['Assessment'] else ''
+        return document_hashes.get(person_data['CV']), assessment_hash
+    
+    def txt_paths_for(person_data: Dict) -> Dict[str, Tuple[str, str]]:
+        # {path PDF: (tipe dokumen, path file teks OCR di output_folder)}
+        nama_file = person_data['Nama'].replace(' ', '_')
+        paths = {}
+        if person_data['CV']:
+            paths[person_data['CV']] = ('CV', os.path.join(output_folder, f"hasil_cv_{nama_file}.txt"))
+        if person_data['Assessment']:
+            paths[person_data['Assessment']] = ('ASSESSMENT',
+                                                os.path.join(output_folder, f"hasil_assessment_{nama_file}.txt"))
+        return paths
+    
+    # Kandidat yang sudah pernah diproses dengan dokumen, versi prompt & model yang sama dipakai ulang
+    reused = {}
+    if registry is not None:
+        try:
+            for person_key, person_data in matched_docs.items():
+                cv_hash, assessment_hash = document_hashes_for(person_data)
+                if not cv_hash or assessment_hash is None:
+                    continue
+                record = registry.get_candidate(cv_hash, assessment_hash)
+                if (record and record['prompt_version'] == PROMPT_VERSION and record['model'] == model_name
+                        and record['pipeline_version'] == ANALYSIS_PIPELINE_VERSION
+                        and record['ocr_settings'] == ocr_settings
+                        and all(category in record['analysis'] for category in TEXT_ANALYSIS_CATEGORIES)):
+                    reused[person_key] = record
+        except sqlite3.Error as e:
+            print(f"    ⚠ Registry kandidat tidak dapat dibaca: {e}")
+        
+        # File teks OCR kandidat yang dipakai ulang ditulis dari cache OCR; jika teksnya sudah tidak ada di cache
+        # (evicted), kandidat diproses ulang supaya output (txt di ZIP) tetap lengkap
+        for person_key in list(reused):
+            person_data = matched_docs[person_key]
+            cached_texts = {}
+            for pdf_path, (doc_type, txt_path) in txt_paths_for(person_data).items():
+                text = cached_document_text(document_hashes.get(pdf_path), ocr_profile, 'ind', doc_type)
+                if text is None:
+                    break
+                cached_texts[txt_path] = text
+            else:
+                for txt_path, text in cached_texts.items():
+                    _save_ocr_text(text, txt_path)
+                continue
+            print(f"    ⚠ Teks OCR {person_data['Nama']} tidak ada di cache OCR, kandidat diproses ulang")
+            del reused[person_key]
+        print(f"♻️ {len(reused)}/{len(matched_docs)} kandidat tidak berubah sejak run sebelumnya, "
+              f"dipakai ulang tanpa OCR & AI")
+    
+    # OCR semua CV & Assessment sekaligus supaya halaman dari banyak dokumen bisa disebar ke worker
+    ocr_txt_paths = {}
+    doc_types = {}
+    for person_key, person_data in matched_docs.items():
+        if person_key in reused:
+            continue
+        for pdf_path, (doc_type, txt_path) in txt_paths_for(person_data).items():
+            ocr_txt_paths[pdf_path] = txt_path
+            doc_types[pdf_path] = doc_type
+    
+    ocr_texts = pdf_to_text_ocr_batch(
+        list(ocr_txt_paths.keys()),
+        output_txt_paths=ocr_txt_paths,
+        lang='ind',
+        profile=ocr_profile,
+        doc_types=doc_types
+    )
+    
+    candidates = []
     for i, (person_key, person_data) in enumerate(matched_docs.items(), 1):
+        if person_key in reused:
+            continue
         nik = person_data['NIK']
         nama = person_data['Nama']
         
@@ -784,14 +3539,8 @@ def process_matched_documents(matched_docs: Dict, competency_data: Dict, output_
         # Proses CV
         if person_data['CV']:
             print(f"  Memproses CV: {person_data['CV_filename']}")
-            cv_txt_path = os.path.join(output_folder, f"hasil_cv_{nama.replace(' ', '_')}.txt")
-            cv_text = pdf_to_text_ocr_advanced(
-                pdf_path=person_data['CV'],
-                output_txt_path=cv_txt_path,
-                lang='ind',
-                preprocess=True,
-                dpi=400
-            )
+            cv_txt_path = ocr_txt_paths[person_data['CV']]
+            cv_text = ocr_texts.get(person_data['CV'], "")
             all_text += f"\n\n=== CV ===\n{cv_text}"
             source_files.append({
                 'type': 'CV',
@@ -802,14 +3551,8 @@ def process_matched_documents(matched_docs: Dict, competency_data: Dict, output_
         # Proses Assessment
         if person_data['Assessment']:
             print(f"  Memproses Assessment: {person_data['Assessment_filename']}")
-            ass_txt_path = os.path.join(output_folder, f"hasil_assessment_{nama.replace(' ', '_')}.txt")
-            assessment_text = pdf_to_text_ocr_advanced(
-                pdf_path=person_data['Assessment'],
-                output_txt_path=ass_txt_path,
-                lang='ind',
-                preprocess=True,
-                dpi=400
-            )
+            ass_txt_path = ocr_txt_paths[person_data['Assessment']]
+            assessment_text = ocr_texts.get(person_data['Assessment'], "")
             all_text += f"\n\n=== ASSESSMENT ===\n{assessment_text}"
             source_files.append({
                 'type': 'ASSESSMENT',
@@ -819,28 +3562,106 @@ def process_matched_documents(matched_docs: Dict, competency_data: Dict, output_
             
             # Coba ekstrak NIK lagi dari Assessment jika belum ada
             if not nik:
-                extracted_nik, _ = extract_nik_and_name_from_text(assessment_text)
+                extracted_nik, _ = extract_nik_and_name_from_text(assessment_text, max_chars=None)
                 if extracted_nik:
                     nik = extracted_nik
                     print(f"  ✓ NIK ditemukan dari Assessment: {nik}")
         
-        # Analisis dengan Gemini AI
-        print(f"  Menganalisis dengan Gemini AI...")
-        ai_analysis = analyze_with_gemini_advanced(
-            all_text, 
-            categories=['education', 'experience', 'business_impact', 'position', 'summary_executive']
-        )
-        
-        # Ambil competency berdasarkan NIK dan generate dengan AI
-        skills_competency = ""
         if nik and nik in competency_data:
-            competencies = competency_data[nik]
-            print(f"  ✓ Found {len(competencies)} competencies for NIK {nik}")
-            # Gunakan AI untuk generate competency
-            skills_competency = generate_competency_with_ai(competencies)
+            print(f"  ✓ Found {len(competency_data[nik])} competencies for NIK {nik}")
         else:
             print(f"  ✗ No competency data found for NIK: {nik}")
         
+        candidates.append({'person_key': person_key, 'nik': nik, 'nama': nama, 'person_data': person_data,
+                           'all_text': all_text, 'source_files': source_files})
+    
+    def candidate_competency(candidate: Dict) -> str:
+        # Ambil competency berdasarkan NIK; format lokal kecuali job meminta AI
+        nik = candidate['nik']
+        if not (nik and nik in competency_data):
+            return ""
+        if use_llm_competency:
+            with llm_call_context(candidate['nama']):
+                return generate_competency_with_ai(competency_data[nik], use_cache=use_llm_cache)
+        return format_competency_bullets(competency_data[nik])
+    
+    # Request LLM semua kandidat berjalan paralel (kandidat dengan teks pendek digabung per batch),
+    # dibatasi LLM_RATE_LIMITER (RPM/TPM) dan LLM_CONCURRENCY_CONTROLLER (AIMD + circuit breaker)
+    print(f"\nMenganalisis {len(candidates)} kandidat dengan Gemini AI "
+          f"({LLM_CONCURRENCY}-{LLM_MAX_CONCURRENCY} paralel)...")
+    ai_analyses = analyze_candidates_with_llm([candidate['all_text'] for candidate in candidates],
+                                              TEXT_ANALYSIS_CATEGORIES, use_cache=use_llm_cache,
+                                              labels=[candidate['nama'] for candidate in candidates])
+    if use_llm_competency:
+        competencies = dispatch_llm_jobs(candidate_competency, candidates)
+    else:
+        competencies = [candidate_competency(candidate) for candidate in candidates]
+    analyses = list(zip(ai_analyses, competencies))
+    
+    # Field yang masih gagal (kuota/overload) diantrikan ulang tanpa mengulang field yang sudah berhasil
+    for round_number in range(1, LLM_REQUEUE_ROUNDS + 1):
+        retry_jobs = [(index, [category for category in TEXT_ANALYSIS_CATEGORIES if category not in analysis])
+                      for index, (analysis, _) in enumerate(analyses)]
+        retry_jobs = [(index, missing) for index, missing in retry_jobs if missing]
+        if not retry_jobs:
+            break
+        print(f"\n↻ Antrian ulang ke-{round_number}: {sum(len(missing) for _, missing in retry_jobs)} field "
+              f"dari {len(retry_jobs)} kandidat")
+        time.sleep(backoff_delay(round_number + 1))
+        def retry_fields(job: Tuple[int, List[str]]) -> Dict[str, str]:
+            index, missing = job
+            with llm_call_context(candidates[index]['nama']):
+                return analyze_with_gemini_advanced(candidates[index]['all_text'], categories=missing,
+                                                    use_cache=use_llm_cache)
+        retried = dispatch_llm_jobs(retry_fields, retry_jobs)
+        for (index, _), partial in zip(retry_jobs, retried):
+            analyses[index][0].update(partial)
+    
+    for candidate, (analysis, skills_competency) in zip(candidates, analyses):
+        missing = [category for category in TEXT_ANALYSIS_CATEGORIES if category not in analysis]
+        if missing:
+            print(f"  ⚠ {candidate['nama']}: field {', '.join(missing)} gagal dianalisis, dikosongkan")
+            continue
+        cv_hash, assessment_hash = document_hashes_for(candidate['person_data'])
+        if registry is None or not cv_hash or assessment_hash is None:
+            continue
+        # Hanya kandidat dengan analisis lengkap yang disimpan (yang gagal diproses ulang di run berikutnya)
+        person_data = candidate['person_data']
+        try:
+            registry.put_candidate(
+                nik=candidate['nik'], nama=candidate['nama'], cv_hash=cv_hash, assessment_hash=assessment_hash,
+                match_result={key: person_data.get(key) for key in
+                              ('NIK', 'Nama', 'CV_filename', 'Assessment_filename', 'Match_Score')},
+                ocr_text_ref={source['type']: {'filename': source['filename'],
+                                               'txt_filename': os.path.basename(source['output_path']),
+                                               'content_hash': cv_hash if source['type'] == 'CV' else assessment_hash}
+                              for source in candidate['source_files']},
+                ocr_settings=ocr_settings, analysis=analysis, competency=skills_competency,
+                competency_hash=CandidateRegistry.competency_hash(competency_data.get(candidate['nik']),
+                                                                  use_llm_competency),
+                prompt_version=PROMPT_VERSION, pipeline_version=ANALYSIS_PIPELINE_VERSION, model=model_name
+            )
+        except sqlite3.Error as e:
+            print(f"    ⚠ Gagal menyimpan {candidate['nama']} ke registry: {e}")
+    
+    # Gabungkan kandidat baru dan kandidat dari registry sesuai urutan matched_docs
+    processed = {candidate['person_key']: (candidate['nik'], candidate['nama'], candidate['person_data'],
+                                           analysis, skills_competency)
+                 for candidate, (analysis, skills_competency) in zip(candidates, analyses)}
+    for person_key, record in reused.items():
+        person_data = matched_docs[person_key]
+        nik = record['nik'] or person_data['NIK']
+        skills_competency = record['competency']
+        if record['competency_hash'] != CandidateRegistry.competency_hash(competency_data.get(nik), use_llm_competency):
+            # Data competency (Excel) berubah: hanya competency yang dihitung ulang
+            skills_competency = candidate_competency({'nik': nik, 'nama': person_data['Nama']})
+        processed[person_key] = (nik, person_data['Nama'], person_data, record['analysis'], skills_competency)
+    
+    for person_key in matched_docs:
+        if person_key not in processed:
+            continue
+        nik, nama, person_data, ai_analysis, skills_competency = processed[person_key]
+        
         # Buat hasil
         result = {
             'nik': nik if nik else f"NO_NIK_{nama}",
@@ -863,13 +3684,21 @@ def process_matched_documents(matched_docs: Dict, competency_data: Dict, output_
     return all_results
 
 def process_all_documents_with_competency(input_folder: str, excel_path: str, 
-                                         output_folder: str, output_excel: str = None) -> pd.DataFrame:
+                                         output_folder: str, output_excel: str = None,
+                                         ocr_profile: str = None, use_llm_cache: bool = True,
+                                         use_llm_competency: bool = None, use_registry: bool = True) -> pd.DataFrame:
     """
     Proses utama: membaca dokumen PDF, matching CV-Assessment, baca Excel competency
+    ocr_profile: 'fast' / 'balanced' / 'best' (default OCR_PROFILE)
+    use_llm_cache: False untuk memaksa semua prompt dikirim ulang ke Gemini (hasil registry juga tidak dipakai)
+    use_llm_competency: True untuk memformat competency dengan Gemini (default: format lokal)
+    use_registry: True untuk melewati kandidat yang dokumennya tidak berubah sejak run sebelumnya
     """
     
     # Buat output folder jika belum ada
     os.makedirs(output_folder, exist_ok=True)
+    reset_ocr_stats()
+    reset_llm_metrics()
     
     # 1. Baca data competency dari Excel
     print("="*60)
@@ -889,11 +3718,36 @@ def process_all_documents_with_competency(input_folder: str, excel_path: str,
     
     print(f"Total {len(pdf_files)} file PDF ditemukan")
     
+    # Registry kandidat: dokumen dikenali dari hash isinya (bukan nama file)
+    registry = get_candidate_registry() if use_registry and use_llm_cache else None
+    document_hashes = {}
+    if registry is not None:
+        for pdf_path in pdf_files:
+            try:
+                document_hashes[pdf_path] = file_content_hash(pdf_path)
+            except OSError as e:
+                print(f"    ⚠ Hash dokumen gagal untuk {os.path.basename(pdf_path)}: {e}")
+    
     # 3. Kelompokkan dan match CV dengan Assessment
-    matched_documents = group_and_match_documents(pdf_files)
+    matched_documents = group_and_match_documents(pdf_files, ocr_profile=ocr_profile, registry=registry,
+                                                  document_hashes=document_hashes)
     
     # 4. Proses dokumen yang sudah dimatch
-    all_results = process_matched_documents(matched_documents, competency_data, output_folder)
+    all_results = process_matched_documents(matched_documents, competency_data, output_folder,
+                                            ocr_profile=ocr_profile, use_llm_cache=use_llm_cache,
+                                            use_llm_competency=use_llm_competency, registry=registry,
+                                            document_hashes=document_hashes)
+    
+    print("\n" + "="*60)
+    print("STATISTIK OCR")
+    print("="*60)
+    print(f"Profil OCR              : {ocr_profile or DEFAULT_OCR_PROFILE}")
+    print(format_ocr_stats())
+    
+    print("\n" + "="*60)
+    print("STATISTIK LLM (per kategori, paling lama di atas)")
+    print("="*60)
+    print(format_llm_metrics())
     
     # 5. Buat DataFrame dan simpan ke Excel
     print("\n" + "="*60)
@@ -957,6 +3811,12 @@ def process_all_documents_with_competency(input_folder: str, excel_path: str,
                 worksheet.column_dimensions[column_letter].width = adjusted_width
         
         print(f"\n✓ Hasil berhasil disimpan ke: {output_excel_path}")
+        
+        # Metrik LLM disimpan di samping file hasil: metrik_llm_<timestamp>.xlsx
+        metrics_path = save_llm_metrics(os.path.join(
+            output_folder, "metrik_llm_" + output_excel.replace("hasil_analisis_", "", 1)))
+        if metrics_path:
+            print(f"✓ Metrik LLM disimpan ke: {metrics_path}")
         print(f"✓ Total data: {len(df)} orang")
         print(f"✓ Kolom: {', '.join(df.columns.tolist())}")
         
@@ -1007,15 +3867,15 @@ def create_detailed_report(df: pd.DataFrame, output_folder: str):
         # Statistik
         with_nik = df[df['nik'].str.contains('NO_NIK', na=False) == False].shape[0]
         without_nik = len(df) - with_nik
-        good_matches = df[df['Match_Score'] >= 0.7].shape[0]
+        good_matches = df[df['Match_Score'] >= NAME_MATCH_REVIEW_SCORE].shape[0]
         poor_matches = len(df) - good_matches
         
         f.write("STATISTIK MATCHING:\n")
         f.write("-"*40 + "\n")
         f.write(f"Orang dengan NIK: {with_nik}\n")
         f.write(f"Orang tanpa NIK: {without_nik}\n")
-        f.write(f"Match score >= 0.7: {good_matches}\n")
-        f.write(f"Match score < 0.7: {poor_matches}\n\n")
+        f.write(f"Match score >= {NAME_MATCH_REVIEW_SCORE}: {good_matches}\n")
+        f.write(f"Match score < {NAME_MATCH_REVIEW_SCORE}: {poor_matches}\n\n")
         
         f.write("STATISTIK DATA:\n")
         f.write("-"*40 + "\n")
@@ -1036,9 +3896,9 @@ def create_detailed_report(df: pd.DataFrame, output_folder: str):
             f.write("\n")
         
         # List orang dengan match score rendah
-        low_match_df = df[(df['Match_Score'] < 0.7) & (df['Match_Score'] > 0)]
+        low_match_df = df[(df['Match_Score'] < NAME_MATCH_REVIEW_SCORE) & (df['Match_Score'] > 0)]
         if not low_match_df.empty:
-            f.write("ORANG DENGAN MATCH SCORE RENDAH (<0.7):\n")
+            f.write(f"ORANG DENGAN MATCH SCORE RENDAH (<{NAME_MATCH_REVIEW_SCORE}):\n")
             f.write("-"*40 + "\n")
             for _, row in low_match_df.iterrows():
                 f.write(f"- {row['Nama']} (Score: {row['Match_Score']:.2f})\n")
@@ -1107,6 +3967,15 @@ def main():
     
     OUTPUT_EXCEL = input("Masukkan nama file output Excel (kosongkan untuk default): ").strip()
     
+    print("\nProfil OCR yang tersedia:")
+    for profile_name, profile in OCR_PROFILES.items():
+        print(f"  - {profile_name}: {profile['description']}")
+    OCR_PROFILE = input(f"Pilih profil OCR (kosongkan untuk {DEFAULT_OCR_PROFILE}): ").strip().lower()
+    if OCR_PROFILE and OCR_PROFILE not in OCR_PROFILES:
+        print(f"⚠ Profil '{OCR_PROFILE}' tidak dikenal, menggunakan {DEFAULT_OCR_PROFILE}")
+        OCR_PROFILE = ''
+    OCR_PROFILE = OCR_PROFILE or DEFAULT_OCR_PROFILE
+    
     # Konfirmasi
     print("\n📋 RINGKASAN KONFIGURASI:")
     print("-"*60)
@@ -1114,6 +3983,7 @@ def main():
     print(f"File Excel      : {EXCEL_PATH}")
     print(f"Folder Output   : {OUTPUT_FOLDER}")
     print(f"File Output     : {OUTPUT_EXCEL if OUTPUT_EXCEL else 'Auto-generated'}")
+    print(f"Profil OCR      : {OCR_PROFILE}")
     print("-"*60)
     
     confirm = input("\nMulai proses? (y/n): ").strip().lower()
@@ -1128,7 +3998,8 @@ def main():
         input_folder=INPUT_FOLDER,
         excel_path=EXCEL_PATH,
         output_folder=OUTPUT_FOLDER,
-        output_excel=OUTPUT_EXCEL if OUTPUT_EXCEL else None
+        output_excel=OUTPUT_EXCEL if OUTPUT_EXCEL else None,
+        ocr_profile=OCR_PROFILE
     )
     
     # Buat detailed report
@@ -1179,7 +4050,8 @@ if __name__ == "__main__":
                 print(f"Data dengan competency: {df_result[df_result['Skills (Competency)'] != ''].shape[0]}")
                 print(f"Data dengan summary executive: {df_result[df_result['Summary Executive'] != ''].shape[0]}")
                 print(f"Match score rata-rata: {df_result['Match_Score'].mean():.2f}")
-                print(f"Match score >= 0.8: {(df_result['Match_Score'] >= 0.8).sum()}")
+                print(f"Match score >= {NAME_MATCH_REVIEW_SCORE}: "
+                      f"{(df_result['Match_Score'] >= NAME_MATCH_REVIEW_SCORE).sum()}")
                 
             elif choice == "2":
                 output_folder = os.path.dirname(glob.glob("Result/*.xlsx")[0]) if glob.glob("Result/*.xlsx") else "Result"
@@ -0,0 +1,51 @@
+"""Fixture bersama: cache/registry di folder sementara, backend LLM palsu, dan PDF text layer sintetis."""
+import pytest
+
+import ocr_processor
+
+
+def write_text_pdf(path, lines):
+    """PDF satu halaman dengan text layer (Helvetica), dibuat manual tanpa dependensi tambahan"""
+    def escape(text):
+        return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    content = "BT /F1 11 Tf 14 TL 50 800 Td " + " ".join(f"({escape(line)}) Tj T*" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(content)} >>\nstream\n{content}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    data, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1')
+    xref_offset = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+@pytest.fixture
+def isolated_pipeline(tmp_path, monkeypatch):
+    """Cache OCR, cache LLM & registry di tmp_path; FakeLlmBackend tanpa latency/error; metrik LLM bersih"""
+    monkeypatch.setattr(ocr_processor, 'OCR_CACHE_DIR', str(tmp_path / 'ocr_cache'))
+    monkeypatch.setattr(ocr_processor, 'LLM_CACHE_PATH', str(tmp_path / 'llm_cache.sqlite3'))
+    monkeypatch.setattr(ocr_processor, 'CANDIDATE_REGISTRY_PATH', str(tmp_path / 'registry.sqlite3'))
+    ocr_processor.close_llm_cache()
+    ocr_processor.close_candidate_registry()
+    monkeypatch.setattr(ocr_processor, 'OCR_WORKERS', 1)
+    monkeypatch.setattr(ocr_processor, 'LLM_BACKOFF_BASE_SECONDS', 0.0)
+    previous_backend = ocr_processor._llm_backend
+    backend = ocr_processor.FakeLlmBackend(latency_seconds=0, error_rate=0, seed=0)
+    ocr_processor.set_llm_backend(backend)
+    ocr_processor.reset_llm_metrics()
+    yield backend
+    ocr_processor.close_llm_cache()
+    ocr_processor.close_candidate_registry()
+    ocr_processor.set_llm_backend(previous_backend)
+    ocr_processor.reset_llm_metrics()
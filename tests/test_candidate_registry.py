@@ -0,0 +1,75 @@
+"""Registry kandidat: run kedua dengan dokumen yang sama memakai ulang hasil tanpa OCR & LLM."""
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import ocr_processor
+from conftest import write_text_pdf
+
+PEOPLE = [("Budi Santoso", "12345678"), ("Siti Aminah", "87654321")]
+
+
+def _write_cv(folder, nama, extra=""):
+    write_text_pdf(os.path.join(folder, f"CV_{nama.replace(' ', '_')}.pdf"),
+                   [nama, "PENGALAMAN KERJA", "Business Development Manager", "PT Alpha", "2020 - 2023", extra] * 6)
+
+
+@pytest.fixture
+def documents(tmp_path):
+    input_folder = tmp_path / 'input'
+    input_folder.mkdir()
+    for nama, nik in PEOPLE:
+        _write_cv(str(input_folder), nama)
+        write_text_pdf(str(input_folder / f"Assessment_{nama.replace(' ', '_')}.pdf"),
+                       [f"Nama: {nama}", f"NIK: {nik}", "KESIMPULAN", "Disarankan untuk promosi"] * 6)
+    excel_path = tmp_path / 'competency.xlsx'
+    pd.DataFrame([{'nik': nik, 'competency': 'Leadership', 'level': 4} for _, nik in PEOPLE]).to_excel(
+        excel_path, index=False)
+    return str(input_folder), str(excel_path)
+
+
+def _run(documents, output_folder):
+    input_folder, excel_path = documents
+    df = ocr_processor.process_all_documents_with_competency(input_folder, excel_path, str(output_folder))
+    calls = ocr_processor.LLM_METRICS.records_frame()
+    txt_files = {name: open(os.path.join(output_folder, name), encoding='utf-8').read()
+                 for name in os.listdir(output_folder) if name.endswith('.txt') and name.startswith('hasil_')}
+    return df.reset_index(drop=True), calls, txt_files
+
+
+def test_second_run_reuses_registry_and_writes_ocr_text(isolated_pipeline, documents, tmp_path):
+    first, first_calls, first_txt = _run(documents, tmp_path / 'run1')
+    second, second_calls, second_txt = _run(documents, tmp_path / 'run2')
+
+    assert len(first) == len(PEOPLE)
+    assert not first_calls.empty
+    assert second_calls.empty
+    assert second.equals(first)
+    # File teks OCR tetap lengkap untuk kandidat yang dipakai ulang (ikut masuk ZIP)
+    assert len(first_txt) == 2 * len(PEOPLE)
+    assert second_txt == first_txt
+
+
+def test_evicted_ocr_text_reprocesses_candidates(isolated_pipeline, documents, tmp_path):
+    _, _, first_txt = _run(documents, tmp_path / 'run1')
+    shutil.rmtree(ocr_processor.OCR_CACHE_DIR)
+    ocr_processor.reset_llm_metrics()
+
+    _, second_calls, second_txt = _run(documents, tmp_path / 'run2')
+
+    assert set(second_calls['candidate']) == {nama for nama, _ in PEOPLE}
+    assert second_txt == first_txt
+
+
+def test_changed_document_is_reprocessed_alone(isolated_pipeline, documents, tmp_path):
+    _run(documents, tmp_path / 'run1')
+    _write_cv(documents[0], "Siti Aminah", extra="Training Specialist")
+    ocr_processor.reset_llm_metrics()
+
+    result, second_calls, second_txt = _run(documents, tmp_path / 'run2')
+
+    assert set(second_calls['candidate']) == {"Siti Aminah"}
+    assert len(result) == len(PEOPLE)
+    assert "Training Specialist" in second_txt["hasil_cv_Siti_Aminah.txt"]
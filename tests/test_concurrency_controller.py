@@ -0,0 +1,124 @@
+"""AdaptiveConcurrencyController: AIMD dan circuit breaker (hanya error sementara yang dihitung)."""
+import threading
+import time
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+import ocr_processor
+from ocr_processor import AdaptiveConcurrencyController
+
+
+def _controller(initial=4, max_limit=8, threshold=3, cooldown=0.2):
+    return AdaptiveConcurrencyController(initial, max_limit, threshold, cooldown)
+
+
+def _run(controller, throttled=False, failed=False):
+    controller.acquire()
+    controller.release(throttled=throttled, failed=failed)
+
+
+def test_success_increases_limit_additively_up_to_max():
+    controller = _controller(initial=4, max_limit=5)
+    expected = 4.0
+    for _ in range(4):
+        _run(controller)
+        expected += 1 / expected
+    # Naik ~1 setelah satu "window" (limit) request sukses
+    assert controller.limit == pytest.approx(expected)
+    assert 4.9 < controller.limit < 5
+    for _ in range(50):
+        _run(controller)
+    assert controller.limit == 5
+
+
+def test_throttle_halves_limit_once_per_second():
+    controller = _controller(initial=8, threshold=100)
+    _run(controller, throttled=True, failed=True)
+    _run(controller, throttled=True, failed=True)
+    assert controller.limit == 4
+    controller._last_decrease -= 2
+    _run(controller, throttled=True, failed=True)
+    assert controller.limit == 2
+    for _ in range(3):
+        controller._last_decrease -= 2
+        _run(controller, throttled=True, failed=True)
+    assert controller.limit == 1
+
+
+def test_permanent_error_does_not_change_limit_or_failure_count():
+    controller = _controller(initial=4, threshold=2)
+    _run(controller, throttled=True, failed=True)
+    for _ in range(10):
+        _run(controller, failed=True)
+    assert controller.limit == 2
+    assert controller._consecutive_failures == 1
+    assert controller._open_until == 0.0
+
+
+def test_breaker_opens_after_consecutive_transient_failures_and_closes_after_cooldown():
+    controller = _controller(initial=4, threshold=3, cooldown=0.2)
+    for _ in range(3):
+        _run(controller, throttled=True, failed=True)
+    assert controller._open_until > time.monotonic()
+
+    started = time.monotonic()
+    controller.acquire()
+    assert time.monotonic() - started >= 0.15
+    controller.release()
+    assert controller._consecutive_failures == 0
+
+
+def test_success_resets_consecutive_failures():
+    controller = _controller(threshold=3)
+    _run(controller, throttled=True, failed=True)
+    _run(controller, throttled=True, failed=True)
+    _run(controller)
+    _run(controller, throttled=True, failed=True)
+    assert controller._open_until == 0.0
+
+
+def test_acquire_blocks_at_limit_until_release():
+    controller = _controller(initial=1)
+    controller.acquire()
+    acquired = threading.Event()
+    waiter = threading.Thread(target=lambda: (controller.acquire(), acquired.set()))
+    waiter.start()
+    assert not acquired.wait(0.1)
+    controller.release()
+    assert acquired.wait(1)
+    controller.release()
+    waiter.join()
+
+
+class _FailingBackend(ocr_processor.LlmBackend):
+    name = 'failing'
+    model_name = 'failing'
+
+    def __init__(self, error):
+        self.error = error
+
+    def generate(self, prompt, generation_config, safety_settings):
+        raise self.error
+
+
+def test_deterministic_prompt_errors_do_not_open_the_breaker(monkeypatch):
+    controller = _controller(initial=4, threshold=2, cooldown=60)
+    monkeypatch.setattr(ocr_processor, 'LLM_CONCURRENCY_CONTROLLER', controller)
+    backend = _FailingBackend(google_exceptions.InvalidArgument("prompt tidak valid"))
+    for _ in range(5):
+        with pytest.raises(ocr_processor.LlmRequestError):
+            ocr_processor._call_llm_with_retry(backend, "prompt", {}, None, 10)
+    assert controller._open_until == 0.0
+    assert controller.limit == 4
+
+
+def test_throttling_errors_open_the_breaker(monkeypatch):
+    controller = _controller(initial=4, threshold=2, cooldown=60)
+    monkeypatch.setattr(ocr_processor, 'LLM_CONCURRENCY_CONTROLLER', controller)
+    monkeypatch.setattr(ocr_processor, 'LLM_MAX_RETRIES', 1)
+    monkeypatch.setattr(ocr_processor, 'backoff_delay', lambda attempt: 0.0)
+    backend = _FailingBackend(google_exceptions.ResourceExhausted("kuota habis"))
+    with pytest.raises(ocr_processor.LlmRequestError):
+        ocr_processor._call_llm_with_retry(backend, "prompt", {}, None, 10)
+    assert controller._open_until > time.monotonic()
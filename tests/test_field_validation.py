@@ -0,0 +1,23 @@
+"""Regresi pemecahan kalimat summary_executive: gelar bertitik bukan akhir kalimat."""
+from ocr_processor import split_sentences, validate_analysis_field
+
+SUMMARY = ("Budi Santoso, S.E., M.M. adalah profesional Human Capital berpengalaman 15 tahun. "
+           "Lulusan S.T. dari ITB dan M.B.A. dari UI. "
+           "Saat ini menjabat Direktur di PT Telkom Indonesia Tbk. "
+           "Memiliki keahlian kuat di bidang strategic planning sejak 2010. "
+           "Dr. Ir. Andi menilai kepemimpinannya sangat baik!")
+
+
+def test_degree_abbreviations_do_not_split_sentences():
+    sentences = split_sentences(SUMMARY)
+    assert len(sentences) == 5
+    assert sentences[0].startswith("Budi Santoso, S.E., M.M. adalah")
+    assert sentences[-1].startswith("Dr. Ir. Andi")
+
+
+def test_summary_with_degrees_is_valid():
+    assert validate_analysis_field('summary_executive', SUMMARY) is None
+
+
+def test_summary_sentence_count_still_enforced():
+    assert validate_analysis_field('summary_executive', "Budi Santoso, S.E., M.M. adalah profesional HR.") is not None
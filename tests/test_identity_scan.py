@@ -0,0 +1,57 @@
+"""Regresi scanner identitas: label NIK/nama harus kata utuh."""
+import pytest
+from PIL import Image
+
+import ocr_processor
+from ocr_processor import scan_identity
+
+
+def test_label_prefix_inside_word_is_not_a_label():
+    hits = scan_identity("Namanya budi")
+    assert hits['nama'] is None or hits['nama']['confidence'] < 0.5
+    assert hits['nama'] is None or hits['nama']['value'] != "Nya Budi"
+
+
+def test_labeled_name_and_nik():
+    hits = scan_identity("Nama Lengkap : Siti Aminah\nNIK: 12345678")
+    assert hits['nama']['value'] == "Siti Aminah"
+    assert hits['nama']['confidence'] >= 0.9
+    assert hits['nik']['value'] == "12345678"
+
+
+def test_nik_label_directly_followed_by_digits():
+    assert scan_identity("NIK12345678")['nik']['value'] == "12345678"
+
+
+def test_word_starting_with_nik_is_not_a_label():
+    hits = scan_identity("Nikah 2019\nName Andi Wijaya")
+    assert hits['nik'] is None
+    assert hits['nama']['value'] == "Andi Wijaya"
+
+
+def test_header_crop_is_closed_after_ocr(tmp_path, monkeypatch):
+    page = Image.new('L', (200, 300), 255)
+    seen = []
+
+    def fake_pages(pdf_path, first_page, last_page, render_dpi, window=None):
+        yield 1, page
+
+    def fake_ocr(image, lang, custom_config, preprocess, with_confidence):
+        seen.append(image)
+        return "tanpa identitas", None, {}
+
+    pdf_path = tmp_path / 'assessment.pdf'
+    pdf_path.write_bytes(b"%PDF-1.4\n")
+    monkeypatch.setattr(ocr_processor, 'probe_tesseract', lambda: (True, 'fake'))
+    monkeypatch.setattr(ocr_processor, 'iter_pdf_page_images', fake_pages)
+    monkeypatch.setattr(ocr_processor, '_ocr_single_image', fake_ocr)
+
+    result = ocr_processor.identify_from_pdf_header(str(pdf_path), use_cache=False, use_text_layer=False)
+
+    assert result['stage'] is None
+    header, full_page = seen
+    assert header.size == (200, int(300 * ocr_processor.IDENTIFICATION_HEADER_RATIO))
+    with pytest.raises(ValueError):
+        header.getpixel((0, 0))
+    # Bitmap halaman penuh milik iter_pdf_page_images, tidak ditutup di sini
+    assert full_page is page and page.getpixel((0, 0)) == 255
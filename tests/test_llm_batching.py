@@ -0,0 +1,77 @@
+"""Request batch multi-kandidat: item yang hilang dari response diulang per kandidat, batch gagal diantrikan ulang."""
+import json
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+import ocr_processor
+from ocr_processor import (AdaptiveConcurrencyController, FakeLlmBackend, TEXT_ANALYSIS_CATEGORIES,
+                           analyze_candidates_with_llm)
+
+TEXTS = [f"Nama: Kandidat {index}\nPendidikan: S1 Teknik Industri\nJabatan: Manager {index}" for index in range(3)]
+
+
+class BatchBackend(FakeLlmBackend):
+    """FakeLlmBackend yang bisa membuang kandidat tertentu dari response batch atau menolak request batch"""
+
+    def __init__(self, drop_candidates=(), fail_batch=False):
+        super().__init__(latency_seconds=0, error_rate=0, seed=0)
+        self.drop_candidates = set(drop_candidates)
+        self.fail_batch = fail_batch
+        self.batch_calls = 0
+        self.single_calls = 0
+
+    def generate(self, prompt, generation_config, safety_settings=None):
+        is_batch = (generation_config.get('response_schema') or {}).get('type') == 'ARRAY'
+        with self._lock:
+            if is_batch:
+                self.batch_calls += 1
+            else:
+                self.single_calls += 1
+        if is_batch and self.fail_batch:
+            raise google_exceptions.ResourceExhausted("quota")
+        response = super().generate(prompt, generation_config, safety_settings)
+        if is_batch:
+            items = [item for item in json.loads(response) if item['candidate_id'] not in self.drop_candidates]
+            response = json.dumps(items)
+        return response
+
+
+@pytest.fixture
+def use_backend(isolated_pipeline, monkeypatch):
+    monkeypatch.setattr(ocr_processor, 'LLM_ANALYSIS_MODE', 'combined')
+    monkeypatch.setattr(ocr_processor, 'LLM_CONCURRENCY_CONTROLLER',
+                        AdaptiveConcurrencyController(2, 4, breaker_threshold=100, breaker_cooldown=0))
+
+    def install(backend):
+        ocr_processor.set_llm_backend(backend)
+        return backend
+    return install
+
+
+def test_all_candidates_in_one_batch(use_backend):
+    backend = use_backend(BatchBackend())
+    results = analyze_candidates_with_llm(TEXTS, TEXT_ANALYSIS_CATEGORIES, use_cache=False, batching=True)
+    assert backend.batch_calls == 1 and backend.single_calls == 0
+    assert all(set(result) == set(TEXT_ANALYSIS_CATEGORIES) for result in results)
+
+
+def test_candidate_missing_from_batch_falls_back_to_single_request(use_backend):
+    backend = use_backend(BatchBackend(drop_candidates={'K2'}))
+    results = analyze_candidates_with_llm(TEXTS, TEXT_ANALYSIS_CATEGORIES, use_cache=False, batching=True,
+                                          labels=['Andi', 'Budi', 'Citra'])
+    assert backend.batch_calls == 1
+    assert backend.single_calls == 1
+    assert all(set(result) == set(TEXT_ANALYSIS_CATEGORIES) for result in results)
+    records = ocr_processor.LLM_METRICS.records_frame()
+    single = records[records['category'] != 'batch']
+    assert list(single['candidate']) == ['Budi']
+
+
+def test_failed_batch_is_returned_empty_for_requeue(use_backend):
+    backend = use_backend(BatchBackend(fail_batch=True))
+    results = analyze_candidates_with_llm(TEXTS, TEXT_ANALYSIS_CATEGORIES, use_cache=False, batching=True)
+    # Tidak dipecah menjadi request per kandidat saat kuota habis: pemanggil yang mengantrikan ulang
+    assert results == [{}, {}, {}]
+    assert backend.single_calls == 0
+    assert backend.batch_calls == ocr_processor.LLM_MAX_RETRIES + 1
@@ -0,0 +1,22 @@
+"""benchmark_llm_pipeline tidak boleh menyentuh cache LLM, controller concurrency, atau metrik job sungguhan."""
+import os
+
+import ocr_processor
+
+
+def test_benchmark_is_isolated_from_real_run_state(isolated_pipeline):
+    controller = ocr_processor.LLM_CONCURRENCY_CONTROLLER
+    limit = controller.limit
+    metrics = ocr_processor.LLM_METRICS
+    metrics.record(model='gemini', category='experience', candidate='Budi Santoso', prompt_tokens=10)
+
+    stats = ocr_processor.benchmark_llm_pipeline(num_candidates=6, latency_seconds=0, error_rate=0.2)
+
+    assert stats['llm_calls'] > 0
+    assert ocr_processor.LLM_CONCURRENCY_CONTROLLER is controller
+    assert controller.limit == limit
+    assert ocr_processor.LLM_METRICS is metrics
+    assert list(metrics.records_frame()['candidate']) == ['Budi Santoso']
+    assert ocr_processor.LLM_CACHE_ENABLED
+    assert not os.path.exists(ocr_processor.LLM_CACHE_PATH)
+    assert ocr_processor._llm_backend is isolated_pipeline
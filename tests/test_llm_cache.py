@@ -0,0 +1,93 @@
+"""Cache response LLM: komposisi key, hit/miss lewat llm_generate, TTL, dan eviction LRU."""
+import pytest
+
+import ocr_processor
+from ocr_processor import FakeLlmBackend, LlmResponseCache, llm_generate
+
+CONFIG = {"temperature": 0.1, "max_output_tokens": 256}
+
+
+class CountingBackend(FakeLlmBackend):
+    def __init__(self, response="Direktur Commercial"):
+        super().__init__(latency_seconds=0, error_rate=0, seed=0)
+        self.response = response
+        self.calls = 0
+
+    def generate(self, prompt, generation_config, safety_settings=None):
+        self.calls += 1
+        return self.response
+
+
+@pytest.fixture
+def backend(isolated_pipeline):
+    backend = CountingBackend()
+    ocr_processor.set_llm_backend(backend)
+    return backend
+
+
+def test_key_covers_model_version_config_safety_and_prompt():
+    base = LlmResponseCache.make_key('gemini', '1', CONFIG, 'prompt')
+    assert LlmResponseCache.make_key('gemini', '1', dict(reversed(list(CONFIG.items()))), 'prompt') == base
+    assert LlmResponseCache.make_key('gemini-pro', '1', CONFIG, 'prompt') != base
+    assert LlmResponseCache.make_key('gemini', '2', CONFIG, 'prompt') != base
+    assert LlmResponseCache.make_key('gemini', '1', {**CONFIG, 'temperature': 0.2}, 'prompt') != base
+    assert LlmResponseCache.make_key('gemini', '1', CONFIG, 'prompt lain') != base
+    assert LlmResponseCache.make_key('gemini', '1', CONFIG, 'prompt',
+                                     [{'category': 'HARM_CATEGORY_HARASSMENT', 'threshold': 'BLOCK_NONE'}]) != base
+
+
+def test_second_call_is_served_from_cache(backend):
+    assert llm_generate("Sebutkan jabatan terakhir", CONFIG, category='position') == "Direktur Commercial"
+    assert llm_generate("Sebutkan jabatan terakhir", CONFIG, category='position') == "Direktur Commercial"
+    assert backend.calls == 1
+    records = ocr_processor.LLM_METRICS.records_frame()
+    assert list(records['cache_hit']) == [False, True]
+    assert records['cached_tokens'].iloc[1] > 0 and records['prompt_tokens'].iloc[1] == 0
+
+    llm_generate("Prompt berbeda", CONFIG, category='position')
+    assert backend.calls == 2
+
+
+def test_use_cache_false_refreshes_the_entry(backend):
+    llm_generate("Sebutkan jabatan terakhir", CONFIG)
+    backend.response = "VP Human Capital"
+    assert llm_generate("Sebutkan jabatan terakhir", CONFIG, use_cache=False) == "VP Human Capital"
+    assert llm_generate("Sebutkan jabatan terakhir", CONFIG) == "VP Human Capital"
+    assert backend.calls == 2
+
+
+def test_empty_response_is_not_cached(backend):
+    backend.response = ""
+    llm_generate("Sebutkan jabatan terakhir", CONFIG)
+    llm_generate("Sebutkan jabatan terakhir", CONFIG)
+    assert backend.calls == 2
+
+
+def test_cache_disabled_always_calls_backend(backend, monkeypatch):
+    monkeypatch.setattr(ocr_processor, 'LLM_CACHE_ENABLED', False)
+    llm_generate("Sebutkan jabatan terakhir", CONFIG)
+    llm_generate("Sebutkan jabatan terakhir", CONFIG)
+    assert backend.calls == 2
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = LlmResponseCache(str(tmp_path / 'cache.sqlite3'), ttl_days=0, max_mb=1)
+    try:
+        cache.put('k', 'gemini', '1', 'jawaban')
+        assert cache.get('k') is None
+    finally:
+        cache.close()
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = LlmResponseCache(str(tmp_path / 'cache.sqlite3'), ttl_days=1, max_mb=1300 / (1024 * 1024))
+    try:
+        cache.put('a', 'gemini', '1', 'a' * 600)
+        cache.put('b', 'gemini', '1', 'b' * 600)
+        assert cache.get('a') is not None
+        cache.put('c', 'gemini', '1', 'c' * 600)
+        assert cache.get('a') is not None
+        assert cache.get('b') is None
+        assert cache.get('c') is not None
+    finally:
+        cache.close()
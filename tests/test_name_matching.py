@@ -0,0 +1,55 @@
+"""Matching nama CV-Assessment: assignment satu-satu optimal, tie-breaking, sisa tanpa pasangan, blocking."""
+import ocr_processor
+from ocr_processor import NAME_MATCH_THRESHOLD, match_names_optimal, name_similarity, name_tokens
+
+
+def _score(a, b):
+    return name_similarity(name_tokens(a), name_tokens(b))
+
+
+def test_threshold_separates_shared_first_name():
+    assert _score("Budi Santoso", "Budi Hartono") < NAME_MATCH_THRESHOLD
+    assert _score("Budi Santoso", "Dr. Budi Santoso, S.E.") == 1.0
+    assert _score("Muhammad Rizki Pratama", "Muhamad Rizki Pratama") >= NAME_MATCH_THRESHOLD
+
+
+def test_assignment_is_one_to_one_and_globally_optimal():
+    # Greedy: "Budi Santoso" mengambil "Budi Susanto" (0.85) dan "Budi Santosa" tidak kebagian pasangan
+    queries = [["Budi Santoso"], ["Budi Santosa"]]
+    names = ["Budi Susanto", "Andi Santoso"]
+    pairs = match_names_optimal(queries, names)
+    assert [(query, name) for query, name, _ in pairs] == [(0, 1), (1, 0)]
+    assert all(score >= NAME_MATCH_THRESHOLD for _, _, score in pairs)
+
+
+def test_each_name_is_used_at_most_once():
+    pairs = match_names_optimal([["Budi Santoso"], ["Budi Santoso"]], ["Budi Santoso"])
+    assert pairs == [(0, 0, 1.0)]
+
+
+def test_ties_go_to_the_earliest_name():
+    assert match_names_optimal([["Budi Santoso"]], ["Siti Aminah", "Budi Santoso", "Budi Santoso"]) == [(0, 1, 1.0)]
+
+
+def test_query_alternatives_use_the_best_score():
+    pairs = match_names_optimal([["Laporan Assessment 2024", "Siti Aminah"]], ["Siti Aminah"])
+    assert pairs == [(0, 0, 1.0)]
+
+
+def test_unmatched_leftovers_are_not_paired():
+    queries = [["Budi Santoso"], ["Yusuf Harahap"]]
+    names = ["Budi Santoso", "Dewi Lestari", "Budi Hartono"]
+    assert match_names_optimal(queries, names) == [(0, 0, 1.0)]
+
+
+def test_blocking_miss_is_not_compared():
+    # Salah ketik di 3 huruf awal setiap token: tidak berbagi kunci blocking, jadi tidak pernah dibandingkan
+    assert ocr_processor.NameBlockIndex([name_tokens("Budi Santoso")]).candidates(name_tokens("Bvdi Snatoso")) == []
+    assert match_names_optimal([["Bvdi Snatoso"]], ["Budi Santoso"], threshold=0.0) == []
+
+
+def test_common_blocking_keys_fall_back_to_smallest_posting(monkeypatch):
+    monkeypatch.setattr(ocr_processor, 'NAME_BLOCK_MAX_SIZE', 1)
+    names = ["Muhammad Rizki", "Muhammad Fajar", "Rizki Muhammad"]
+    pairs = match_names_optimal([["Muhammad Rizki"]], names)
+    assert pairs[0][:2] == (0, 0)
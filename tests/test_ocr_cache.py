@@ -0,0 +1,52 @@
+"""Cache teks OCR di disk: komposisi key, hit/miss, dan eviction LRU berdasarkan ukuran."""
+import os
+
+import ocr_processor
+from ocr_processor import evict_ocr_cache, ocr_cache_get, ocr_cache_key, ocr_cache_put
+
+
+def test_cache_key_covers_content_and_every_setting():
+    base = ocr_cache_key('abc', lang='ind', dpi=300, psm=6)
+    assert ocr_cache_key('abc', psm=6, dpi=300, lang='ind') == base
+    assert ocr_cache_key('abd', lang='ind', dpi=300, psm=6) != base
+    assert ocr_cache_key('abc', lang='eng', dpi=300, psm=6) != base
+    assert ocr_cache_key('abc', lang='ind', dpi=200, psm=6) != base
+    assert ocr_cache_key('abc', lang='ind', dpi=300, psm=4) != base
+    assert ocr_cache_key('abc', lang='ind', dpi=300, psm=6, pages=(0, 1)) != base
+
+
+def test_miss_then_hit(isolated_pipeline):
+    key = ocr_cache_key('abc', lang='ind')
+    assert ocr_cache_get(key) is None
+    ocr_cache_put(key, "Nama: Budi Santoso\nNIK: 12345")
+    assert ocr_cache_get(key) == "Nama: Budi Santoso\nNIK: 12345"
+    assert ocr_cache_get(ocr_cache_key('abc', lang='eng')) is None
+    assert os.path.exists(os.path.join(ocr_processor.OCR_CACHE_DIR, key[:2], f"{key}.txt"))
+
+
+def test_eviction_removes_least_recently_used_first(isolated_pipeline):
+    keys = [ocr_cache_key(name) for name in ('a', 'b', 'c')]
+    for age, key in zip((3000, 2000, 1000), keys):
+        ocr_cache_put(key, "x" * 1024)
+        path = os.path.join(ocr_processor.OCR_CACHE_DIR, key[:2], f"{key}.txt")
+        mtime = os.path.getmtime(path) - age
+        os.utime(path, (mtime, mtime))
+
+    # Entry paling lama dibaca ulang: mtime diperbarui sehingga tidak lagi jadi kandidat eviction
+    assert ocr_cache_get(keys[0]) is not None
+    evict_ocr_cache(max_mb=2.5 / 1024)
+
+    assert ocr_cache_get(keys[0]) is not None
+    assert ocr_cache_get(keys[1]) is None
+    assert ocr_cache_get(keys[2]) is not None
+
+
+def test_eviction_keeps_cache_within_limit(isolated_pipeline):
+    for index in range(5):
+        ocr_cache_put(ocr_cache_key(str(index)), "x" * 1024)
+    evict_ocr_cache(max_mb=0)
+    assert all(ocr_cache_get(ocr_cache_key(str(index))) is None for index in range(5))
+
+    ocr_cache_put(ocr_cache_key('kecil'), "x" * 10)
+    evict_ocr_cache(max_mb=1)
+    assert ocr_cache_get(ocr_cache_key('kecil')) == "x" * 10
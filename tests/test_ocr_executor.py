@@ -0,0 +1,18 @@
+"""Process pool OCR dibuat dengan start method spawn (bukan fork dari server multithread + koneksi SQLite)."""
+import os
+
+import ocr_processor
+
+
+def test_ocr_pool_uses_spawn_and_runs_tasks():
+    ocr_processor.shutdown_ocr_executor()
+    try:
+        executor = ocr_processor.get_ocr_executor(2)
+        assert executor._mp_context.get_start_method() == 'spawn'
+        assert executor.submit(os.getpid).result(timeout=120) != os.getpid()
+    finally:
+        ocr_processor.shutdown_ocr_executor()
+
+
+def test_single_worker_has_no_pool():
+    assert ocr_processor.get_ocr_executor(1) is None
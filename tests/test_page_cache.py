@@ -0,0 +1,42 @@
+"""Cache OCR per halaman: hash bitmap halaman dan penyimpanan (teks, confidence)."""
+import os
+
+from PIL import Image
+
+import ocr_processor
+from ocr_processor import page_cache_get, page_cache_put, page_image_hash
+
+
+def _page(marked_pixel=None):
+    image = Image.new('L', (120, 160), 255)
+    image.paste(0, (20, 30, 100, 40))
+    if marked_pixel:
+        image.putpixel(marked_pixel, 0)
+    return image
+
+
+def test_identical_pages_share_hash():
+    assert page_image_hash(_page()) == page_image_hash(_page())
+
+
+def test_hash_changes_with_pixels_mode_and_size():
+    base = page_image_hash(_page())
+    assert page_image_hash(_page(marked_pixel=(5, 5))) != base
+    assert page_image_hash(_page().convert('RGB')) != base
+    assert page_image_hash(_page().crop((0, 0, 120, 150))) != base
+
+
+def test_page_cache_roundtrip(isolated_pipeline):
+    key = page_image_hash(_page())
+    assert page_cache_get(key) is None
+    page_cache_put(key, "Riwayat Jabatan", 91.5)
+    assert page_cache_get(key) == ("Riwayat Jabatan", 91.5)
+    page_cache_put(key, "Tanpa confidence", None)
+    assert page_cache_get(key) == ("Tanpa confidence", None)
+
+
+def test_corrupt_page_entry_is_a_miss(isolated_pipeline):
+    key = page_image_hash(_page())
+    ocr_processor.ocr_cache_put(key, "bukan json")
+    assert page_cache_get(key) is None
+    assert os.path.exists(os.path.join(ocr_processor.OCR_CACHE_DIR, key[:2], f"{key}.txt"))
@@ -0,0 +1,82 @@
+"""preprocess_page_image pada gambar sintetis: deteksi halaman kosong, crop margin dan statistiknya, bar gelap."""
+import numpy as np
+import pytest
+from PIL import Image
+
+import ocr_processor
+from ocr_processor import PREPROCESS_CROP_MARGIN, preprocess_page_image
+
+
+def _page(height=600, width=400):
+    return np.full((height, width), 255, dtype=np.uint8)
+
+
+def test_blank_page_is_skipped():
+    processed, stats = preprocess_page_image(Image.fromarray(_page()))
+    assert processed is None
+    assert stats['blank'] is True
+    assert stats['pixels_in'] == 400 * 600
+    assert stats['pixels_out'] == 0
+    assert stats['preprocess_seconds'] >= 0
+
+
+def test_page_with_only_specks_is_blank():
+    page = _page()
+    page[100, 100] = 0
+    page[300, 200] = 0
+    processed, stats = preprocess_page_image(Image.fromarray(page))
+    assert processed is None and stats['blank']
+
+
+def test_crop_keeps_margin_around_ink_and_reports_pixels():
+    page = _page()
+    page[100:120, 50:250] = 0
+    processed, stats = preprocess_page_image(Image.fromarray(page))
+
+    margin = PREPROCESS_CROP_MARGIN
+    assert processed.mode == 'L'
+    assert processed.size == (200 + 2 * margin, 20 + 2 * margin)
+    assert stats['blank'] is False
+    assert stats['pixels_out'] == processed.size[0] * processed.size[1] < stats['pixels_in']
+    binary = np.asarray(processed)
+    assert set(np.unique(binary)) == {0, 255}
+    assert (binary[margin:margin + 20, margin:margin + 200] == 0).all()
+    assert (binary[:margin] == 255).all() and (binary[:, :margin] == 255).all()
+
+
+def test_crop_is_clamped_at_page_edges():
+    page = _page()
+    page[0:10, 0:30] = 0
+    processed, _ = preprocess_page_image(Image.fromarray(page))
+    assert processed.size == (30 + PREPROCESS_CROP_MARGIN, 10 + PREPROCESS_CROP_MARGIN)
+
+
+@pytest.mark.parametrize('mode', ['none', 'grayscale'])
+def test_non_optimized_modes_keep_full_page(mode):
+    image = Image.fromarray(_page()).convert('RGB')
+    processed, stats = preprocess_page_image(image, mode=mode)
+    assert processed.size == image.size
+    assert processed.mode == ('RGB' if mode == 'none' else 'L')
+    assert stats['pixels_out'] == stats['pixels_in'] and not stats['blank']
+
+
+def test_white_text_on_dark_header_becomes_ink():
+    rng = np.random.default_rng(0)
+    page = _page(640, 640)
+    page[0:128] = rng.integers(40, 61, (128, 640))
+    for top in (40, 70, 100):
+        page[top:top + 6, 64:576] = 255
+    page[300:306, 64:500] = 0
+    processed, _ = preprocess_page_image(Image.fromarray(page))
+    binary = np.asarray(processed)
+
+    # Crop mulai dari baris teks putih pertama (40) dan kolom 64, dikurangi margin
+    top, left = 40 - PREPROCESS_CROP_MARGIN, 64 - PREPROCESS_CROP_MARGIN
+    assert (binary[40 - top:46 - top, 100 - left] == 0).all()
+    assert binary[55 - top, 100 - left] == 255
+    assert (binary[300 - top:306 - top, 100 - left] == 0).all()
+
+
+def test_dark_background_mask_ignores_small_pages():
+    gray = np.zeros((2 * ocr_processor.PREPROCESS_TILE_SIZE, 640), dtype=np.uint8)
+    assert not ocr_processor._dark_background_mask(gray, 128).any()
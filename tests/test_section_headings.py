@@ -0,0 +1,57 @@
+"""Regresi deteksi judul section: nama jabatan yang memuat kata kunci section bukan judul section."""
+import pytest
+
+from ocr_processor import _section_for_heading, compact_text_for_fields, split_document_sections
+
+
+@pytest.mark.parametrize("line", [
+    "Business Development Manager",
+    "Training Specialist",
+    "Project Manager",
+    "Career Development Program Officer",
+    "PROJECT MANAGER",
+    "Senior Training Officer:",
+    "Profile Manager PT Maju Jaya",
+    "Mengelola project migrasi sistem",
+])
+def test_job_titles_are_not_headings(line):
+    assert _section_for_heading(line) is None
+
+
+@pytest.mark.parametrize("line, section", [
+    ("Pengalaman Kerja", 'experience'),
+    ("Riwayat Pekerjaan:", 'experience'),
+    ("WORK EXPERIENCE", 'experience'),
+    ("Pendidikan Formal", 'education'),
+    ("2. Pendidikan", 'education'),
+    ("Skills", 'skills'),
+    ("Pelatihan dan Sertifikasi", 'skills'),
+    ("Key Projects", 'achievements'),
+    ("Kesimpulan", 'assessment'),
+    ("AREA PENGEMBANGAN", 'assessment'),
+])
+def test_standalone_headings(line, section):
+    assert _section_for_heading(line) == section
+
+
+def test_work_history_is_not_split_by_job_titles():
+    cv = "\n".join([
+        "=== CV ===",
+        "Budi Santoso",
+        "Pengalaman Kerja",
+        "Business Development Manager",
+        "PT Alpha, 2020 - sekarang",
+        "Training Specialist",
+        "PT Beta, 2017 - 2020",
+        "Project Manager",
+        "PT Gamma, 2014 - 2017",
+        "Pendidikan",
+        "S1 Teknik Industri",
+    ])
+    sections = [name for _, name, _ in split_document_sections(cv)]
+    assert sections == ['header', 'experience', 'education']
+
+    compact = compact_text_for_fields(cv, ['experience'], 3500)
+    for line in ("Business Development Manager", "PT Alpha", "Training Specialist", "PT Beta",
+                 "Project Manager", "PT Gamma"):
+        assert line in compact